@@ -0,0 +1,13 @@
+"""
+Performance benchmarks. Every benchmark prints its results as JSON.
+
+Importing the package sets defaults that let benchmarks run offline and
+reproducibly: a placeholder Groq API key (the model is replaced by
+`benchmarks.stub_llm`), a memory-only categorization cache, and no client-side
+rate limit. Variables already set in the environment are kept.
+"""
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-stub")
+os.environ.setdefault("CATEGORY_CACHE_PATH", "")
+os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "0")
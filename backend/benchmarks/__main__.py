@@ -0,0 +1,42 @@
+"""
+Runs the benchmark suite and writes a single JSON document, suitable for
+comparing commits with `python -m benchmarks.compare`.
+
+Usage (from the `backend` directory):
+    python -m benchmarks --rows 1000 100000 --output results.json
+"""
+import argparse
+import json
+from typing import Any, Dict, List
+
+from benchmarks import bench_anomaly, bench_e2e, bench_micro
+from benchmarks.harness import environment
+
+
+def run(rows: List[int], llm_latency: float) -> Dict[str, Any]:
+    """
+    Runs the microbenchmarks, the end-to-end uploads and the anomaly detection benchmark.
+    """
+    return {
+        "benchmark": "suite",
+        "environment": environment(),
+        "suites": [
+            {"benchmark": "micro", "results": bench_micro.run(rows, llm_latency=llm_latency)},
+            {"benchmark": "end_to_end", "results": bench_e2e.run(rows, ["csv", "xlsx"], llm_latency)},
+            {"benchmark": "anomaly_detection", "results": [r for size in rows for r in bench_anomaly.run(size)]},
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="Statement sizes to benchmark.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Simulated seconds per model request.")
+    parser.add_argument("--output", help="File to write the results to. Defaults to standard output.")
+    args = parser.parse_args()
+    document = json.dumps(run(args.rows, args.llm_latency), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
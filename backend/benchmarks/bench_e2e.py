@@ -0,0 +1,122 @@
+"""
+End-to-end benchmark through the FastAPI application.
+
+Uploads a synthetic statement to `POST /upload`, polls the job's status until
+it completes, then fetches its insights, predictions and transactions. The
+model is replaced by the stub in `benchmarks.stub_llm`; everything else (the
+scheduler, streaming parsers, process pool, categorization cache and result
+cache) runs as in production. Each upload runs in a fresh process.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_e2e --rows 1000 100000 --formats csv xlsx --llm-latency 0.2
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.harness import environment, run_isolated
+from benchmarks.synthetic import csv_bytes, write_xlsx
+
+# Seconds between status polls
+_POLL_INTERVAL = 0.01
+# Give up on a job after this many seconds
+_TIMEOUT = 3600.0
+
+
+def _statement(file_format: str, rows: int) -> bytes:
+    """
+    Returns a synthetic statement in the given format.
+    """
+    if file_format == "csv":
+        return csv_bytes(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.xlsx")
+        write_xlsx(path, rows)
+        with open(path, "rb") as f:
+            return f.read()
+
+
+def bench_upload(file_format: str, rows: int, llm_latency: float) -> Dict[str, Any]:
+    """
+    Uploads one statement and times each stage of its life through the API.
+    """
+    from fastapi.testclient import TestClient
+
+    from benchmarks import stub_llm
+    from src.main import app
+
+    stub = stub_llm.install(latency=llm_latency)
+    content = _statement(file_format, rows)
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        response = client.post("/upload", files={"file": (f"statement.{file_format}", content)})
+        response.raise_for_status()
+        accepted = time.perf_counter()
+        job_id = response.json()["job_id"]
+        while True:
+            job = client.get(f"/analysis/{job_id}/status").json()
+            if job["status"] in ("COMPLETED", "FAILED"):
+                break
+            if time.perf_counter() - started > _TIMEOUT:
+                raise TimeoutError(f"Job did not complete within {_TIMEOUT:.0f} seconds.")
+            time.sleep(_POLL_INTERVAL)
+        completed = time.perf_counter()
+        if job["status"] == "FAILED":
+            raise RuntimeError(job["error_message"])
+
+        fetches = {}
+        for name in ("insights", "predictions", "transactions"):
+            fetch_started = time.perf_counter()
+            client.get(f"/analysis/{job_id}/{name}").raise_for_status()
+            fetches[f"fetch_{name}_seconds"] = round(time.perf_counter() - fetch_started, 4)
+
+    return {
+        "seconds": completed - started,
+        "upload_seconds": round(accepted - started, 4),
+        "file_bytes": len(content),
+        **fetches,
+        **stub.stats(),
+    }
+
+
+def run(rows: List[int], formats: List[str], llm_latency: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Benchmarks an upload of every format at every statement size.
+
+    Args:
+        rows: Statement sizes to benchmark.
+        formats: File formats to upload ('csv', 'xlsx').
+        llm_latency: Simulated seconds per model request.
+
+    Returns:
+        One result per format and size.
+    """
+    results: List[Dict[str, Any]] = []
+    for file_format in formats:
+        for size in rows:
+            result = run_isolated(bench_upload, file_format, size, llm_latency)
+            seconds = result.get("seconds")
+            results.append({
+                "name": f"upload_{file_format}",
+                "rows": size,
+                **result,
+                "seconds": round(seconds, 4) if seconds is not None else None,
+                "rows_per_sec": round(size / seconds, 1) if seconds else None,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="Statement sizes to benchmark.")
+    parser.add_argument("--formats", nargs="+", choices=["csv", "xlsx"], default=["csv", "xlsx"], help="File formats to upload.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Simulated seconds per model request.")
+    args = parser.parse_args()
+    print(json.dumps({
+        "benchmark": "end_to_end",
+        "environment": environment(),
+        "results": run(args.rows, args.formats, args.llm_latency),
+    }, indent=2))
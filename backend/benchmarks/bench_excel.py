@@ -0,0 +1,138 @@
+"""
+Benchmark for the Excel ingestion path.
+
+Compares the original full-load, cell-by-cell parser with the read-only,
+row-streaming engine in `src.services.parser`, reporting rows/sec and the
+peak RSS of a fresh process for each implementation.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_excel --rows 100000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from typing import Any, Callable, Dict, List
+
+from openpyxl import Workbook, load_workbook
+
+from src.models.schemas import Transaction
+from src.services.parser import iter_excel_batches
+
+
+def legacy_parse_excel(file_content: bytes) -> List[Transaction]:
+    """
+    The original `parse_excel` implementation, kept as the benchmark baseline:
+    a full workbook load followed by a `sheet.cell()` lookup for every cell.
+    """
+    transactions: List[Transaction] = []
+    workbook = load_workbook(filename=BytesIO(file_content))
+    sheet = workbook.active
+    headers = [cell.value for cell in sheet[1]]
+    for row_idx in range(2, sheet.max_row + 1):
+        row_data = {}
+        for col_idx, header in enumerate(headers):
+            row_data[header] = sheet.cell(row=row_idx, column=col_idx + 1).value
+        if isinstance(row_data['Date'], datetime):
+            transaction_date = row_data['Date'].date()
+        else:
+            transaction_date = datetime.strptime(str(row_data['Date']), '%Y-%m-%d').date()
+        transactions.append(
+            Transaction(
+                date=transaction_date,
+                description=str(row_data['Description']),
+                amount=float(row_data['Amount'])
+            )
+        )
+    return transactions
+
+
+def streaming_parse_excel(file_content: bytes) -> int:
+    """
+    Consumes the read-only engine batch by batch, as the ingestion service does,
+    and returns the number of parsed rows.
+    """
+    count = 0
+    for batch in iter_excel_batches(file_content, batch_size=2000):
+        count += len(batch)
+    return count
+
+
+IMPLEMENTATIONS: Dict[str, Callable[[bytes], Any]] = {
+    "legacy": legacy_parse_excel,
+    "read_only_streaming": streaming_parse_excel,
+}
+
+
+def write_workbook(path: str, rows: int, seed: int = 42) -> None:
+    """
+    Writes a synthetic statement workbook with 'Date', 'Description', 'Amount' columns.
+    """
+    rng = random.Random(seed)
+    merchants = ["NETFLIX.COM", "UBER *TRIP", "SHELL OIL", "WHOLE FOODS", "RENT PAYMENT", "PAYROLL", "AMAZON MKTPLACE"]
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Transactions")
+    sheet.append(["Date", "Description", "Amount"])
+    start = date(2023, 1, 1)
+    for i in range(rows):
+        sheet.append([
+            datetime.combine(start + timedelta(days=i % 730), datetime.min.time()),
+            f"{rng.choice(merchants)} {rng.randint(1000, 9999)}",
+            round(rng.uniform(-500, 500), 2),
+        ])
+    workbook.save(path)
+
+
+def _measure(name: str, path: str, queue: "multiprocessing.Queue") -> None:
+    """
+    Runs one implementation in a fresh process and reports its throughput and peak RSS.
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    started = time.perf_counter()
+    parsed = IMPLEMENTATIONS[name](content)
+    elapsed = time.perf_counter() - started
+    rows = parsed if isinstance(parsed, int) else len(parsed)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    queue.put({
+        "implementation": name,
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    })
+
+
+def run(rows: int) -> List[Dict[str, Any]]:
+    """
+    Generates a workbook of the requested size and benchmarks every implementation on it.
+    """
+    context = multiprocessing.get_context("spawn")
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.xlsx")
+        write_workbook(path, rows)
+        for name in IMPLEMENTATIONS:
+            queue = context.Queue()
+            process = context.Process(target=_measure, args=(name, path, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of transaction rows in the generated workbook.")
+    args = parser.parse_args()
+    print(json.dumps({"benchmark": "excel_ingestion", "results": run(args.rows)}, indent=2))
@@ -0,0 +1,189 @@
+"""
+Microbenchmarks of the parsing and analysis stages on synthetic statements.
+
+- `parse_csv`: parsing a whole CSV statement into a TransactionBatch.
+- `parse_bank_csv`: parsing a whole CSV statement in a European bank's format
+  (preamble, semicolons, day-first dates, decimal commas, debit and credit columns).
+- `parse_excel`: parsing a whole Excel workbook into a TransactionBatch.
+- `parse_parquet`: reading a whole Parquet file into a TransactionBatch
+  (reported as an error if pyarrow is not installed).
+- `analyze_transactions`: categorization (against the stub model in
+  `benchmarks.stub_llm`) and report building for a parsed statement.
+- `summary`: a month x category summary answered from the rollup cube, next to
+  building the cube and computing the same summary by scanning every transaction.
+
+Each measurement runs in a fresh process, so caches start cold.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_micro --rows 1000 100000 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.harness import environment, run_isolated
+from benchmarks.synthetic import bank_csv_bytes, csv_bytes, write_parquet, write_xlsx
+
+
+def bench_parse_csv(rows: int, llm_latency: float) -> Dict[str, Any]:
+    """
+    Parses a CSV statement of `rows` transactions.
+    """
+    from src.services.parser import parse_csv
+
+    content = csv_bytes(rows).decode("utf-8")
+    started = time.perf_counter()
+    batch = parse_csv(content)
+    return {"seconds": time.perf_counter() - started, "parsed": len(batch)}
+
+
+def bench_parse_bank_csv(rows: int, llm_latency: float) -> Dict[str, Any]:
+    """
+    Parses a CSV statement of `rows` transactions whose layout and formats must be inferred.
+    """
+    from src.services.parser import parse_csv
+
+    content = bank_csv_bytes(rows).decode("utf-8")
+    started = time.perf_counter()
+    batch = parse_csv(content)
+    return {"seconds": time.perf_counter() - started, "parsed": len(batch)}
+
+
+def bench_parse_excel(rows: int, llm_latency: float) -> Dict[str, Any]:
+    """
+    Parses an Excel statement of `rows` transactions.
+    """
+    from src.services.parser import parse_excel
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.xlsx")
+        write_xlsx(path, rows)
+        with open(path, "rb") as f:
+            content = f.read()
+    started = time.perf_counter()
+    batch = parse_excel(content)
+    return {"seconds": time.perf_counter() - started, "parsed": len(batch)}
+
+
+def bench_parse_parquet(rows: int, llm_latency: float) -> Dict[str, Any]:
+    """
+    Reads a Parquet statement of `rows` transactions from disk.
+    """
+    from src.models.batch import TransactionBatch
+    from src.services.columnar_parser import iter_columnar_batches
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.parquet")
+        write_parquet(path, rows)
+        started = time.perf_counter()
+        batch = TransactionBatch.concat(iter_columnar_batches(path, batch_size=rows or 1))
+        seconds = time.perf_counter() - started
+    return {"seconds": seconds, "parsed": len(batch)}
+
+
+def bench_analyze_transactions(rows: int, llm_latency: float) -> Dict[str, Any]:
+    """
+    Categorizes and analyzes a parsed statement, with the model replaced by the stub.
+    """
+    from benchmarks import stub_llm
+    from src.core.executor import run_cpu_bound, shutdown_process_pool
+    from src.services.analysis import analysis_service
+    from src.services.parser import parse_csv
+
+    stub = stub_llm.install(latency=llm_latency)
+    batch = parse_csv(csv_bytes(rows).decode("utf-8"))
+
+    async def analyze() -> float:
+        await run_cpu_bound(abs, 0) # Start the process pool outside the timed section
+        started = time.perf_counter()
+        await analysis_service.analyze_transactions(batch)
+        return time.perf_counter() - started
+
+    try:
+        seconds = asyncio.run(analyze())
+    finally:
+        shutdown_process_pool()
+    return {"seconds": seconds, "parsed": len(batch), **stub.stats()}
+
+
+def bench_summary(rows: int, llm_latency: float) -> Dict[str, Any]:
+    """
+    Summarizes a categorized statement by month and category from its rollup cube.
+    `scan_seconds` is the same summary computed from every transaction, as clients had to.
+    """
+    from collections import defaultdict
+    from src.models.rollup import RollupCube
+    from src.services.parser import parse_csv
+
+    batch = parse_csv(csv_bytes(rows).decode("utf-8"))
+    batch.assign_categories([description.split()[0] for description in batch.descriptions])
+
+    started = time.perf_counter()
+    cube = RollupCube.build(batch)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    summary = cube.query(bucket="month")
+    seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    totals: Dict[Any, float] = defaultdict(float)
+    for record in batch.to_records():
+        totals[(record["date"][:7], record["category"])] += record["amount"]
+    scan_seconds = time.perf_counter() - started
+    return {"seconds": seconds, "parsed": len(batch), "cells": len(cube), "groups": len(summary),
+            "build_seconds": round(build_seconds, 4), "scan_seconds": round(scan_seconds, 4)}
+
+
+BENCHMARKS: Dict[str, Callable[[int, float], Dict[str, Any]]] = {
+    "parse_csv": bench_parse_csv,
+    "parse_bank_csv": bench_parse_bank_csv,
+    "parse_excel": bench_parse_excel,
+    "parse_parquet": bench_parse_parquet,
+    "analyze_transactions": bench_analyze_transactions,
+    "summary": bench_summary,
+}
+
+
+def run(rows: List[int], names: Optional[List[str]] = None, llm_latency: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Runs the selected microbenchmarks at every statement size.
+
+    Args:
+        rows: Statement sizes to benchmark.
+        names: Benchmarks to run. Defaults to all of `BENCHMARKS`.
+        llm_latency: Simulated seconds per model request.
+
+    Returns:
+        One result per benchmark and size.
+    """
+    results: List[Dict[str, Any]] = []
+    for name in names or list(BENCHMARKS):
+        for size in rows:
+            result = run_isolated(BENCHMARKS[name], size, llm_latency)
+            seconds = result.get("seconds")
+            results.append({
+                "name": name,
+                "rows": size,
+                **result,
+                "seconds": round(seconds, 4) if seconds is not None else None,
+                "rows_per_sec": round(size / seconds, 1) if seconds else None,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="Statement sizes to benchmark.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run. Defaults to all.")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Simulated seconds per model request.")
+    args = parser.parse_args()
+    print(json.dumps({
+        "benchmark": "micro",
+        "environment": environment(),
+        "results": run(args.rows, args.only, args.llm_latency),
+    }, indent=2))
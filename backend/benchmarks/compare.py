@@ -0,0 +1,71 @@
+"""
+Compares two benchmark result files, for instance from two commits, and
+reports the change in time of every measurement they have in common.
+
+Accepts the output of any benchmark module or of the whole suite. Exits with
+status 1 if a measurement got slower by more than the threshold.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.compare before.json after.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+
+def _measurements(document: Dict[str, Any]) -> Iterator[Tuple[str, float]]:
+    """
+    Yields a stable key and the seconds of every measurement in a result document.
+    """
+    for suite in document.get("suites", [document]):
+        for result in suite.get("results", []):
+            name = result.get("name") or result.get("implementation")
+            if result.get("seconds") is not None:
+                yield f"{suite.get('benchmark')}/{name}/{result.get('rows')}", float(result["seconds"])
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    """
+    Compares two result documents.
+
+    Args:
+        before: The baseline results.
+        after: The results to check.
+        threshold: Relative slowdown above which a measurement is a regression (0.1 is 10%).
+
+    Returns:
+        The change of every common measurement, and the keys of the regressions.
+    """
+    baseline = dict(_measurements(before))
+    changes = []
+    for key, seconds in _measurements(after):
+        if key in baseline and baseline[key] > 0:
+            changes.append({
+                "key": key,
+                "before_seconds": baseline[key],
+                "after_seconds": seconds,
+                "change": round(seconds / baseline[key] - 1, 4),
+            })
+    return {
+        "before": before.get("environment", {}).get("commit"),
+        "after": after.get("environment", {}).get("commit"),
+        "threshold": threshold,
+        "changes": changes,
+        "regressions": [change["key"] for change in changes if change["change"] > threshold],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before", help="Baseline result file.")
+    parser.add_argument("after", help="Result file to check against the baseline.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown reported as a regression.")
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    report = compare(before, after, args.threshold)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["regressions"] else 0)
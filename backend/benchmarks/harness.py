@@ -0,0 +1,73 @@
+"""
+Helpers shared by the benchmarks: isolated measurement processes and a
+description of the environment, recorded with every result file so runs from
+different commits can be compared.
+"""
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of the current process, in megabytes.
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    return round(max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024, 1)
+
+
+def _run_and_report(fn: Callable[..., Dict[str, Any]], args: tuple, queue: "multiprocessing.Queue") -> None:
+    try:
+        result = fn(*args)
+        result["peak_rss_mb"] = peak_rss_mb()
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    queue.put(result)
+
+
+def run_isolated(fn: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    """
+    Runs a measurement in a fresh process, so caches, pools and peak memory start
+    from scratch, and returns its result with the process's peak RSS added.
+
+    Args:
+        fn: A module-level function returning a dict of measurements.
+        *args: Picklable arguments for `fn`.
+
+    Returns:
+        The measurements, or a dict with an `error` entry if `fn` raised.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_and_report, args=(fn, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Describes the machine and code a benchmark ran on.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
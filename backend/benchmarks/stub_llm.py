@@ -0,0 +1,76 @@
+"""
+A local stand-in for the Groq chat completions API, so benchmarks measure the
+application rather than the network.
+
+`install` replaces the SDK client inside the application's `GroqClient`, so the
+real prompt batching, concurrency limits and response parsing still run; only
+the HTTP call is simulated, with a configurable latency.
+"""
+import asyncio
+import re
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from benchmarks.synthetic import CATEGORY_KEYWORDS
+
+# Matches one "<id>: <description>" line of the prompt
+_PROMPT_LINE = re.compile(r"^(\d+): (.*)$", re.MULTILINE)
+
+
+class StubChatCompletions:
+    """
+    Answers categorization prompts with keyword rules after a simulated delay.
+    """
+    def __init__(self, latency: float, per_item_latency: float):
+        """
+        Initializes the stub.
+
+        Args:
+            latency: Seconds each request takes, regardless of its size.
+            per_item_latency: Additional seconds per description in the request.
+        """
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.requests = 0
+        """Number of requests answered."""
+        self.items = 0
+        """Number of descriptions categorized."""
+
+    async def create(self, messages: List[Dict[str, str]], **kwargs: Any) -> SimpleNamespace:
+        """
+        Mirrors `groq.AsyncGroq().chat.completions.create` for the fields the application reads.
+        """
+        prompt = messages[-1]["content"]
+        items = _PROMPT_LINE.findall(prompt.split("Descriptions:\n", 1)[-1])
+        self.requests += 1
+        self.items += len(items)
+        await asyncio.sleep(self.latency + self.per_item_latency * len(items))
+        lines = []
+        for item_id, description in items:
+            first_word = description.split(" ", 1)[0].strip("*'").upper()
+            lines.append(f"{item_id}: {CATEGORY_KEYWORDS.get(first_word, 'Uncategorized')}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="\n".join(lines)))])
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the request and item counters.
+        """
+        return {"llm_requests": self.requests, "llm_items": self.items}
+
+
+def install(latency: float = 0.2, per_item_latency: float = 0.0) -> StubChatCompletions:
+    """
+    Routes the application's Groq calls to a stub.
+
+    Args:
+        latency: Seconds each request takes.
+        per_item_latency: Additional seconds per description in a request.
+
+    Returns:
+        The stub, whose counters report the traffic it received.
+    """
+    from src.services.groq_client import groq_client
+
+    completions = StubChatCompletions(latency, per_item_latency)
+    groq_client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
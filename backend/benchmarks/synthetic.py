@@ -0,0 +1,179 @@
+"""
+Deterministic synthetic bank statements for benchmarks.
+
+Statements draw from a catalog of merchant brands, each with a category and a
+typical amount. Every brand has a number of locations (distinct merchant keys),
+and merchants are picked with a Zipf-like distribution, so a few merchants
+account for most rows, as on real statements. Descriptions carry store numbers
+and references that vary from row to row, and a salary is paid twice a month.
+
+The same `rows` and `seed` always produce the same statement.
+"""
+import csv
+import io
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from openpyxl import Workbook
+
+# (brand, category, typical amount); locations are appended to make distinct merchants
+MERCHANT_BRANDS: List[Tuple[str, str, float]] = [
+    ("WHOLE FOODS MARKET", "Groceries", 85.0),
+    ("TRADER JOE'S", "Groceries", 60.0),
+    ("SAFEWAY STORE", "Groceries", 70.0),
+    ("KROGER", "Groceries", 75.0),
+    ("COSTCO WHSE", "Groceries", 180.0),
+    ("STARBUCKS STORE", "Dining Out", 7.5),
+    ("CHIPOTLE ONLINE", "Dining Out", 14.0),
+    ("MCDONALD'S", "Dining Out", 11.0),
+    ("DOORDASH", "Dining Out", 35.0),
+    ("SWEETGREEN", "Dining Out", 16.0),
+    ("UBER *TRIP", "Transport", 22.0),
+    ("LYFT *RIDE", "Transport", 19.0),
+    ("SHELL OIL", "Transport", 48.0),
+    ("CHEVRON", "Transport", 52.0),
+    ("METRO TRANSIT", "Transport", 2.75),
+    ("AMAZON MKTPLACE PMTS", "Shopping", 42.0),
+    ("TARGET", "Shopping", 55.0),
+    ("BEST BUY", "Shopping", 160.0),
+    ("IKEA", "Shopping", 120.0),
+    ("ETSY.COM", "Shopping", 30.0),
+    ("NETFLIX.COM", "Entertainment", 15.49),
+    ("SPOTIFY USA", "Entertainment", 10.99),
+    ("AMC THEATRES", "Entertainment", 28.0),
+    ("STEAM GAMES", "Entertainment", 25.0),
+    ("PG&E WEB ONLINE", "Utilities", 110.0),
+    ("COMCAST XFINITY", "Utilities", 89.99),
+    ("VERIZON WIRELESS", "Utilities", 75.0),
+    ("CITY WATER DEPT", "Utilities", 45.0),
+    ("CVS PHARMACY", "Healthcare", 25.0),
+    ("WALGREENS", "Healthcare", 20.0),
+    ("KAISER PERMANENTE", "Healthcare", 150.0),
+    ("COURSERA", "Education", 49.0),
+    ("BARNES & NOBLE", "Education", 32.0),
+    ("DELTA AIR LINES", "Travel", 420.0),
+    ("MARRIOTT HOTELS", "Travel", 260.0),
+    ("AIRBNB", "Travel", 310.0),
+    ("VANGUARD BUY", "Investments", 500.0),
+]
+
+LOCATIONS: List[str] = [
+    "SEATTLE WA", "PORTLAND OR", "SAN FRANCISCO CA", "OAKLAND CA", "LOS ANGELES CA", "SAN DIEGO CA",
+    "PHOENIX AZ", "DENVER CO", "AUSTIN TX", "DALLAS TX", "HOUSTON TX", "CHICAGO IL", "DETROIT MI",
+    "ATLANTA GA", "MIAMI FL", "ORLANDO FL", "BOSTON MA", "NEW YORK NY", "BROOKLYN NY", "NEWARK NJ",
+    "PHILADELPHIA PA", "PITTSBURGH PA", "BALTIMORE MD", "RALEIGH NC", "NASHVILLE TN", "MINNEAPOLIS MN",
+    "SALT LAKE CITY UT", "LAS VEGAS NV", "SACRAMENTO CA", "SAN JOSE CA",
+]
+
+SALARY_DESCRIPTION = "PAYROLL DEPOSIT ACME CORP"
+
+CATEGORY_KEYWORDS: Dict[str, str] = {
+    brand.split()[0].strip("*'").upper(): category for brand, category, _ in MERCHANT_BRANDS
+}
+"""First word of each brand mapped to its category, for stub categorizers."""
+CATEGORY_KEYWORDS["PAYROLL"] = "Salary"
+
+START_DATE = date(2023, 1, 1)
+
+
+def generate_transactions(rows: int, seed: int = 42, days: int = 730) -> Iterator[Tuple[date, str, float]]:
+    """
+    Generates a synthetic statement.
+
+    Args:
+        rows: Number of transactions.
+        seed: Random seed; the same seed gives the same statement.
+        days: Length of the statement period, starting on 2023-01-01.
+
+    Yields:
+        (date, description, amount) tuples in date order. Expenses are positive
+        and salary payments negative, as in the application's convention.
+    """
+    rng = np.random.default_rng(seed)
+    brands = len(MERCHANT_BRANDS)
+    # Merchant m is brand m % brands at location m // brands; Zipf-like popularity
+    merchants = brands * len(LOCATIONS)
+    popularity = 1.0 / np.arange(1, merchants + 1) ** 1.1
+    merchant_ids = rng.choice(merchants, size=rows, p=popularity / popularity.sum())
+    day_offsets = np.sort(rng.integers(0, days, size=rows))
+    scales = rng.lognormal(0.0, 0.35, size=rows)
+    references = rng.integers(1000, 99999, size=rows)
+    # Two salary payments a month replace the rows that land on the 1st and 15th first
+    paid = set()
+    for i in range(rows):
+        day = START_DATE + timedelta(days=int(day_offsets[i]))
+        if day.day in (1, 15) and day not in paid:
+            paid.add(day)
+            yield day, SALARY_DESCRIPTION, -2500.0
+            continue
+        merchant = int(merchant_ids[i])
+        brand, _, typical = MERCHANT_BRANDS[merchant % brands]
+        location = LOCATIONS[merchant // brands]
+        yield day, f"{brand} #{int(references[i])} {location}", round(typical * float(scales[i]), 2)
+
+
+def csv_bytes(rows: int, seed: int = 42) -> bytes:
+    """
+    Returns a synthetic statement as CSV with 'Date', 'Description', 'Amount' columns.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["Date", "Description", "Amount"])
+    for day, description, amount in generate_transactions(rows, seed):
+        writer.writerow([day.isoformat(), description, f"{amount:.2f}"])
+    return buffer.getvalue().encode("utf-8")
+
+
+def bank_csv_bytes(rows: int, seed: int = 42) -> bytes:
+    """
+    Returns a synthetic statement in the style of a European bank export: a preamble,
+    semicolon-delimited 'Buchungstag', 'Verwendungszweck', 'Soll' and 'Haben' columns,
+    day-first dates and amounts with a decimal comma and thousands separators.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+    writer.writerow(["Kontoauszug", "DE00 1234 5678 9012 3456 78"])
+    writer.writerow([])
+    writer.writerow(["Buchungstag", "Verwendungszweck", "Soll", "Haben"])
+    for day, description, amount in generate_transactions(rows, seed):
+        text = f"{abs(amount):,.2f}".replace(",", " ").replace(".", ",").replace(" ", ".")
+        writer.writerow([day.strftime("%d.%m.%Y"), description, text if amount > 0 else "", "" if amount > 0 else text])
+    return buffer.getvalue().encode("utf-8")
+
+
+def write_csv(path: str, rows: int, seed: int = 42) -> None:
+    """
+    Writes a synthetic statement as a CSV file.
+    """
+    with open(path, "wb") as f:
+        f.write(csv_bytes(rows, seed))
+
+
+def write_xlsx(path: str, rows: int, seed: int = 42) -> None:
+    """
+    Writes a synthetic statement as an Excel workbook with 'Date', 'Description', 'Amount' columns.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Transactions")
+    sheet.append(["Date", "Description", "Amount"])
+    for day, description, amount in generate_transactions(rows, seed):
+        sheet.append([datetime.combine(day, datetime.min.time()), description, amount])
+    workbook.save(path)
+
+
+def write_parquet(path: str, rows: int, seed: int = 42) -> None:
+    """
+    Writes a synthetic statement as a Parquet file with 'Date', 'Description', 'Amount' columns.
+    Requires the optional pyarrow package.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    days, descriptions, amounts = zip(*generate_transactions(rows, seed)) if rows else ((), (), ())
+    table = pa.table({
+        "Date": pa.array(days, type=pa.date32()),
+        "Description": pa.array(descriptions, type=pa.string()),
+        "Amount": pa.array(amounts, type=pa.float64()),
+    })
+    pq.write_table(table, path)
@@ -1,47 +1,239 @@
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException, status
-from src.services.ingestion import ingestion_service, FileParsingError
-from src.models.schemas import AnalysisJob, JobStatus, Transaction, Insight, Prediction
-from src.core.storage import db, results_db
+import os
+from datetime import date
+from fastapi import APIRouter, UploadFile, File, Form, Header, Query, Request, Response, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from src.services.ingestion import ingestion_service, FileParsingError, SUPPORTED_EXTENSIONS, ARCHIVE_EXTENSIONS, UNSUPPORTED_FILE_TYPE_MESSAGE, has_extension
+from src.services.scheduler import scheduler, QueueFullError
+from src.services.result_cache import result_cache
+from src.services.index_cache import index_cache
+from src.services.deduplication import upload_registry
+from src.services.events import watch_job
+from src.services.export import EXPORT_FORMATS, iter_export
+from src.core.serialization import accepted_encodings, dumps, gzip_stream
+from src.core.config import settings
+from src.core.metrics import registry, UPLOADS_REUSED
+from src.core.profiler import profile_store
+from src.services.categorizer import categorizer
+from src.models.schemas import AnalysisJob, JobStatus, Transaction, Insight, Prediction, SummaryRow
+from src.models.index import InvalidCursorError
+from src.core.storage import job_store, run_store
 from uuid import UUID
-from typing import List
+from typing import AsyncIterator, List, Optional, Dict
 
 router = APIRouter()
 
 @router.post("/upload", response_model=AnalysisJob, status_code=status.HTTP_202_ACCEPTED)
-async def upload_file(file: UploadFile = File(..., description="The transaction file (CSV or Excel) to upload."), 
-                      background_tasks: BackgroundTasks = None) -> AnalysisJob:
+async def upload_file(file: UploadFile = File(..., description="The transaction file (CSV, Excel, Parquet or Arrow IPC) to upload."), 
+                      sheet: Optional[str] = Form(None, description="For Excel files, the worksheet to analyze. Defaults to the active sheet."),
+                      tenant: str = Header("default", alias="X-Tenant-ID", description="The tenant the upload belongs to, for fair scheduling."),
+                      profile: bool = Header(False, alias="X-Profile", description="Record a sampling profile of the job (requires PROFILING_ENABLED)."),
+                      idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255, description="A client-chosen key; retries with the same key return the job created by the first request.")) -> AnalysisJob:
     """
-    Uploads a transaction file (CSV or Excel) for AI-powered financial analysis.
-    The file is processed asynchronously.
+    Uploads a transaction file (CSV, Excel, Parquet or Arrow IPC) for AI-powered financial analysis.
+    The file is queued and processed asynchronously by the job scheduler.
+
+    Repeated uploads are not analyzed again: a request whose `Idempotency-Key` was
+    already used by the tenant returns the job of the first request without reading
+    the file, and a file with the same content (and worksheet) as a queued, running
+    or completed job of the tenant attaches to that job. Such responses have `reused` set.
     
     Args:
         file: The uploaded file.
-        background_tasks: FastAPI's dependency for running background tasks.
+        sheet: The worksheet to analyze, for Excel files.
+        tenant: The tenant the upload belongs to, taken from the `X-Tenant-ID` header.
+        profile: Whether to profile the job, taken from the `X-Profile` header (see `/analysis/{job_id}/profile`).
+        idempotency_key: The request's idempotency key, taken from the `Idempotency-Key` header.
         
     Returns:
-        An AnalysisJob object with the initial status.
+        An AnalysisJob object with the initial status and queue position.
         
     Raises:
-        HTTPException: If the file type is unsupported.
+        HTTPException: If the file type is unsupported (415), or if the queue is full (429, with Retry-After).
     """
-    if not file.filename.endswith(('.csv', '.xls', '.xlsx')):
+    if not has_extension(file.filename, SUPPORTED_EXTENSIONS):
         raise HTTPException(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail="Unsupported file type. Only CSV and Excel are supported."
+            detail=UNSUPPORTED_FILE_TYPE_MESSAGE
         )
 
-    job = ingestion_service.create_analysis_job()
-    
-    # Process the file in a background task
-    # This allows the API to respond immediately while processing happens
-    background_tasks.add_task(ingestion_service.process_file, str(job.job_id), file)
-    
-    return job
+    return await _enqueue_upload(None, file, sheet, tenant, profile, idempotency_key)
+
+@router.post("/upload/batch", response_model=AnalysisJob, status_code=status.HTTP_202_ACCEPTED)
+async def upload_batch(files: List[UploadFile] = File(..., description="The transaction files, or ZIP archives of them, to analyze together."),
+                       tenant: str = Header("default", alias="X-Tenant-ID", description="The tenant the upload belongs to, for fair scheduling.")) -> AnalysisJob:
+    """
+    Uploads several transaction files, or ZIP archives of them, to be analyzed as one batch.
+
+    Every file (or supported archive member) gets a child job with its own results, and
+    the returned parent job merges the transactions of all of them. The files are processed
+    in parallel as a single queued job, and merchants they share are categorized once.
+    The parent completes once every child has finished; it fails only if all of them did.
+    Excel files are read from their active worksheet.
+
+    Args:
+        files: The uploaded files and archives.
+        tenant: The tenant the upload belongs to, taken from the `X-Tenant-ID` header.
+
+    Returns:
+        The parent AnalysisJob, with the IDs of its child jobs and its queue position.
+
+    Raises:
+        HTTPException: If a file type is unsupported (415), an archive is unreadable or
+            empty, or the batch has too many files (400), or if the queue is full (429, with Retry-After).
+    """
+    for file in files:
+        if not has_extension(file.filename, SUPPORTED_EXTENSIONS + ARCHIVE_EXTENSIONS):
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"{UNSUPPORTED_FILE_TYPE_MESSAGE} Batches may also contain ZIP archives."
+            )
+
+    try:
+        scheduler.check_capacity(tenant)
+        entries, paths = await ingestion_service.spool_batch(files)
+        try:
+            scheduler.check_capacity(tenant)
+        except QueueFullError:
+            for path in paths:
+                os.remove(path)
+            raise
+    except FileParsingError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    job = ingestion_service.create_batch_job(entries)
+    size = sum(entry.size for entry in entries)
+    position = scheduler.submit(job.job_id, tenant, size, lambda: ingestion_service.process_batch(str(job.job_id), entries, paths),
+                                discard=lambda: ingestion_service.discard_queued(str(job.job_id), paths))
+    return job.model_copy(update={"queue_position": position})
+
+@router.post("/analysis/{job_id}/append", response_model=AnalysisJob, status_code=status.HTTP_202_ACCEPTED)
+async def append_file(job_id: UUID,
+                      file: UploadFile = File(..., description="The transaction file (CSV, Excel, Parquet or Arrow IPC) to append."),
+                      sheet: Optional[str] = Form(None, description="For Excel files, the worksheet to analyze. Defaults to the active sheet."),
+                      tenant: str = Header("default", alias="X-Tenant-ID", description="The tenant the upload belongs to, for fair scheduling."),
+                      profile: bool = Header(False, alias="X-Profile", description="Record a sampling profile of the job (requires PROFILING_ENABLED).")) -> AnalysisJob:
+    """
+    Appends a new statement to a completed analysis job. Rows the job already contains
+    (same date, description and amount) are skipped, and the job's totals, anomalies,
+    predictions and indexes are updated incrementally from stored running aggregates,
+    so the cost scales with the new rows rather than the whole history.
+    The file is queued and processed asynchronously, like an upload.
+
+    Args:
+        job_id: The unique identifier of the analysis job to append to.
+        file: The uploaded file.
+        sheet: The worksheet to analyze, for Excel files.
+        tenant: The tenant the upload belongs to, taken from the `X-Tenant-ID` header.
+        profile: Whether to profile the job, taken from the `X-Profile` header.
+
+    Returns:
+        The AnalysisJob, with its queue position.
+
+    Raises:
+        HTTPException: If the job is not found (404) or not completed (409), the file type
+            is unsupported (415), or the queue is full (429, with Retry-After).
+    """
+    if not has_extension(file.filename, SUPPORTED_EXTENSIONS):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=UNSUPPORTED_FILE_TYPE_MESSAGE
+        )
+    job = await run_store(job_store.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Analysis not yet completed for this job.")
+
+    return await _enqueue_upload(job, file, sheet, tenant, profile)
+
+async def _enqueue_upload(job: Optional[AnalysisJob], file: UploadFile, sheet: Optional[str], tenant: str,
+                          profile: bool = False, idempotency_key: Optional[str] = None) -> AnalysisJob:
+    """
+    Spools an upload to disk and queues it for processing: appended to `job` if given,
+    otherwise as a new job, created only once the upload has been accepted. With `profile`
+    (and `PROFILING_ENABLED`), the job runs under the sampling profiler.
+
+    New uploads whose idempotency key or content is already registered (see `UploadRegistry`)
+    are attached to the registered job instead of being queued.
+
+    Returns:
+        The job, with its queue position.
+
+    Raises:
+        HTTPException: If the queue is full (429, with Retry-After).
+    """
+    idempotency = upload_registry.idempotency_key(tenant, idempotency_key) if job is None and idempotency_key else None
+    if idempotency is not None:
+        existing = upload_registry.lookup(idempotency)
+        if existing is not None:
+            return _attach(existing, "idempotency_key")
+
+    try:
+        # Reject early, before spooling the upload, when the queue is already full
+        scheduler.check_capacity(tenant)
+        # The upload is closed once the response is sent, so keep a copy for the queued job
+        path, size, digest = await ingestion_service.spool_upload(file)
+        content = None
+        if job is None:
+            if settings.UPLOAD_DEDUP_ENABLED:
+                content = upload_registry.content_key(tenant, digest, file.filename, sheet)
+            # A retry with the same key may have been registered while this one was spooling
+            for key, reason in ((idempotency, "idempotency_key"), (content, "content")):
+                existing = upload_registry.lookup(key) if key is not None else None
+                if existing is not None:
+                    os.remove(path)
+                    upload_registry.register(existing.job_id, idempotency)
+                    return _attach(existing, reason)
+        try:
+            scheduler.check_capacity(tenant)
+        except QueueFullError:
+            os.remove(path)
+            raise
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    append = job is not None
+    if append:
+        # The job's results will no longer match the content it was uploaded with
+        upload_registry.forget_content(job.job_id)
+    else:
+        job = ingestion_service.create_analysis_job()
+        upload_registry.register(job.job_id, idempotency, content)
+
+    async def run() -> None:
+        process = ingestion_service.process_spooled_file(str(job.job_id), path, file.filename, sheet, append=append)
+        if profile and settings.PROFILING_ENABLED:
+            async with profile_store.profile(job.job_id):
+                await process
+        else:
+            await process
+
+    position = scheduler.submit(job.job_id, tenant, size, run,
+                                discard=lambda: ingestion_service.discard_queued(str(job.job_id), [path], append=append))
+    return job.model_copy(update={"queue_position": position})
+
+def _attach(job: AnalysisJob, key: str) -> AnalysisJob:
+    """
+    Returns an existing job as the response to a repeated upload, with its current queue position.
+    """
+    UPLOADS_REUSED.inc(key=key)
+    return job.model_copy(update={"queue_position": scheduler.position(job.job_id), "reused": True})
 
 @router.get("/analysis/{job_id}/status", response_model=AnalysisJob)
 async def get_analysis_status(job_id: UUID) -> AnalysisJob:
     """
-    Retrieves the current status of an analysis job.
+    Retrieves the current status of an analysis job, including its queue position while
+    an upload or append for it is waiting to run.
     
     Args:
         job_id: The unique identifier of the analysis job.
@@ -52,85 +244,347 @@ async def get_analysis_status(job_id: UUID) -> AnalysisJob:
     Raises:
         HTTPException: If the job is not found.
     """
-    job = db.get(job_id)
+    job = await run_store(job_store.get_job, job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    # The position changes as the queue drains, so it is computed on read rather than stored
+    position = scheduler.position(job.job_id)
+    if position is not None:
+        return job.model_copy(update={"queue_position": position})
     return job
 
+@router.get("/analysis/{job_id}/events", response_class=StreamingResponse)
+async def stream_job_events(job_id: UUID) -> StreamingResponse:
+    """
+    Streams a job's status transitions and progress as server-sent events, instead of
+    polling `/analysis/{job_id}/status`. The stream starts with the job's current status
+    and ends once the job has completed or failed (with no append queued for it).
+
+    Events:
+        status: The job's status, error message, skipped duplicates and queue position.
+        progress: While the job runs, its stage, rows parsed and categorized, batches,
+            bytes read and an estimated percent complete.
+
+    A keep-alive comment is sent every `EVENTS_HEARTBEAT_SECONDS` without events.
+
+    Args:
+        job_id: The unique identifier of the analysis job.
+
+    Returns:
+        A `text/event-stream` response.
+
+    Raises:
+        HTTPException: If the job is not found.
+    """
+    if not await run_store(job_store.get_job, job_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+
+    async def stream() -> AsyncIterator[bytes]:
+        # Ask clients to reconnect after a second if the connection drops
+        yield b"retry: 1000\n\n"
+        sequence = 0
+        async for event in watch_job(job_id, settings.EVENTS_HEARTBEAT_SECONDS):
+            if event is None:
+                yield b": keep-alive\n\n"
+                continue
+            sequence += 1
+            event_type, data = event
+            yield b"id: %d\nevent: %s\ndata: %s\n\n" % (sequence, event_type.encode("ascii"), dumps(data))
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/analysis/{job_id}/ws")
+async def job_events_websocket(websocket: WebSocket, job_id: UUID) -> None:
+    """
+    Sends the same events as `/analysis/{job_id}/events` over a WebSocket, as JSON
+    text messages of the form `{"event": "status" | "progress", "data": {...}}`.
+    The server closes the socket once the job has finished, and with code 4404
+    if the job is not found.
+
+    Args:
+        websocket: The client connection.
+        job_id: The unique identifier of the analysis job.
+    """
+    await websocket.accept()
+    if not await run_store(job_store.get_job, job_id):
+        await websocket.close(code=4404, reason="Job not found.")
+        return
+    try:
+        async for event in watch_job(job_id, settings.EVENTS_HEARTBEAT_SECONDS):
+            if event is not None:
+                event_type, data = event
+                await websocket.send_text(dumps({"event": event_type, "data": data}).decode("utf-8"))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
 @router.get("/analysis/{job_id}/transactions", response_model=List[Transaction])
-async def get_categorized_transactions(job_id: UUID) -> List[Transaction]:
+async def get_categorized_transactions(job_id: UUID, request: Request,
+                                       category: Optional[str] = Query(None, description="Only transactions with this category."),
+                                       date_from: Optional[date] = Query(None, description="Only transactions on or after this date."),
+                                       date_to: Optional[date] = Query(None, description="Only transactions on or before this date."),
+                                       min_amount: Optional[float] = Query(None, description="Only transactions with at least this amount."),
+                                       max_amount: Optional[float] = Query(None, description="Only transactions with at most this amount."),
+                                       description: Optional[str] = Query(None, description="Only transactions whose description contains this text (case-insensitive)."),
+                                       sort: Optional[str] = Query(None, pattern="^-?(date|amount)$", description="Sort by 'date' or 'amount'; prefix with '-' for descending. Defaults to file order."),
+                                       cursor: Optional[str] = Query(None, description="The X-Next-Cursor value returned with the previous page."),
+                                       limit: Optional[int] = Query(None, ge=1, le=10000, description="Page size. Defaults to every matching transaction.")) -> Response:
     """
-    Retrieves the categorized transactions for a completed analysis job.
+    Retrieves the categorized transactions for a completed analysis job, optionally
+    filtered, sorted and paginated. Queries are answered from indexes built when
+    the analysis completed, so a page costs about its own size rather than the job's.
+    When more transactions match, the cursor for the next page is returned in the
+    `X-Next-Cursor` response header.
+
+    The unfiltered list is serialized once and served from cached bytes, with an
+    ETag for conditional requests and precompressed variants.
     
     Args:
         job_id: The unique identifier of the analysis job.
+        request: The incoming request, for conditional and compressed responses.
+        category: Only transactions with this category.
+        date_from: Only transactions on or after this date.
+        date_to: Only transactions on or before this date.
+        min_amount: Only transactions with at least this amount.
+        max_amount: Only transactions with at most this amount.
+        description: Only transactions whose description contains this text.
+        sort: The sort order.
+        cursor: The cursor of the page to return.
+        limit: The page size.
         
     Returns:
-        A list of Transaction objects with assigned categories.
+        A JSON list of Transaction objects with assigned categories.
         
     Raises:
-        HTTPException: If the job is not found, not completed, or transactions are unavailable.
+        HTTPException: If the job is not found, not completed, or transactions are unavailable,
+            or if the cursor is invalid.
     """
-    job = db.get(job_id)
+    job = await run_store(job_store.get_job, job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
     if job.status != JobStatus.COMPLETED:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Analysis not yet completed for this job.")
+
+    filters = (category, date_from, date_to, min_amount, max_amount, description, sort, cursor, limit)
+    if all(value is None for value in filters):
+        cached = await result_cache.get(job_id, job.results_version, "transactions", lambda: job_store.get_results(job_id))
+        if cached is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categorized transactions not found for this job.")
+        return cached.to_response(request)
     
-    results = results_db.get(job_id)
-    if not results or "categorized_transactions" not in results:
+    # Only the transactions and their index are loaded, not the insights, predictions or cube
+    stored = await index_cache.get(job_id, job.results_version, lambda: job_store.get_index(job_id))
+    if stored is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categorized transactions not found for this job.")
     
-    return results["categorized_transactions"]
+    batch, index = stored
+    try:
+        rows, next_cursor = index.query(
+            batch, category=category, date_from=date_from, date_to=date_to,
+            min_amount=min_amount, max_amount=max_amount, description=description,
+            sort=sort, cursor=cursor, limit=limit,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Transactions are stored in columnar form; encode only the requested page
+    response = Response(content=dumps(batch.to_records(rows)), media_type="application/json")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+@router.get("/analysis/{job_id}/export", response_class=StreamingResponse,
+            responses={200: {"content": {media_type: {} for media_type in EXPORT_FORMATS.values()}}})
+async def export_transactions(job_id: UUID, request: Request,
+                              format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="'ndjson' (one Transaction per line) or 'csv'.")) -> StreamingResponse:
+    """
+    Streams every categorized transaction of a completed analysis job, in file order,
+    as NDJSON or CSV. The export is encoded in chunks while it is sent, so the first
+    bytes go out immediately and memory use does not depend on the job's size. The
+    stream is gzip-compressed on the fly when the client accepts it.
+
+    Args:
+        job_id: The unique identifier of the analysis job.
+        request: The incoming request, for `Accept-Encoding`.
+        format: The export format.
+
+    Returns:
+        A chunked response, offered as a file download.
+
+    Raises:
+        HTTPException: If the job is not found, not completed, or transactions are unavailable.
+    """
+    job = await run_store(job_store.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Analysis not yet completed for this job.")
+
+    batch = await run_store(job_store.get_transactions, job_id)
+    if batch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categorized transactions not found for this job.")
+
+    # A plain generator: Starlette iterates it in a worker thread, off the event loop
+    chunks = iter_export(batch, format, settings.EXPORT_CHUNK_ROWS)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{job_id}.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in accepted_encodings(request.headers.get("accept-encoding")):
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[format], headers=headers)
+
+@router.get("/analysis/{job_id}/summary", response_model=List[SummaryRow])
+async def get_transaction_summary(job_id: UUID,
+                                  bucket: str = Query("month", pattern="^(day|week|month|quarter|year|all)$", description="The time bucket: 'day', 'week' (starting Monday), 'month', 'quarter', 'year', or 'all' for the whole date range."),
+                                  by_category: bool = Query(True, description="Whether each time bucket is broken down by category."),
+                                  category: Optional[str] = Query(None, description="Only transactions with this category."),
+                                  date_from: Optional[date] = Query(None, description="Only transactions on or after this date."),
+                                  date_to: Optional[date] = Query(None, description="Only transactions on or before this date.")) -> Response:
+    """
+    Summarizes the categorized transactions of a completed analysis job by time bucket
+    and category: the count, sum, minimum, maximum and mean of the amounts of each group.
+    Summaries are answered from the day x category rollup cube built when the analysis
+    completed, so their cost depends on the number of non-empty cells, not on the
+    number of transactions.
+
+    Args:
+        job_id: The unique identifier of the analysis job.
+        bucket: The time bucket.
+        by_category: Whether to group by category within each bucket.
+        category: Only transactions with this category.
+        date_from: Only transactions on or after this date.
+        date_to: Only transactions on or before this date.
+
+    Returns:
+        A JSON list of SummaryRow objects, ordered by period and then category.
+
+    Raises:
+        HTTPException: If the job is not found, not completed, or its results are unavailable.
+    """
+    job = await run_store(job_store.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Analysis not yet completed for this job.")
+
+    # Only the cube is loaded, so the cost does not depend on the number of transactions
+    rollup = await run_store(job_store.get_rollup, job_id)
+    if rollup is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction summary not found for this job.")
+
+    rows = rollup.query(bucket=bucket, by_category=by_category, category=category,
+                        date_from=date_from, date_to=date_to)
+    return Response(content=dumps(rows), media_type="application/json")
 
 @router.get("/analysis/{job_id}/insights", response_model=List[Insight])
-async def get_financial_insights(job_id: UUID) -> List[Insight]:
+async def get_financial_insights(job_id: UUID, request: Request) -> Response:
     """
     Retrieves AI-generated insights (spending patterns, anomalies) for a completed analysis job.
+    The insights are served from bytes serialized once, with an ETag for conditional requests.
     
     Args:
         job_id: The unique identifier of the analysis job.
+        request: The incoming request, for conditional and compressed responses.
         
     Returns:
-        A list of Insight objects.
+        A JSON list of Insight objects.
         
     Raises:
         HTTPException: If the job is not found, not completed, or insights are unavailable.
     """
-    job = db.get(job_id)
+    job = await run_store(job_store.get_job, job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
     if job.status != JobStatus.COMPLETED:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Analysis not yet completed for this job.")
     
-    results = results_db.get(job_id)
-    if not results or "insights" not in results:
+    cached = await result_cache.get(job_id, job.results_version, "insights", lambda: job_store.get_results(job_id))
+    if cached is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Insights not found for this job.")
     
-    return results["insights"]
+    return cached.to_response(request)
 
 @router.get("/analysis/{job_id}/predictions", response_model=List[Prediction])
-async def get_spending_predictions(job_id: UUID) -> List[Prediction]:
+async def get_spending_predictions(job_id: UUID, request: Request) -> Response:
     """
     Retrieves future spending predictions for a completed analysis job.
+    The predictions are served from bytes serialized once, with an ETag for conditional requests.
     
     Args:
         job_id: The unique identifier of the analysis job.
+        request: The incoming request, for conditional and compressed responses.
         
     Returns:
-        A list of Prediction objects.
+        A JSON list of Prediction objects.
         
     Raises:
         HTTPException: If the job is not found, not completed, or predictions are unavailable.
     """
-    job = db.get(job_id)
+    job = await run_store(job_store.get_job, job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
     if job.status != JobStatus.COMPLETED:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Analysis not yet completed for this job.")
     
-    results = results_db.get(job_id)
-    if not results or "predictions" not in results:
+    cached = await result_cache.get(job_id, job.results_version, "predictions", lambda: job_store.get_results(job_id))
+    if cached is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Predictions not found for this job.")
     
-    return results["predictions"]
+    return cached.to_response(request)
+
+@router.get("/categorization/cache")
+async def get_categorization_cache_stats() -> Dict[str, float]:
+    """
+    Retrieves the categorization cache counters, including an estimate of the
+    model inference time saved by cache hits.
+
+    Returns:
+        A dictionary of cache hit/miss counters and sizes.
+    """
+    return categorizer.stats()
+
+@router.get("/results/cache")
+async def get_result_cache_stats() -> Dict[str, int]:
+    """
+    Retrieves the pre-serialized result cache counters.
+
+    Returns:
+        A dictionary of hit/miss counters and sizes.
+    """
+    return result_cache.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> Response:
+    """
+    Exposes the process's metrics in the Prometheus text format: per-stage job timings,
+    row, categorization, model token and error counters, and queue, in-flight job and
+    storage gauges.
+
+    Returns:
+        The metrics, as `text/plain; version=0.0.4`.
+    """
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/analysis/{job_id}/profile", response_class=PlainTextResponse)
+async def get_job_profile(job_id: UUID) -> PlainTextResponse:
+    """
+    Retrieves the sampling profile of a job uploaded with the `X-Profile: true` header
+    while `PROFILING_ENABLED` is set. Profiles are kept in memory by the server process
+    that ran the job, for the most recent `PROFILING_MAX_PROFILES` jobs.
+
+    Args:
+        job_id: The unique identifier of the analysis job.
+
+    Returns:
+        The sampled stacks in collapsed format ("frame;frame;frame count"), for
+        flamegraph.pl or speedscope.
+
+    Raises:
+        HTTPException: If no profile was recorded for the job (404).
+    """
+    profile = profile_store.get(job_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No profile recorded for this job.")
+    return PlainTextResponse(profile)
@@ -10,4 +10,151 @@ class Settings:
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY")
     """The API key for the Groq service."""
 
+    GROQ_MAX_CONCURRENCY: int = int(os.getenv("GROQ_MAX_CONCURRENCY", 4))
+    """Maximum number of categorization requests in flight at once."""
+
+    GROQ_REQUESTS_PER_MINUTE: int = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30))
+    """Rate limit for categorization requests. Zero disables the limit."""
+
+    GROQ_BATCH_INPUT_TOKENS: int = int(os.getenv("GROQ_BATCH_INPUT_TOKENS", 2000))
+    """Estimated prompt tokens of descriptions sent per categorization request."""
+
+    GROQ_MAX_OUTPUT_TOKENS: int = int(os.getenv("GROQ_MAX_OUTPUT_TOKENS", 1024))
+    """Output token budget per categorization request; also caps the items per request."""
+
+    GROQ_MAX_RETRIES: int = int(os.getenv("GROQ_MAX_RETRIES", 3))
+    """Number of times a failed categorization request is retried."""
+
+    GROQ_RETRY_BASE_DELAY: float = float(os.getenv("GROQ_RETRY_BASE_DELAY", 1.0))
+    """Initial backoff delay in seconds; doubled on each retry."""
+
+    GROQ_BASE_URL: str = os.getenv("GROQ_BASE_URL", "")
+    """Base URL of the Groq API, for instance a local stand-in server. Empty uses the SDK's default."""
+
+    GROQ_MAX_CONNECTIONS: int = int(os.getenv("GROQ_MAX_CONNECTIONS", 20))
+    """Maximum number of open connections in the Groq client's pool."""
+
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", 10))
+    """Maximum number of idle connections kept alive for reuse."""
+
+    GROQ_KEEPALIVE_EXPIRY: float = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", 30.0))
+    """Seconds an idle connection is kept before it is closed."""
+
+    GROQ_CONNECT_TIMEOUT: float = float(os.getenv("GROQ_CONNECT_TIMEOUT", 5.0))
+    """Seconds allowed to establish a connection to the Groq API."""
+
+    GROQ_REQUEST_TIMEOUT: float = float(os.getenv("GROQ_REQUEST_TIMEOUT", 60.0))
+    """Seconds allowed for reading, writing and acquiring a pooled connection per request."""
+
+    INGEST_CHUNK_SIZE: int = int(os.getenv("INGEST_CHUNK_SIZE", 1024 * 1024))
+    """Number of bytes read from an uploaded file at a time when streaming it."""
+
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", 2000))
+    """Number of parsed transactions handed to the analysis stage per batch."""
+
+    INGEST_DAY_FIRST: bool = os.getenv("INGEST_DAY_FIRST", "false").lower() == "true"
+    """Whether ambiguous text dates such as 03/04/2024 are read day first, when no date of the file has a day above 12."""
+
+    ANALYSIS_MAX_INFLIGHT_BATCHES: int = int(os.getenv("ANALYSIS_MAX_INFLIGHT_BATCHES", 4))
+    """Maximum number of batches being categorized while the upload is still being read."""
+
+    CATEGORY_CACHE_PATH: str = os.getenv("CATEGORY_CACHE_PATH", "category_cache.sqlite3")
+    """SQLite file backing the categorization cache. Set to an empty string for a memory-only cache."""
+
+    CATEGORY_CACHE_MAX_BYTES: int = int(os.getenv("CATEGORY_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+    """Approximate memory budget of the in-process categorization cache."""
+
+    LOCAL_CATEGORIZER_ENABLED: bool = os.getenv("LOCAL_CATEGORIZER_ENABLED", "true").lower() == "true"
+    """Whether the offline categorizer answers confident cases before the model is called."""
+
+    LOCAL_CATEGORIZER_TFIDF: bool = os.getenv("LOCAL_CATEGORIZER_TFIDF", "true").lower() == "true"
+    """Whether the offline categorizer uses a nearest-neighbour model trained on past model labels."""
+
+    LOCAL_CATEGORIZER_THRESHOLD: float = float(os.getenv("LOCAL_CATEGORIZER_THRESHOLD", 0.8))
+    """Minimum confidence for an offline prediction; anything below is sent to the model."""
+
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "memory")
+    """Job and result store: 'memory' (single process) or 'sqlite' (shared by workers on one host)."""
+
+    STORAGE_PATH: str = os.getenv("STORAGE_PATH", "jobs.sqlite3")
+    """SQLite file used by the 'sqlite' storage backend."""
+
+    STORAGE_TTL_SECONDS: float = float(os.getenv("STORAGE_TTL_SECONDS", 24 * 60 * 60))
+    """How long jobs and their results are kept after their last update."""
+
+    STORAGE_MAX_BYTES: int = int(os.getenv("STORAGE_MAX_BYTES", 512 * 1024 * 1024))
+    """Approximate memory budget for results in the 'memory' storage backend."""
+
+    PROCESS_POOL_WORKERS: int = int(os.getenv("PROCESS_POOL_WORKERS", os.cpu_count() or 1))
+    """Worker processes for CPU-bound parsing and analysis. Zero runs that work in threads instead."""
+
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+    """Approximate memory budget for pre-serialized result responses."""
+
+    INDEX_CACHE_MAX_BYTES: int = int(os.getenv("INDEX_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    """Approximate memory budget for deserialized transaction indexes, with the 'sqlite' storage backend."""
+
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+    """Minimum size of a cached response body before precompressed variants are stored."""
+
+    SCHEDULER_WORKERS: int = int(os.getenv("SCHEDULER_WORKERS", 2))
+    """Number of analysis jobs processed concurrently; further uploads wait in the queue."""
+
+    SCHEDULER_MAX_QUEUE: int = int(os.getenv("SCHEDULER_MAX_QUEUE", 100))
+    """Maximum number of queued analysis jobs before uploads are rejected with 429."""
+
+    SCHEDULER_MAX_QUEUE_PER_TENANT: int = int(os.getenv("SCHEDULER_MAX_QUEUE_PER_TENANT", 20))
+    """Maximum number of queued analysis jobs per tenant (the `X-Tenant-ID` header)."""
+
+    SCHEDULER_AGING_SECONDS: float = float(os.getenv("SCHEDULER_AGING_SECONDS", 30))
+    """Queued time after which a large file is promoted one size class, so it is not starved by smaller ones."""
+
+    UPLOAD_DEDUP_ENABLED: bool = os.getenv("UPLOAD_DEDUP_ENABLED", "true").lower() == "true"
+    """Whether an upload with the same content as a queued, running or completed job of the tenant attaches to that job."""
+
+    UPLOAD_DEDUP_MAX_ENTRIES: int = int(os.getenv("UPLOAD_DEDUP_MAX_ENTRIES", 10000))
+    """Maximum number of upload content hashes and idempotency keys remembered per process."""
+
+    EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", 5000))
+    """Number of transactions encoded per chunk of a streamed export."""
+
+    BATCH_MAX_FILES: int = int(os.getenv("BATCH_MAX_FILES", 500))
+    """Maximum number of files in a batch upload, counting the members of ZIP archives."""
+
+    BATCH_MAX_PARALLEL_FILES: int = int(os.getenv("BATCH_MAX_PARALLEL_FILES", 8))
+    """Number of files of a batch upload processed at once."""
+
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+    """Longest silence on a job event stream before a keep-alive is sent and the job's stored status re-read."""
+
+    ANOMALY_SENSITIVITY: float = float(os.getenv("ANOMALY_SENSITIVITY", 3.5))
+    """Minimum anomaly score (a robust z-score) for a transaction to be reported. Lower values report more anomalies."""
+
+    ANOMALY_MIN_AMOUNT: float = float(os.getenv("ANOMALY_MIN_AMOUNT", 100))
+    """Transactions below this amount are never reported as anomalies."""
+
+    ANOMALY_MIN_SAMPLES: int = int(os.getenv("ANOMALY_MIN_SAMPLES", 8))
+    """Transactions a category (or one of its weekdays) needs before it gets its own baseline."""
+
+    ANOMALY_ROLLING_WINDOW: int = int(os.getenv("ANOMALY_ROLLING_WINDOW", 30))
+    """Number of preceding transactions in a category's rolling baseline."""
+
+    ANOMALY_HISTORY_SIZE: int = int(os.getenv("ANOMALY_HISTORY_SIZE", 1000))
+    """Recent expenses kept per category, so appended transactions are scored against the job's history."""
+
+    ANOMALY_MAX_INSIGHTS: int = int(os.getenv("ANOMALY_MAX_INSIGHTS", 50))
+    """Maximum number of anomalies reported per upload, highest scores first."""
+
+    FORECAST_HORIZON_MONTHS: int = int(os.getenv("FORECAST_HORIZON_MONTHS", 3))
+    """Number of months after a job's history covered by spending predictions."""
+
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    """Whether uploads may request a sampling profile of their job with the `X-Profile` header."""
+
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", 5))
+    """Milliseconds between stack samples while a job is profiled."""
+
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", 20))
+    """Number of job profiles kept in memory; the oldest are dropped first."""
+
 settings = Settings()
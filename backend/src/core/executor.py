@@ -0,0 +1,55 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from src.core.config import settings
+
+T = TypeVar("T")
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Returns the shared process pool for CPU-bound work, creating it on first use.
+
+    Workers are started with the 'spawn' method so they never inherit the server's
+    threads, sockets or open database connections.
+
+    Returns:
+        The process pool, or None if `PROCESS_POOL_WORKERS` is 0.
+    """
+    global _process_pool
+    if _process_pool is None and settings.PROCESS_POOL_WORKERS > 0:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.PROCESS_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+async def run_cpu_bound(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Runs a CPU-bound function off the event loop: in the process pool when one is
+    configured, otherwise in a worker thread.
+
+    Args:
+        fn: A module-level (picklable) function.
+        *args: Picklable arguments for `fn`.
+
+    Returns:
+        The function's result.
+    """
+    pool = get_process_pool()
+    if pool is None:
+        return await asyncio.to_thread(fn, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(fn, *args))
+
+def shutdown_process_pool() -> None:
+    """
+    Shuts down the process pool, if it was started.
+    """
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
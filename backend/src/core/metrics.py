@@ -0,0 +1,244 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are registered once at import time and updated
+from the request path and the background jobs; `registry.render()` produces the
+body of the `/metrics` endpoint. Values are per process: with several server
+workers, each one is scraped separately (or aggregated by the scraper).
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+"""Histogram bucket bounds in seconds, from a millisecond to five minutes."""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    """
+    Base class of a named metric family with an optional set of label names.
+    """
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """
+        Returns (name suffix, formatted labels, value) for every sample of the family.
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, for instance of processed rows.
+    """
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increments the counter of the given label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """
+        Returns the current count of the given label values.
+        """
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            return [("_total", _format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down, either set explicitly or read from a function at scrape time.
+    """
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """
+        Reads the gauge's value from `function` whenever metrics are rendered.
+        """
+        self._function = function
+
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._value
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [("", "", self.value())]
+
+
+class Histogram(_Metric):
+    """
+    A distribution of observed values in cumulative buckets, with their count and sum.
+    """
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: bucket counts (the last one is +Inf), count and sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Records one observation for the given label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Observes the wall time of the enclosed block, in seconds, even if it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        """
+        Returns the number of observations for the given label values.
+        """
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            return sum(values[0]) if values else 0
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                    samples.append(("_bucket", labels, cumulative))
+                labels = _format_labels(self.labelnames, key)
+                samples.append(("_count", labels, cumulative))
+                samples.append(("_sum", labels, total[0]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    The set of metric families exposed by the process.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "finance_analyzer_http_request_duration_seconds", "Time to handle HTTP requests, by route template.",
+    ["method", "route", "status"])
+JOB_STAGE_SECONDS = registry.histogram(
+    "finance_analyzer_job_stage_seconds",
+    "Wall time of each stage of background jobs: read, decode, parse, categorize, llm, analysis, index, store, serialize.",
+    ["stage"])
+JOB_SECONDS = registry.histogram(
+    "finance_analyzer_job_duration_seconds", "Wall time of background jobs, from start to completion.", ["kind", "status"])
+JOBS = registry.counter("finance_analyzer_jobs", "Background jobs finished, by kind (upload, append) and status.", ["kind", "status"])
+ROWS_PROCESSED = registry.counter("finance_analyzer_rows_processed", "Transactions analyzed, by job kind.", ["kind"])
+UPLOADS_REUSED = registry.counter(
+    "finance_analyzer_uploads_reused", "Uploads attached to an existing job, by the key that matched (content, idempotency_key).", ["key"])
+DUPLICATE_ROWS = registry.counter("finance_analyzer_duplicate_rows", "Appended transactions skipped because the job already held them.")
+CATEGORIZATIONS = registry.counter(
+    "finance_analyzer_categorizations",
+    "Distinct merchant keys categorized, by source: cache, local, model, shared with a concurrent request, or fallback when the model did not answer.", ["source"])
+LLM_REQUESTS = registry.counter("finance_analyzer_llm_requests", "Categorization requests sent to the model, by outcome.", ["outcome"])
+LLM_TOKENS = registry.counter("finance_analyzer_llm_tokens", "Model tokens used, by kind (prompt, completion).", ["kind"])
+LLM_REQUEST_SECONDS = registry.histogram("finance_analyzer_llm_request_duration_seconds", "Latency of single model requests.")
+ERRORS = registry.counter("finance_analyzer_errors", "Errors, by the stage where they occurred.", ["stage"])
+QUEUE_DEPTH = registry.gauge("finance_analyzer_scheduler_queue_depth", "Jobs waiting in the scheduler queue.")
+JOBS_IN_FLIGHT = registry.gauge("finance_analyzer_jobs_in_flight", "Jobs currently being processed.")
+STORAGE_BYTES = registry.gauge("finance_analyzer_job_store_bytes", "Approximate bytes used by stored job results.")
+STORED_JOBS = registry.gauge("finance_analyzer_job_store_jobs", "Jobs held by the job store.")
+EVENT_SUBSCRIBERS = registry.gauge("finance_analyzer_event_subscribers", "Open job event streams (server-sent events and WebSockets).")
+RESULT_CACHE_BYTES = registry.gauge("finance_analyzer_result_cache_bytes", "Bytes held by pre-serialized result responses.")
+INDEX_CACHE_BYTES = registry.gauge("finance_analyzer_index_cache_bytes", "Bytes held by deserialized transaction indexes.")
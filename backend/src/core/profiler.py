@@ -0,0 +1,111 @@
+"""
+Opt-in sampling profiler for investigating where a job spends its time.
+
+While a job is profiled, a background thread samples the Python stacks of
+every thread in the process at a fixed interval and counts identical stacks.
+Profiles are kept in memory per job and rendered in the collapsed-stack format
+("frame;frame;frame count") understood by flamegraph.pl and speedscope.
+
+Sampling is process-wide: work of other jobs running at the same time appears
+in the profile too. Idle threads are skipped, so stages running in the process
+pool do not appear; their wall time is in the job stage metrics instead.
+"""
+import os
+import sys
+import threading
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from uuid import UUID
+
+from src.core.config import settings
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads from a background thread until stopped.
+    """
+    def __init__(self, interval: float):
+        """
+        Initializes the profiler.
+
+        Args:
+            interval: Seconds between samples.
+        """
+        self.interval = interval
+        self.stacks: "Counter[str]" = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """
+        Returns the sampled stacks in collapsed format, most frequent first.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self) -> None:
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                # Threads parked with nothing to do would drown out the work being profiled
+                if frames and frames[0].startswith(("wait (", "select (", "_worker (thread.py")):
+                    continue
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+
+class ProfileStore:
+    """
+    Keeps the profiles of the most recently profiled jobs.
+    """
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[UUID, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id: UUID) -> Optional[str]:
+        """
+        Returns a job's profile in collapsed-stack format, or None if it was not profiled.
+        """
+        with self._lock:
+            return self._profiles.get(job_id)
+
+    def put(self, job_id: UUID, profile: str) -> None:
+        with self._lock:
+            self._profiles.pop(job_id, None)
+            self._profiles[job_id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    @asynccontextmanager
+    async def profile(self, job_id: UUID) -> AsyncIterator[None]:
+        """
+        Profiles the enclosed block and stores the result under `job_id`.
+        """
+        profiler = SamplingProfiler(settings.PROFILING_INTERVAL_MS / 1000)
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            self.put(job_id, profiler.collapsed())
+
+
+profile_store = ProfileStore(settings.PROFILING_MAX_PROFILES)
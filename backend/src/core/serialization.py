@@ -0,0 +1,89 @@
+"""
+Fast JSON encoding and response compression shared by the API and the process pool workers.
+
+orjson and zstandard are optional: without orjson the standard library encoder is
+used, and without zstandard only gzip variants are produced.
+"""
+import gzip
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError: # Optional dependency
+    orjson = None
+
+try:
+    import zstandard
+except ImportError: # Optional dependency
+    zstandard = None
+
+from src.core.config import settings
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encodes JSON-compatible data (dicts, lists, strings, numbers, booleans, None) as compact UTF-8 JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """
+    Precompresses a response body for each supported content encoding.
+
+    Args:
+        body: The uncompressed body.
+
+    Returns:
+        A mapping of content encoding ('gzip', and 'zstd' when available) to the
+        compressed body. Empty if the body is below `RESPONSE_COMPRESSION_MIN_BYTES`.
+    """
+    if len(body) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+        return {}
+    variants = {"gzip": gzip.compress(body, compresslevel=6, mtime=0)}
+    if zstandard is not None:
+        variants["zstd"] = zstandard.ZstdCompressor(level=3).compress(body)
+    return variants
+
+def accepted_encodings(header: Optional[str]) -> set:
+    """
+    Parses an Accept-Encoding header into the set of encodings not refused with q=0.
+    """
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compresses a stream of chunks into a single gzip stream, chunk by chunk.
+
+    Each input chunk is flushed, so the client can decode everything sent so far
+    and the first bytes go out without waiting for the compressor's window to fill.
+
+    Args:
+        chunks: The uncompressed chunks.
+        level: The compression level, from 1 (fastest) to 9 (smallest).
+
+    Yields:
+        Compressed chunks; together they form one gzip member.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def content_hash(body: bytes) -> str:
+    """
+    Returns a short, stable digest of a body, used to build strong ETags.
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
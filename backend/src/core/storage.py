@@ -1,13 +1,436 @@
-from typing import Dict, Any
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 from uuid import UUID
-from src.models.schemas import AnalysisJob, Transaction, Insight, Prediction
+from src.core.config import settings
+from src.core.metrics import STORAGE_BYTES, STORED_JOBS
+from src.models.aggregates import RunningAggregates
+from src.models.batch import TransactionBatch
+from src.models.index import TransactionIndex
+from src.models.rollup import RollupCube
+from src.models.schemas import AnalysisJob, Insight, JobStatus, Prediction
 
-# This is a simple in-memory "database" for demonstration purposes.
-# In a production environment, you would use a real database like PostgreSQL,
-# a key-value store like Redis, or a dedicated job queue system.
-db: Dict[UUID, AnalysisJob] = {}
-"""In-memory storage for AnalysisJob objects, keyed by job_id."""
+# Rough serialized size of one insight or prediction, used for the in-memory byte budget
+_APPROX_RESULT_ITEM_BYTES = 300
 
-# We will also store results here, keyed by job_id
-results_db: Dict[UUID, Dict[str, Any]] = {}
-"""In-memory storage for analysis results (transactions, insights, predictions), keyed by job_id."""
+# Job statuses whose jobs may be evicted to stay within the in-memory byte budget
+_FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+# SQLite tables holding a job's results, which expire together with the job's row
+_RESULT_TABLES = ("results", "transaction_indexes", "rollups", "aggregates")
+
+T = TypeVar("T")
+
+
+class JobStore(ABC):
+    """
+    Storage backend for analysis jobs and their results.
+
+    Results are a dictionary with the categorized `TransactionBatch` under
+    "categorized_transactions", its `TransactionIndex` under "transaction_index",
+    its `RollupCube` under "rollup", its `RunningAggregates` under "aggregates", and
+    lists of Insight and Prediction objects under "insights" and "predictions".
+
+    Queries that need only part of the results use the narrow accessors (`get_transactions`,
+    `get_index`, `get_rollup`), which backends that deserialize on read override to load
+    only what is asked for.
+    """
+    persistent: bool = False
+    """Whether calls may block on disk, so that async code should make them through `run_store`."""
+
+    @abstractmethod
+    def get_job(self, job_id: UUID) -> Optional[AnalysisJob]:
+        """
+        Returns the job with the given ID, or None if it does not exist or has expired.
+        """
+
+    @abstractmethod
+    def save_job(self, job: AnalysisJob) -> None:
+        """
+        Creates or updates a job.
+        """
+
+    @abstractmethod
+    def get_results(self, job_id: UUID) -> Optional[Dict[str, Any]]:
+        """
+        Returns the analysis results of a job, or None if there are none.
+        """
+
+    def get_transactions(self, job_id: UUID) -> Optional[TransactionBatch]:
+        """
+        Returns the categorized transactions of a job, or None if there are no results.
+        """
+        results = self.get_results(job_id)
+        return results["categorized_transactions"] if results else None
+
+    def get_index(self, job_id: UUID) -> Optional[Tuple[TransactionBatch, TransactionIndex]]:
+        """
+        Returns the categorized transactions of a job and their query index, or None if there are no results.
+        """
+        results = self.get_results(job_id)
+        return (results["categorized_transactions"], results["transaction_index"]) if results else None
+
+    def get_rollup(self, job_id: UUID) -> Optional[RollupCube]:
+        """
+        Returns the rollup cube of a job's transactions, or None if there are no results.
+        """
+        results = self.get_results(job_id)
+        return results["rollup"] if results else None
+
+    @abstractmethod
+    def save_results(self, job_id: UUID, results: Dict[str, Any]) -> None:
+        """
+        Stores the analysis results of a job.
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of stored jobs and the approximate bytes used by results.
+        """
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Process-local store that keeps jobs and results as live objects.
+
+    Entries expire `ttl_seconds` after their last update, and the least recently
+    used completed or failed jobs are evicted, together with their results, whenever
+    the estimated size of all stored results exceeds `max_bytes`. Queued and running
+    jobs are never evicted.
+    """
+    _PURGE_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        """
+        Initializes the store.
+
+        Args:
+            ttl_seconds: Lifetime of a job and its results after their last update.
+            max_bytes: Approximate memory budget for stored results.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._jobs: "OrderedDict[UUID, Tuple[AnalysisJob, float]]" = OrderedDict()
+        self._results: Dict[UUID, Tuple[Dict[str, Any], int]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def get_job(self, job_id: UUID) -> Optional[AnalysisJob]:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return None
+            job, expires_at = entry
+            if expires_at < time.monotonic():
+                self._evict(job_id)
+                return None
+            self._jobs.move_to_end(job_id)
+            return job
+
+    def save_job(self, job: AnalysisJob) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = (job, time.monotonic() + self.ttl_seconds)
+            self._jobs.move_to_end(job.job_id)
+            self._purge_expired()
+
+    def get_results(self, job_id: UUID) -> Optional[Dict[str, Any]]:
+        if self.get_job(job_id) is None:
+            return None
+        with self._lock:
+            entry = self._results.get(job_id)
+            return entry[0] if entry else None
+
+    def save_results(self, job_id: UUID, results: Dict[str, Any]) -> None:
+        size = results["categorized_transactions"].nbytes + results["transaction_index"].nbytes + results["aggregates"].nbytes
+        size += results["rollup"].nbytes
+        size += (len(results["insights"]) + len(results["predictions"])) * _APPROX_RESULT_ITEM_BYTES
+        with self._lock:
+            previous = self._results.pop(job_id, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._results[job_id] = (results, size)
+            self._size += size
+            # Evict the results of least recently used finished jobs, never the one just stored.
+            # Queued and running jobs hold no results (or are being appended to), so dropping them frees nothing.
+            for old_job_id, (old_job, _) in list(self._jobs.items()):
+                if self._size <= self.max_bytes:
+                    break
+                if old_job_id != job_id and old_job_id in self._results and old_job.status in _FINISHED_STATUSES:
+                    self._evict(old_job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"jobs": len(self._jobs), "result_bytes": self._size}
+
+    def _purge_expired(self) -> None:
+        """
+        Drops expired jobs, at most once per purge interval. Must be called with the lock held.
+        """
+        now = time.monotonic()
+        if now - self._last_purge < self._PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        for job_id, (_, expires_at) in list(self._jobs.items()):
+            if expires_at < now:
+                self._evict(job_id)
+
+    def _evict(self, job_id: UUID) -> None:
+        """
+        Removes a job and its results. Must be called with the lock held.
+        """
+        self._jobs.pop(job_id, None)
+        entry = self._results.pop(job_id, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Store backed by a SQLite database in WAL mode, shared by every worker process
+    on the host that points at the same file.
+
+    Transactions are stored as compressed columnar blobs (see `TransactionBatch.to_bytes`),
+    their query indexes, rollup cubes and running aggregates as raw arrays (see `TransactionIndex.to_bytes`,
+    `RollupCube.to_bytes` and `RunningAggregates.to_bytes`), and insights and predictions as compressed JSON. Expired rows are ignored on
+    read and purged periodically on write.
+    """
+    persistent = True
+    _PURGE_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, path: str, ttl_seconds: float):
+        """
+        Initializes the store, creating its tables if needed.
+
+        Args:
+            path: Path of the SQLite database file.
+            ttl_seconds: Lifetime of a job and its results after their last update.
+        """
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                job_id TEXT PRIMARY KEY,
+                transactions BLOB NOT NULL,
+                insights BLOB NOT NULL,
+                predictions BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS transaction_indexes (
+                job_id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS aggregates (
+                job_id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rollups (
+                job_id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def get_job(self, job_id: UUID) -> Optional[AnalysisJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM jobs WHERE job_id = ? AND expires_at >= ?", (str(job_id), time.time())
+            ).fetchone()
+        return AnalysisJob.model_validate_json(row[0]) if row else None
+
+    def save_job(self, job: AnalysisJob) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, expires_at) VALUES (?, ?, ?)",
+                (str(job.job_id), job.model_dump_json(), expires_at),
+            )
+            # The job's results live as long as the job, so a status update keeps them too
+            for table in _RESULT_TABLES:
+                self._conn.execute(f"UPDATE {table} SET expires_at = ? WHERE job_id = ?", (expires_at, str(job.job_id)))
+            self._purge_expired()
+            self._conn.commit()
+
+    def get_results(self, job_id: UUID) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT transactions, insights, predictions FROM results WHERE job_id = ? AND expires_at >= ?",
+                (str(job_id), time.time()),
+            ).fetchone()
+            index_row = self._conn.execute(
+                "SELECT data FROM transaction_indexes WHERE job_id = ?", (str(job_id),)
+            ).fetchone()
+            aggregates_row = self._conn.execute(
+                "SELECT data FROM aggregates WHERE job_id = ?", (str(job_id),)
+            ).fetchone()
+            rollup_row = self._conn.execute(
+                "SELECT data FROM rollups WHERE job_id = ?", (str(job_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        transactions, insights, predictions = row
+        batch = TransactionBatch.from_bytes(transactions)
+        if aggregates_row:
+            aggregates = RunningAggregates.from_bytes(aggregates_row[0])
+        else:
+            aggregates = RunningAggregates.empty()
+            aggregates.update(batch)
+        return {
+            "categorized_transactions": batch,
+            # Results stored before indexes, cubes and aggregates were persisted get them rebuilt on read
+            "transaction_index": TransactionIndex.from_bytes(index_row[0]) if index_row else TransactionIndex.build(batch),
+            "rollup": RollupCube.from_bytes(rollup_row[0]) if rollup_row else RollupCube.build(batch),
+            "aggregates": aggregates,
+            "insights": [Insight.model_validate(item) for item in json.loads(zlib.decompress(insights))],
+            "predictions": [Prediction.model_validate(item) for item in json.loads(zlib.decompress(predictions))],
+        }
+
+    def get_transactions(self, job_id: UUID) -> Optional[TransactionBatch]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT transactions FROM results WHERE job_id = ? AND expires_at >= ?", (str(job_id), time.time())
+            ).fetchone()
+        return TransactionBatch.from_bytes(row[0]) if row else None
+
+    def get_index(self, job_id: UUID) -> Optional[Tuple[TransactionBatch, TransactionIndex]]:
+        batch = self.get_transactions(job_id)
+        if batch is None:
+            return None
+        index = self._read_derived(job_id, "transaction_indexes", TransactionIndex.from_bytes)
+        if index is None:
+            index = TransactionIndex.build(batch)
+            self._write_derived(job_id, "transaction_indexes", index.to_bytes())
+        return batch, index
+
+    def get_rollup(self, job_id: UUID) -> Optional[RollupCube]:
+        rollup = self._read_derived(job_id, "rollups", RollupCube.from_bytes)
+        if rollup is None:
+            # Results stored before cubes were persisted get theirs built once, then stored
+            batch = self.get_transactions(job_id)
+            if batch is None:
+                return None
+            rollup = RollupCube.build(batch)
+            self._write_derived(job_id, "rollups", rollup.to_bytes())
+        return rollup
+
+    def _read_derived(self, job_id: UUID, table: str, decode: Callable[[bytes], Any]) -> Any:
+        """
+        Reads and decodes a job's unexpired row of one of the derived tables, or returns None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT data FROM {table} WHERE job_id = ? AND expires_at >= ?", (str(job_id), time.time())
+            ).fetchone()
+        return decode(row[0]) if row else None
+
+    def _write_derived(self, job_id: UUID, table: str, data: bytes) -> None:
+        """
+        Stores a rebuilt row of one of the derived tables, expiring with the job's results.
+        """
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {table} (job_id, data, expires_at) "
+                "SELECT job_id, ?, expires_at FROM results WHERE job_id = ?",
+                (data, str(job_id)),
+            )
+            self._conn.commit()
+
+    def save_results(self, job_id: UUID, results: Dict[str, Any]) -> None:
+        transactions = results["categorized_transactions"].to_bytes()
+        index = results["transaction_index"].to_bytes()
+        rollup = results["rollup"].to_bytes()
+        aggregates = results["aggregates"].to_bytes()
+        insights = zlib.compress(json.dumps([i.model_dump(mode="json") for i in results["insights"]]).encode("utf-8"))
+        predictions = zlib.compress(json.dumps([p.model_dump(mode="json") for p in results["predictions"]]).encode("utf-8"))
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (job_id, transactions, insights, predictions, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (str(job_id), transactions, insights, predictions, expires_at),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transaction_indexes (job_id, data, expires_at) VALUES (?, ?, ?)",
+                (str(job_id), index, expires_at),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rollups (job_id, data, expires_at) VALUES (?, ?, ?)",
+                (str(job_id), rollup, expires_at),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aggregates (job_id, data, expires_at) VALUES (?, ?, ?)",
+                (str(job_id), aggregates, expires_at),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            size = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(transactions) + LENGTH(insights) + LENGTH(predictions)), 0) FROM results"
+            ).fetchone()[0]
+            for table in ("transaction_indexes", "rollups", "aggregates"):
+                size += self._conn.execute(f"SELECT COALESCE(SUM(LENGTH(data)), 0) FROM {table}").fetchone()[0]
+        return {"jobs": jobs, "result_bytes": size}
+
+    def _purge_expired(self) -> None:
+        """
+        Deletes expired rows, at most once per purge interval. Must be called with the lock held.
+        """
+        now = time.time()
+        if now - self._last_purge < self._PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        for table in ("jobs",) + _RESULT_TABLES:
+            self._conn.execute(f"DELETE FROM {table} WHERE expires_at < ?", (now,))
+
+
+def create_job_store() -> JobStore:
+    """
+    Creates the job store selected by the `STORAGE_BACKEND` setting.
+
+    Returns:
+        The configured JobStore implementation.
+
+    Raises:
+        ValueError: If the configured backend is unknown.
+    """
+    if settings.STORAGE_BACKEND == "memory":
+        return InMemoryJobStore(settings.STORAGE_TTL_SECONDS, settings.STORAGE_MAX_BYTES)
+    if settings.STORAGE_BACKEND == "sqlite":
+        return SQLiteJobStore(settings.STORAGE_PATH, settings.STORAGE_TTL_SECONDS)
+    raise ValueError(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}'. Expected 'memory' or 'sqlite'.")
+
+async def run_store(method: Callable[..., T], *args: Any) -> T:
+    """
+    Calls a method of the job store from async code, in a worker thread when the store
+    is persistent, so that its queries and decompression do not block the event loop.
+    """
+    if job_store.persistent:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+job_store: JobStore = create_job_store()
+"""The application's job and result store."""
+STORAGE_BYTES.set_function(lambda: job_store.stats()["result_bytes"])
+STORED_JOBS.set_function(lambda: job_store.stats()["jobs"])
@@ -1,29 +1,50 @@
 import logging
 import time
+from contextlib import asynccontextmanager
 from typing import Dict
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
 from src.api.endpoints import router as api_router # Import the router
+from src.core.executor import shutdown_process_pool
+from src.core.metrics import HTTP_REQUEST_SECONDS
+from src.services.scheduler import scheduler
+from src.services.groq_client import groq_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: stops the job scheduler and releases shared resources
+    such as the process pool and the model's connection pool on shutdown.
+    """
+    yield
+    await scheduler.stop()
+    await groq_client.aclose()
+    shutdown_process_pool()
+
 app = FastAPI(
     title="AI Finance Analyzer",
     description="An API for uploading financial transaction files and retrieving AI-powered analysis.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """
-    Middleware to log details of incoming HTTP requests and their responses.
+    Middleware to log details of incoming HTTP requests and their responses, and to
+    record their duration in the request metrics.
     """
     start_time = time.time()
     response = await call_next(request)
     process_time = time.time() - start_time
     logger.info(f"Request: {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.4f}s")
+    # Label by route template rather than path, so job IDs do not create new series
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_REQUEST_SECONDS.observe(process_time, method=request.method, route=route, status=str(response.status_code))
     return response
 
 @app.exception_handler(Exception)
@@ -0,0 +1,305 @@
+import hashlib
+import json
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.batch import TransactionBatch
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """
+    SplitMix64 finalizer: scrambles uint64 values so that nearby inputs give unrelated outputs.
+    """
+    with np.errstate(over="ignore"):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+
+def fingerprint_rows(batch: TransactionBatch) -> np.ndarray:
+    """
+    Computes a 64-bit fingerprint of each transaction's (date, description, amount),
+    used to recognize rows that were already ingested. Amounts are compared in cents.
+
+    Args:
+        batch: The transactions to fingerprint.
+
+    Returns:
+        A uint64 array with one fingerprint per transaction.
+    """
+    description_hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(d.encode("utf-8"), digest_size=8).digest(), "little") for d in batch.descriptions],
+        dtype=np.uint64,
+    )
+    days = batch.dates.astype(np.int64).astype(np.uint64)
+    cents = np.round(batch.amounts * 100).astype(np.int64).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        return _mix(description_hashes[batch.description_codes] ^ _mix(days) ^ _mix(cents + np.uint64(0x9E3779B97F4A7C15)))
+
+
+def category_date_order(codes: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """
+    Returns the permutation that groups rows by category code, in date order within
+    each category (ties keep their original order).
+
+    When both keys fit in 16 bits, as they do for real statements, two stable passes
+    use NumPy's radix sort, several times faster than `np.lexsort`.
+    """
+    if len(codes) and int(codes.max()) < 1 << 16 and int(days.max()) - int(days.min()) < 1 << 16:
+        order = np.argsort((days - days.min()).astype(np.uint16), kind="stable")
+        return order[np.argsort(codes[order].astype(np.uint16), kind="stable")]
+    return np.lexsort((days, codes))
+
+
+class Deduplicator:
+    """
+    Filters out rows already present in a job, with multiset semantics: if the job
+    holds a row twice and an upload contains it three times, one copy is new.
+    Keeps state across the batches of one upload.
+    """
+    def __init__(self, fingerprints: np.ndarray):
+        """
+        Initializes the filter.
+
+        Args:
+            fingerprints: The sorted fingerprints of the rows already in the job.
+        """
+        self._fingerprints = fingerprints
+        self._matched: Dict[int, int] = {}
+
+    def new_rows(self, batch: TransactionBatch) -> np.ndarray:
+        """
+        Returns a boolean mask of the rows of `batch` that are not already in the job.
+        """
+        fingerprints = fingerprint_rows(batch)
+        available = (np.searchsorted(self._fingerprints, fingerprints, side="right")
+                     - np.searchsorted(self._fingerprints, fingerprints, side="left"))
+        mask = available == 0
+        # Only rows whose fingerprint is already stored need per-row bookkeeping
+        for i in np.flatnonzero(~mask).tolist():
+            fingerprint = int(fingerprints[i])
+            matched = self._matched.get(fingerprint, 0)
+            if matched < available[i]:
+                self._matched[fingerprint] = matched + 1
+            else:
+                mask[i] = True
+        return mask
+
+
+class RunningAggregates:
+    """
+    Running statistics of a job's transactions that can be updated with new rows
+    without revisiting old ones: per-category count, sum and sum of squares, a
+    month x category matrix of spending, the date of the last transaction, the fingerprints of every stored row, and
+    the most recent expenses of each category (the baselines of anomaly detection).
+    """
+    __slots__ = ("categories", "counts", "totals", "sum_squares", "first_month", "month_spending", "fingerprints",
+                 "recent_amounts", "recent_days", "recent_codes", "last_day")
+
+    def __init__(self, categories: List[str], counts: np.ndarray, totals: np.ndarray, sum_squares: np.ndarray,
+                 first_month: int, month_spending: np.ndarray, fingerprints: np.ndarray,
+                 recent_amounts: Optional[np.ndarray] = None, recent_days: Optional[np.ndarray] = None,
+                 recent_codes: Optional[np.ndarray] = None, last_day: Optional[int] = None):
+        """
+        Initializes the aggregates from their arrays. Use `empty` and `update` to build them.
+
+        Args:
+            categories: The category table; the other per-category arrays follow its order.
+            counts: Number of transactions per category.
+            totals: Sum of amounts per category.
+            sum_squares: Sum of squared amounts per category.
+            first_month: The first month of `month_spending`, in months since 1970-01.
+            month_spending: Sum of expenses (positive amounts) as a (months, categories) matrix.
+            fingerprints: Sorted fingerprints of every row (see `fingerprint_rows`).
+            recent_amounts: Amounts of the most recent expenses of each category.
+            recent_days: Dates of those expenses, in days since 1970-01-01.
+            recent_codes: Category codes of those expenses.
+            last_day: Date of the latest transaction, in days since 1970-01-01.
+        """
+        self.categories = categories
+        self.counts = counts
+        self.totals = totals
+        self.sum_squares = sum_squares
+        self.first_month = first_month
+        self.month_spending = month_spending
+        self.fingerprints = fingerprints
+        self.recent_amounts = np.zeros(0) if recent_amounts is None else recent_amounts
+        self.recent_days = np.zeros(0, dtype=np.int64) if recent_days is None else recent_days
+        self.recent_codes = np.zeros(0, dtype=np.int64) if recent_codes is None else recent_codes
+        self.last_day = last_day
+
+    @classmethod
+    def empty(cls) -> "RunningAggregates":
+        """
+        Returns aggregates of no transactions.
+        """
+        return cls([], np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), 0,
+                   np.zeros((0, 0)), np.zeros(0, dtype=np.uint64))
+
+    @property
+    def count(self) -> int:
+        """Total number of transactions."""
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        """Mean amount over every transaction."""
+        count = self.count
+        return float(self.totals.sum()) / count if count else 0.0
+
+    def month_total(self, month: np.datetime64) -> Optional[float]:
+        """
+        Returns the spending of a month, or None if it has no expenses.
+        """
+        row = int(month.astype("datetime64[M]").astype(np.int64)) - self.first_month
+        if not 0 <= row < len(self.month_spending):
+            return None
+        return float(self.month_spending[row].sum()) if self.month_spending[row].any() else None
+
+    def deduplicator(self) -> Deduplicator:
+        """
+        Returns a filter that drops rows already included in these aggregates.
+        """
+        return Deduplicator(self.fingerprints)
+
+    def recent_expenses(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the most recent expenses of each category as (amounts, days, codes).
+        """
+        return self.recent_amounts, self.recent_days, self.recent_codes
+
+    def category_codes(self, batch: TransactionBatch) -> np.ndarray:
+        """
+        Returns the category code of each row of `batch` in the aggregates' table.
+        Every category of the batch must already be in the table (see `update`).
+        """
+        table = {category: code for code, category in enumerate(self.categories)}
+        category_map = np.array([table[c] for c in batch.categories], dtype=np.int64)
+        return category_map[batch.category_codes]
+
+    def update(self, batch: TransactionBatch, recent_size: int = 1000) -> None:
+        """
+        Adds a batch of new transactions to the aggregates. Costs O(len(batch)), plus
+        a merge of the fingerprint array and of the recent expenses.
+
+        Args:
+            batch: The categorized transactions to add.
+            recent_size: Number of recent expenses to keep per category.
+        """
+        if not len(batch):
+            return
+        # Map the batch's category codes onto the aggregates' table, extending it as needed
+        table = {category: code for code, category in enumerate(self.categories)}
+        category_map = np.array([table.setdefault(c, len(table)) for c in batch.categories], dtype=np.int64)
+        self.categories = list(table)
+        size = len(self.categories)
+        grow = size - len(self.counts)
+        if grow:
+            self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+            self.totals = np.concatenate([self.totals, np.zeros(grow)])
+            self.sum_squares = np.concatenate([self.sum_squares, np.zeros(grow)])
+        codes = category_map[batch.category_codes]
+        amounts = batch.amounts
+        self.counts += np.bincount(codes, minlength=size)
+        self.totals += np.bincount(codes, weights=amounts, minlength=size)
+        self.sum_squares += np.bincount(codes, weights=amounts * amounts, minlength=size)
+
+        # Extend the month matrix to cover the batch's months, then accumulate expenses
+        months = batch.dates.astype("datetime64[M]").astype(np.int64)
+        if len(self.month_spending):
+            first = min(self.first_month, int(months.min()))
+            last = max(self.first_month + len(self.month_spending) - 1, int(months.max()))
+        else:
+            first, last = int(months.min()), int(months.max())
+        month_spending = np.zeros((last - first + 1, size))
+        old_rows, old_columns = self.month_spending.shape
+        offset = self.first_month - first
+        month_spending[offset:offset + old_rows, :old_columns] = self.month_spending
+        np.add.at(month_spending, (months - first, codes), np.maximum(amounts, 0.0))
+        self.first_month, self.month_spending = first, month_spending
+        batch_last_day = int(batch.dates.max().astype(np.int64))
+        self.last_day = batch_last_day if self.last_day is None else max(self.last_day, batch_last_day)
+
+        self.merge_fingerprints(np.sort(fingerprint_rows(batch)))
+
+        self._update_recent(amounts, batch.dates.astype(np.int64), codes, recent_size)
+
+    def merge_fingerprints(self, fingerprints: np.ndarray) -> None:
+        """
+        Merges sorted row fingerprints into the stored ones, keeping them sorted.
+        """
+        positions = np.searchsorted(self.fingerprints, fingerprints)
+        self.fingerprints = np.insert(self.fingerprints, positions, fingerprints)
+
+    def _update_recent(self, amounts: np.ndarray, days: np.ndarray, codes: np.ndarray, size: int) -> None:
+        """
+        Merges new expenses into the recent ones and keeps the last `size` of each
+        category, grouped by category in date order.
+        """
+        expenses = amounts > 0
+        amounts = np.concatenate([self.recent_amounts, amounts[expenses]])
+        days = np.concatenate([self.recent_days, days[expenses]])
+        codes = np.concatenate([self.recent_codes, codes[expenses]])
+        order = category_date_order(codes, days)
+        sorted_codes = codes[order]
+        if not len(order):
+            # No expenses so far, e.g. a statement of income only
+            self.recent_amounts, self.recent_days, self.recent_codes = amounts, days, codes
+            return
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        ends = np.r_[starts[1:], len(order)].astype(np.int64)
+        keep = order[np.arange(len(order)) >= np.repeat(ends, ends - starts) - size]
+        self.recent_amounts, self.recent_days, self.recent_codes = amounts[keep], days[keep], codes[keep]
+
+    def to_bytes(self, fingerprints: bool = True) -> bytes:
+        """
+        Serializes the aggregates: a small JSON header followed by each array's raw bytes.
+
+        Args:
+            fingerprints: Whether to include the row fingerprints. Without them the blob
+                stays small regardless of the job's size, but deduplication starts over.
+        """
+        stored_fingerprints = self.fingerprints if fingerprints else self.fingerprints[:0]
+        header = json.dumps({
+            "categories": self.categories,
+            "first_month": self.first_month,
+            "months": len(self.month_spending),
+            "last_day": self.last_day,
+            "fingerprints": len(stored_fingerprints),
+            "recent": len(self.recent_amounts),
+        }).encode("utf-8")
+        body = b"".join(np.ascontiguousarray(a).tobytes() for a in (
+            self.counts.astype(np.int64), self.totals, self.sum_squares, self.month_spending, stored_fingerprints,
+            self.recent_amounts, self.recent_days.astype(np.int64), self.recent_codes.astype(np.int64)
+        ))
+        return struct.pack("<I", len(header)) + header + body
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "RunningAggregates":
+        """
+        Restores aggregates serialized with `to_bytes`. The arrays are copied, so the result can be updated.
+        """
+        (header_length,) = struct.unpack_from("<I", blob)
+        header = json.loads(blob[4:4 + header_length])
+        size, months, recent = len(header["categories"]), header["months"], header.get("recent", 0)
+        offset = 4 + header_length
+        arrays = []
+        for dtype, count in ((np.int64, size), (np.float64, size), (np.float64, size),
+                             (np.float64, months * size), (np.uint64, header["fingerprints"]),
+                             (np.float64, recent), (np.int64, recent), (np.int64, recent)):
+            array = np.frombuffer(blob, dtype=dtype, count=count, offset=offset).copy()
+            offset += array.nbytes
+            arrays.append(array)
+        counts, totals, sum_squares, month_spending, fingerprints, recent_amounts, recent_days, recent_codes = arrays
+        return cls(header["categories"], counts, totals, sum_squares, header["first_month"],
+                   month_spending.reshape(months, size), fingerprints, recent_amounts, recent_days, recent_codes,
+                   header.get("last_day"))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory footprint of the aggregates in bytes.
+        """
+        return sum(a.nbytes for a in (self.counts, self.totals, self.sum_squares, self.month_spending, self.fingerprints,
+                                      self.recent_amounts, self.recent_days, self.recent_codes))
@@ -0,0 +1,406 @@
+import json
+import os
+import struct
+import zlib
+from array import array
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+
+from src.models.schemas import Transaction
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+UNCATEGORIZED = "Uncategorized"
+"""The category assigned to transactions the model could not (or did not yet) classify."""
+
+
+def _new_ids(count: int) -> np.ndarray:
+    """
+    Generates `count` random version-4 UUIDs in bulk, as a (count, 16) uint8 array.
+    """
+    ids = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    ids[:, 6] = (ids[:, 6] & 0x0F) | 0x40 # Version 4
+    ids[:, 8] = (ids[:, 8] & 0x3F) | 0x80 # RFC 4122 variant
+    return ids
+
+
+class TransactionBatch:
+    """
+    Columnar, array-backed collection of transactions used by the analysis pipeline.
+
+    Dates and amounts are NumPy arrays, descriptions are stored once in a string
+    table and referenced by code (bank exports repeat the same merchants heavily),
+    and categories are interned the same way. Pydantic `Transaction` objects are
+    only built on demand, via `to_transactions`, at the API edge.
+    """
+    __slots__ = ("ids", "dates", "amounts", "description_codes", "descriptions",
+                 "category_codes", "categories", "currency")
+
+    def __init__(self, ids: np.ndarray, dates: np.ndarray, amounts: np.ndarray,
+                 description_codes: np.ndarray, descriptions: List[str],
+                 category_codes: Optional[np.ndarray] = None, categories: Optional[List[str]] = None,
+                 currency: str = "USD"):
+        """
+        Initializes the batch from its columns.
+
+        Args:
+            ids: Transaction IDs as a (n, 16) uint8 array of UUID bytes.
+            dates: Transaction dates as a `datetime64[D]` array.
+            amounts: Transaction amounts as a float64 array.
+            description_codes: For each transaction, the index of its description in `descriptions`.
+            descriptions: The table of distinct descriptions.
+            category_codes: For each transaction, the index of its category in `categories`.
+                Defaults to every transaction being uncategorized.
+            categories: The table of distinct categories.
+            currency: The currency code shared by every transaction in the batch.
+        """
+        self.ids = ids
+        self.dates = dates
+        self.amounts = amounts
+        self.description_codes = description_codes
+        self.descriptions = descriptions
+        if category_codes is None:
+            category_codes = np.zeros(len(amounts), dtype=np.int16)
+            categories = [UNCATEGORIZED]
+        self.category_codes = category_codes
+        self.categories = categories
+        self.currency = currency
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @classmethod
+    def empty(cls) -> "TransactionBatch":
+        """
+        Returns a batch containing no transactions.
+        """
+        return cls(
+            ids=np.empty((0, 16), dtype=np.uint8),
+            dates=np.empty(0, dtype="datetime64[D]"),
+            amounts=np.empty(0, dtype=np.float64),
+            description_codes=np.empty(0, dtype=np.int32),
+            descriptions=[],
+        )
+
+    @classmethod
+    def from_transactions(cls, transactions: Sequence[Transaction]) -> "TransactionBatch":
+        """
+        Builds a batch from existing Transaction objects, preserving their IDs and categories.
+
+        Args:
+            transactions: The transactions to convert.
+
+        Returns:
+            The equivalent TransactionBatch.
+        """
+        builder = TransactionBatchBuilder()
+        for t in transactions:
+            builder.append(t.date, t.description, t.amount)
+        batch = builder.build()
+        if transactions:
+            batch.ids = np.frombuffer(b"".join(t.id.bytes for t in transactions), dtype=np.uint8).reshape(-1, 16).copy()
+            categories: Dict[str, int] = {}
+            batch.category_codes = np.array([categories.setdefault(t.category, len(categories)) for t in transactions], dtype=np.int16)
+            batch.categories = list(categories)
+        return batch
+
+    @classmethod
+    def from_columns(cls, dates: np.ndarray, amounts: np.ndarray, description_codes: np.ndarray,
+                     descriptions: List[str]) -> "TransactionBatch":
+        """
+        Builds an uncategorized batch from already decoded columns, without any per-row
+        work in Python. The arrays are used as given (not copied), so they may be views
+        of memory-mapped data.
+
+        Args:
+            dates: Transaction dates as a `datetime64[D]` array.
+            amounts: Transaction amounts as a float64 array.
+            description_codes: For each transaction, the index of its description in `descriptions`.
+            descriptions: The table of distinct descriptions.
+
+        Returns:
+            The TransactionBatch, with newly generated IDs.
+        """
+        return cls(
+            ids=_new_ids(len(amounts)),
+            dates=dates,
+            amounts=amounts,
+            description_codes=description_codes,
+            descriptions=descriptions,
+        )
+
+    @classmethod
+    def concat(cls, batches: Iterable["TransactionBatch"]) -> "TransactionBatch":
+        """
+        Concatenates batches into one, merging their description and category tables.
+
+        Args:
+            batches: The batches to concatenate, in order.
+
+        Returns:
+            A single TransactionBatch holding every transaction.
+        """
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        descriptions: Dict[str, int] = {}
+        categories: Dict[str, int] = {}
+        description_codes: List[np.ndarray] = []
+        category_codes: List[np.ndarray] = []
+        for batch in batches:
+            # Remap each batch's local codes onto the merged tables
+            description_map = np.array([descriptions.setdefault(d, len(descriptions)) for d in batch.descriptions], dtype=np.int32)
+            category_map = np.array([categories.setdefault(c, len(categories)) for c in batch.categories], dtype=np.int16)
+            description_codes.append(description_map[batch.description_codes])
+            category_codes.append(category_map[batch.category_codes])
+
+        return cls(
+            ids=np.concatenate([batch.ids for batch in batches]),
+            dates=np.concatenate([batch.dates for batch in batches]),
+            amounts=np.concatenate([batch.amounts for batch in batches]),
+            description_codes=np.concatenate(description_codes),
+            descriptions=list(descriptions),
+            category_codes=np.concatenate(category_codes),
+            categories=list(categories),
+            currency=batches[0].currency,
+        )
+
+    def take(self, indices: Sequence[int]) -> "TransactionBatch":
+        """
+        Returns a new batch holding the given rows, with the description and category
+        tables reduced to the entries those rows use.
+
+        Args:
+            indices: The rows to keep, in order.
+
+        Returns:
+            The selected transactions.
+        """
+        rows = np.asarray(indices, dtype=np.int64)
+        description_table, description_codes = np.unique(self.description_codes[rows], return_inverse=True)
+        category_table, category_codes = np.unique(self.category_codes[rows], return_inverse=True)
+        return TransactionBatch(
+            ids=self.ids[rows],
+            dates=self.dates[rows],
+            amounts=self.amounts[rows],
+            description_codes=description_codes.astype(np.int32),
+            descriptions=[self.descriptions[code] for code in description_table.tolist()],
+            category_codes=category_codes.astype(np.int16),
+            categories=[self.categories[code] for code in category_table.tolist()] or [UNCATEGORIZED],
+            currency=self.currency,
+        )
+
+    def assign_categories(self, labels: Sequence[str]) -> None:
+        """
+        Sets the category of every transaction from per-description labels.
+
+        Args:
+            labels: One category per entry of the description table, in the same order.
+                Missing trailing labels leave the matching descriptions uncategorized.
+        """
+        categories: Dict[str, int] = {}
+        table_codes = np.array(
+            [categories.setdefault(labels[i] if i < len(labels) else UNCATEGORIZED, len(categories))
+             for i in range(len(self.descriptions))],
+            dtype=np.int16,
+        )
+        self.categories = list(categories) or [UNCATEGORIZED]
+        self.category_codes = table_codes[self.description_codes] if len(table_codes) else np.zeros(len(self), dtype=np.int16)
+
+    def transaction_id(self, index: int) -> UUID:
+        """
+        Returns the ID of the transaction at `index`.
+        """
+        return UUID(bytes=self.ids[index].tobytes())
+
+    def description_of(self, index: int) -> str:
+        """
+        Returns the description of the transaction at `index`.
+        """
+        return self.descriptions[self.description_codes[index]]
+
+    def category_of(self, index: int) -> str:
+        """
+        Returns the category of the transaction at `index`.
+        """
+        return self.categories[self.category_codes[index]]
+
+    def to_transactions(self, indices: Optional[Sequence[int]] = None) -> List[Transaction]:
+        """
+        Materializes pydantic Transaction objects for API responses.
+
+        Args:
+            indices: The rows to materialize, in order. Defaults to every row.
+
+        Returns:
+            A list of Transaction objects.
+        """
+        if indices is None:
+            indices = range(len(self))
+        return [
+            Transaction(
+                id=self.transaction_id(i),
+                date=self.dates[i].item(),
+                description=self.description_of(i),
+                amount=float(self.amounts[i]),
+                currency=self.currency,
+                category=self.category_of(i),
+            )
+            for i in indices
+        ]
+
+    def to_records(self, indices: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Builds JSON-ready dictionaries shaped like serialized Transaction objects,
+        without constructing pydantic models. IDs and dates are formatted column-wise.
+
+        Args:
+            indices: The rows to include, in order. Defaults to every row.
+
+        Returns:
+            A list of dictionaries with string IDs and ISO-formatted dates.
+        """
+        rows = np.arange(len(self)) if indices is None else np.asarray(indices, dtype=np.int64)
+        hexed = np.ascontiguousarray(self.ids[rows]).tobytes().hex()
+        dates = np.datetime_as_string(self.dates[rows], unit="D").tolist()
+        amounts = self.amounts[rows].tolist()
+        description_codes = self.description_codes[rows].tolist()
+        category_codes = self.category_codes[rows].tolist()
+        records = []
+        for i in range(len(rows)):
+            h = hexed[32 * i:32 * i + 32]
+            records.append({
+                "id": f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}",
+                "date": dates[i],
+                "description": self.descriptions[description_codes[i]],
+                "amount": amounts[i],
+                "currency": self.currency,
+                "category": self.categories[category_codes[i]],
+            })
+        return records
+
+    def to_bytes(self, compress: bool = True) -> bytes:
+        """
+        Serializes the batch into a compact columnar blob: a small JSON header holding
+        the string tables, followed by each column's raw array bytes, optionally
+        zlib-compressed. Storing columns contiguously lets them compress well.
+
+        Args:
+            compress: Whether to zlib-compress the blob.
+
+        Returns:
+            The serialized batch.
+        """
+        header = json.dumps({
+            "count": len(self),
+            "currency": self.currency,
+            "descriptions": self.descriptions,
+            "categories": self.categories,
+            "compressed": compress,
+        }).encode("utf-8")
+        body = b"".join((
+            np.ascontiguousarray(self.ids, dtype=np.uint8).tobytes(),
+            np.ascontiguousarray(self.dates, dtype="datetime64[D]").view(np.int64).tobytes(),
+            np.ascontiguousarray(self.amounts, dtype=np.float64).tobytes(),
+            np.ascontiguousarray(self.description_codes, dtype=np.int32).tobytes(),
+            np.ascontiguousarray(self.category_codes, dtype=np.int16).tobytes(),
+        ))
+        if compress:
+            body = zlib.compress(body, 6)
+        return struct.pack("<I", len(header)) + header + body
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TransactionBatch":
+        """
+        Restores a batch serialized with `to_bytes`.
+
+        Args:
+            blob: The serialized batch.
+
+        Returns:
+            The deserialized TransactionBatch.
+        """
+        (header_length,) = struct.unpack_from("<I", blob)
+        header = json.loads(blob[4:4 + header_length])
+        body = blob[4 + header_length:]
+        if header["compressed"]:
+            body = zlib.decompress(body)
+
+        count = header["count"]
+        offset = 0
+        columns = []
+        for dtype, width in ((np.uint8, 16), (np.int64, 1), (np.float64, 1), (np.int32, 1), (np.int16, 1)):
+            column = np.frombuffer(body, dtype=dtype, count=count * width, offset=offset)
+            offset += column.nbytes
+            columns.append(column)
+        ids, dates, amounts, description_codes, category_codes = columns
+        return cls(
+            ids=ids.reshape(count, 16),
+            dates=dates.view("datetime64[D]"),
+            amounts=amounts,
+            description_codes=description_codes,
+            descriptions=header["descriptions"],
+            category_codes=category_codes,
+            categories=header["categories"],
+            currency=header["currency"],
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory footprint of the batch in bytes.
+        """
+        arrays = (self.ids, self.dates, self.amounts, self.description_codes, self.category_codes)
+        tables = sum(len(s) for s in self.descriptions) + sum(len(s) for s in self.categories)
+        return sum(a.nbytes for a in arrays) + tables
+
+
+class TransactionBatchBuilder:
+    """
+    Accumulates parsed rows and builds a TransactionBatch, interning descriptions as it goes.
+    """
+    def __init__(self):
+        self._ordinals = array("q")
+        self._amounts = array("d")
+        self._description_codes = array("i")
+        self._descriptions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._amounts)
+
+    def append(self, transaction_date: date, description: str, amount: float) -> None:
+        """
+        Appends one transaction.
+
+        Args:
+            transaction_date: The date the transaction occurred.
+            description: The transaction description/memo.
+            amount: The monetary value of the transaction.
+        """
+        self._ordinals.append(transaction_date.toordinal())
+        self._amounts.append(amount)
+        self._description_codes.append(self._descriptions.setdefault(description, len(self._descriptions)))
+
+    def build(self) -> TransactionBatch:
+        """
+        Builds a batch from the appended rows and resets the builder.
+
+        Returns:
+            The TransactionBatch holding every appended row.
+        """
+        count = len(self)
+        batch = TransactionBatch(
+            ids=_new_ids(count),
+            dates=(np.frombuffer(self._ordinals, dtype=np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]"),
+            amounts=np.frombuffer(self._amounts, dtype=np.float64),
+            description_codes=np.frombuffer(self._description_codes, dtype=np.int32),
+            descriptions=list(self._descriptions),
+        )
+        self.__init__()
+        return batch
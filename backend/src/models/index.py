@@ -0,0 +1,341 @@
+import base64
+import bisect
+import json
+import struct
+from datetime import date
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.batch import TransactionBatch
+
+SORT_KEYS = ("date", "-date", "amount", "-amount")
+"""Supported values of the `sort` query option; a leading '-' sorts in descending order."""
+
+# Rows examined per step when scanning an ordering for matches
+_MIN_SCAN_CHUNK = 4096
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+    pass
+
+
+def _postings(codes: np.ndarray, size: int, dtype: type) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Groups row numbers by code: rows with code `c` are `order[offsets[c]:offsets[c + 1]]`, ascending.
+    """
+    order = np.argsort(codes, kind="stable").astype(dtype)
+    offsets = np.zeros(size + 1, dtype=dtype)
+    np.cumsum(np.bincount(codes, minlength=size), out=offsets[1:])
+    return order, offsets
+
+
+def _merge_postings(order: np.ndarray, offsets: np.ndarray, new_codes: np.ndarray, first_row: int,
+                    size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Appends rows `first_row, first_row + 1, ...` with codes `new_codes` to existing posting
+    lists, in linear time. Codes at or beyond the existing table get new, empty lists first.
+    """
+    dtype = order.dtype
+    offsets = np.concatenate([offsets, np.full(size + 1 - len(offsets), offsets[-1], dtype=dtype)])
+    new_order, new_offsets = _postings(new_codes, size, dtype)
+    merged = np.empty(len(order) + len(new_order), dtype=dtype)
+    # An old row moves right by the number of new rows in earlier lists; a new row
+    # lands after every old row in its own and earlier lists
+    old_codes = np.repeat(np.arange(size), np.diff(offsets))
+    merged[np.arange(len(order)) + new_offsets[old_codes]] = order
+    new_codes_sorted = np.repeat(np.arange(size), np.diff(new_offsets))
+    merged[np.arange(len(new_order)) + offsets[new_codes_sorted + 1]] = new_order + first_row
+    return merged, offsets + new_offsets
+
+
+def _merge_order(order: np.ndarray, values: np.ndarray, first_row: int) -> np.ndarray:
+    """
+    Merges rows `first_row:` of `values` into a stable sort permutation of the rows before them.
+    """
+    new_order = (np.argsort(values[first_row:], kind="stable") + first_row).astype(order.dtype)
+    # Ties go after existing rows, as a stable sort of the combined rows would place them
+    positions = np.searchsorted(values[order], values[new_order], side="right")
+    return np.insert(order, positions, new_order)
+
+
+def _encode_cursor(mode: str, position: int) -> str:
+    return base64.urlsafe_b64encode(f"{mode}:{position}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        mode, position = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii").split(":")
+        if mode not in ("scan", "set") or int(position) < 0:
+            raise ValueError(cursor)
+        return mode, int(position)
+    except ValueError as e:
+        raise InvalidCursorError(f"Invalid pagination cursor '{cursor}'.") from e
+
+
+class TransactionIndex:
+    """
+    Per-job secondary indexes over a categorized TransactionBatch, built once when
+    the analysis completes, so that filtered and sorted pages cost roughly the page
+    size rather than the job size.
+
+    The index holds a date-sorted and an amount-sorted permutation of the rows, plus
+    posting lists (row numbers grouped by code, in file order) for categories and
+    descriptions. Row numbers refer to the batch the index was built from.
+    """
+    __slots__ = ("date_order", "amount_order", "category_order", "category_offsets",
+                 "description_order", "description_offsets", "_folded_descriptions")
+
+    def __init__(self, date_order: np.ndarray, amount_order: np.ndarray,
+                 category_order: np.ndarray, category_offsets: np.ndarray,
+                 description_order: np.ndarray, description_offsets: np.ndarray):
+        """
+        Initializes the index from its arrays. Use `build` to create one from a batch.
+        """
+        self.date_order = date_order
+        self.amount_order = amount_order
+        self.category_order = category_order
+        self.category_offsets = category_offsets
+        self.description_order = description_order
+        self.description_offsets = description_offsets
+        self._folded_descriptions: Optional[List[str]] = None
+
+    @classmethod
+    def build(cls, batch: TransactionBatch) -> "TransactionIndex":
+        """
+        Builds the indexes for a batch.
+
+        Args:
+            batch: The categorized transactions.
+
+        Returns:
+            The TransactionIndex for `batch`.
+        """
+        dtype = np.int32 if len(batch) < 2 ** 31 else np.int64
+        category_order, category_offsets = _postings(batch.category_codes, len(batch.categories), dtype)
+        description_order, description_offsets = _postings(batch.description_codes, len(batch.descriptions), dtype)
+        return cls(
+            date_order=np.argsort(batch.dates, kind="stable").astype(dtype),
+            amount_order=np.argsort(batch.amounts, kind="stable").astype(dtype),
+            category_order=category_order,
+            category_offsets=category_offsets,
+            description_order=description_order,
+            description_offsets=description_offsets,
+        )
+
+    def extend(self, batch: TransactionBatch, first_new_row: int) -> "TransactionIndex":
+        """
+        Returns the index of `batch`, given that this index covers its rows before
+        `first_new_row` (for instance after `TransactionBatch.concat` appended new rows).
+        The new rows are sorted and merged in, which costs a linear pass over the old
+        arrays instead of re-sorting them.
+
+        Args:
+            batch: The extended batch. Codes of existing rows must be unchanged.
+            first_new_row: The number of rows covered by this index.
+
+        Returns:
+            The TransactionIndex for `batch`.
+        """
+        if len(batch) >= 2 ** 31 and self.date_order.dtype != np.int64:
+            return TransactionIndex.build(batch)
+        category_order, category_offsets = _merge_postings(
+            self.category_order, self.category_offsets, batch.category_codes[first_new_row:],
+            first_new_row, len(batch.categories))
+        description_order, description_offsets = _merge_postings(
+            self.description_order, self.description_offsets, batch.description_codes[first_new_row:],
+            first_new_row, len(batch.descriptions))
+        return TransactionIndex(
+            date_order=_merge_order(self.date_order, batch.dates, first_new_row),
+            amount_order=_merge_order(self.amount_order, batch.amounts, first_new_row),
+            category_order=category_order,
+            category_offsets=category_offsets,
+            description_order=description_order,
+            description_offsets=description_offsets,
+        )
+
+    def query(self, batch: TransactionBatch, category: Optional[str] = None,
+              date_from: Optional[date] = None, date_to: Optional[date] = None,
+              min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+              description: Optional[str] = None, sort: Optional[str] = None,
+              cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[np.ndarray, Optional[str]]:
+        """
+        Finds one page of the rows matching the given filters.
+
+        The query either walks the requested ordering from the cursor, testing rows in
+        vectorized chunks until the page is full, or, when a filter narrows the result
+        to a small candidate set (a category or description posting list, or a date or
+        amount range), filters and sorts only that set. It picks whichever touches fewer rows.
+
+        Args:
+            batch: The batch the index was built from.
+            category: Only rows with exactly this category.
+            date_from: Only rows on or after this date.
+            date_to: Only rows on or before this date.
+            min_amount: Only rows with at least this amount.
+            max_amount: Only rows with at most this amount.
+            description: Only rows whose description contains this text, ignoring case.
+            sort: One of `SORT_KEYS`. Defaults to file order.
+            cursor: The cursor returned with the previous page, if any.
+            limit: Maximum number of rows to return. Defaults to every matching row.
+
+        Returns:
+            The matching row numbers, in order, and the cursor for the next page
+            (None if there are no more rows).
+
+        Raises:
+            InvalidCursorError: If `cursor` is malformed.
+            ValueError: If `sort` is not supported.
+        """
+        if sort is not None and sort not in SORT_KEYS:
+            raise ValueError(f"Unsupported sort '{sort}'. Expected one of {', '.join(SORT_KEYS)}.")
+        mode, position = _decode_cursor(cursor) if cursor else (None, 0)
+        empty = np.empty(0, dtype=np.int64)
+
+        descending = bool(sort) and sort.startswith("-")
+        sort_key = sort.lstrip("-") if sort else None
+        predicates: List[Callable[[np.ndarray], np.ndarray]] = []
+        # Candidate row sets as (size, materializer); the smallest may drive the query
+        candidates: List[Tuple[int, Callable[[], np.ndarray]]] = []
+
+        if category is not None:
+            if category not in batch.categories:
+                return empty, None
+            code = batch.categories.index(category)
+            start, stop = int(self.category_offsets[code]), int(self.category_offsets[code + 1])
+            predicates.append(lambda rows: batch.category_codes[rows] == code)
+            candidates.append((stop - start, lambda start=start, stop=stop: self.category_order[start:stop]))
+
+        if description:
+            needle = description.casefold()
+            if self._folded_descriptions is None:
+                self._folded_descriptions = [d.casefold() for d in batch.descriptions]
+            codes = [code for code, text in enumerate(self._folded_descriptions) if needle in text]
+            if not codes:
+                return empty, None
+            matches = np.zeros(len(batch.descriptions), dtype=bool)
+            matches[codes] = True
+            predicates.append(lambda rows: matches[batch.description_codes[rows]])
+            offsets = self.description_offsets
+            size = sum(int(offsets[code + 1] - offsets[code]) for code in codes)
+            candidates.append((size, lambda: np.sort(np.concatenate(
+                [self.description_order[offsets[code]:offsets[code + 1]] for code in codes]
+            ))))
+
+        # Range filters become contiguous slices of the sorted permutations
+        scan_order: Optional[np.ndarray] = None
+        scan_start, scan_stop = 0, len(batch)
+        sort_predicates: List[Callable[[np.ndarray], np.ndarray]] = []
+        ranges = (
+            ("date", self.date_order, batch.dates,
+             np.datetime64(date_from, "D") if date_from else None, np.datetime64(date_to, "D") if date_to else None),
+            ("amount", self.amount_order, batch.amounts, min_amount, max_amount),
+        )
+        for key, order, values, low, high in ranges:
+            if key == sort_key:
+                scan_order = order
+            if low is None and high is None:
+                continue
+            start = bisect.bisect_left(order, low, key=values.__getitem__) if low is not None else 0
+            stop = bisect.bisect_right(order, high, key=values.__getitem__) if high is not None else len(order)
+            if stop <= start:
+                return empty, None
+            predicate = lambda rows, values=values, low=low, high=high: (
+                (values[rows] >= low if low is not None else True) & (values[rows] <= high if high is not None else True)
+            )
+            if key == sort_key:
+                # A scan of the sort order only visits the slice, so the range needs no test there
+                scan_start, scan_stop = start, stop
+                sort_predicates.append(predicate)
+            else:
+                predicates.append(predicate)
+            candidates.append((stop - start, lambda order=order, start=start, stop=stop: np.sort(order[start:stop])))
+
+        scan_length = scan_stop - scan_start
+        if mode is None:
+            # Scanning costs about limit * scan_length / matches rows; filtering a candidate set costs its size
+            smallest = min((size for size, _ in candidates), default=None)
+            page = limit or scan_length
+            mode = "set" if smallest is not None and smallest * smallest < page * scan_length else "scan"
+
+        if mode == "set":
+            if not candidates:
+                raise InvalidCursorError("Pagination cursor does not match the query.")
+            rows = min(candidates, key=lambda candidate: candidate[0])[1]()
+            for predicate in predicates + sort_predicates:
+                rows = rows[predicate(rows)]
+            if sort_key is not None:
+                values = batch.dates if sort_key == "date" else batch.amounts
+                rows = rows[np.argsort(values[rows], kind="stable")]
+            if descending:
+                rows = rows[::-1]
+            stop = len(rows) if limit is None else position + limit
+            return rows[position:stop].astype(np.int64), (_encode_cursor("set", stop) if stop < len(rows) else None)
+
+        def rows_at(start: int, stop: int) -> np.ndarray:
+            # Positions count from the first row in the requested direction
+            if descending:
+                start, stop = scan_stop - stop, scan_stop - start
+            else:
+                start, stop = scan_start + start, scan_start + stop
+            rows = scan_order[start:stop] if scan_order is not None else np.arange(start, stop)
+            return rows[::-1] if descending else rows
+
+        pages: List[np.ndarray] = []
+        found = 0
+        chunk_size = max(_MIN_SCAN_CHUNK, 4 * limit) if limit else scan_length
+        while position < scan_length and (limit is None or found < limit):
+            rows = rows_at(position, min(position + chunk_size, scan_length))
+            mask = np.ones(len(rows), dtype=bool)
+            for predicate in predicates:
+                mask &= predicate(rows)
+            hits = np.flatnonzero(mask)
+            if limit is not None and found + len(hits) >= limit:
+                hits = hits[:limit - found]
+                position += int(hits[-1]) + 1
+            else:
+                position += len(rows)
+            pages.append(rows[hits])
+            found += len(hits)
+
+        rows = np.concatenate(pages).astype(np.int64) if pages else empty
+        return rows, (_encode_cursor("scan", position) if position < scan_length else None)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the index: a small JSON header followed by each array's raw bytes.
+        """
+        arrays = self._arrays()
+        header = json.dumps({
+            "dtype": self.date_order.dtype.str,
+            "lengths": [len(array) for array in arrays],
+        }).encode("utf-8")
+        return struct.pack("<I", len(header)) + header + b"".join(np.ascontiguousarray(a).tobytes() for a in arrays)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TransactionIndex":
+        """
+        Restores an index serialized with `to_bytes`.
+        """
+        (header_length,) = struct.unpack_from("<I", blob)
+        header = json.loads(blob[4:4 + header_length])
+        dtype = np.dtype(header["dtype"])
+        offset = 4 + header_length
+        arrays = []
+        for length in header["lengths"]:
+            array = np.frombuffer(blob, dtype=dtype, count=length, offset=offset)
+            offset += array.nbytes
+            arrays.append(array)
+        return cls(*arrays)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory footprint of the index in bytes.
+        """
+        return sum(array.nbytes for array in self._arrays())
+
+    def _arrays(self) -> Tuple[np.ndarray, ...]:
+        return (self.date_order, self.amount_order, self.category_order, self.category_offsets,
+                self.description_order, self.description_offsets)
@@ -0,0 +1,272 @@
+import json
+import struct
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.batch import TransactionBatch
+
+BUCKETS = ("day", "week", "month", "quarter", "year", "all")
+"""Supported time buckets of summary queries; 'all' sums over the whole date range."""
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _reduce(keys: np.ndarray, sums: np.ndarray, counts: np.ndarray, mins: np.ndarray,
+            maxs: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Combines the statistics of entries sharing a key. Returns the distinct keys in
+    ascending order with their summed sums and counts, and their smallest and largest values.
+    """
+    if not len(keys):
+        return keys, sums, counts, mins, maxs
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    return (keys[starts], np.add.reduceat(sums[order], starts), np.add.reduceat(counts[order], starts),
+            np.minimum.reduceat(mins[order], starts), np.maximum.reduceat(maxs[order], starts))
+
+
+def _bucket_of(days: np.ndarray, bucket: str) -> np.ndarray:
+    """
+    Maps day numbers (days since 1970-01-01) to the ordinal of their time bucket.
+    Weeks start on Monday; 1970-01-01 was a Thursday.
+    """
+    if bucket == "day":
+        return days
+    if bucket == "week":
+        return days - (days + 3) % 7
+    if bucket == "all":
+        return np.zeros(len(days), dtype=np.int64)
+    months = (_EPOCH + days).astype("datetime64[M]").astype(np.int64)
+    if bucket == "month":
+        return months
+    return months // 3 if bucket == "quarter" else months // 12
+
+
+def _bucket_label(ordinal: int, bucket: str) -> Optional[str]:
+    """
+    Formats a bucket ordinal from `_bucket_of`: '2024-03-15' for days and weeks (the
+    Monday the week starts on), '2024-03' for months, '2024-Q1' for quarters and '2024' for years.
+    """
+    if bucket in ("day", "week"):
+        return str(_EPOCH + ordinal)
+    if bucket == "month":
+        return str(np.datetime64(ordinal, "M"))
+    if bucket == "quarter":
+        return f"{1970 + ordinal // 4}-Q{ordinal % 4 + 1}"
+    return str(1970 + ordinal) if bucket == "year" else None
+
+
+class RollupCube:
+    """
+    Pre-aggregated day x category statistics of a job's transactions, built once when
+    the analysis completes, so that summaries by category and time bucket cost about
+    the number of non-empty cells rather than the number of transactions.
+
+    Cells are stored sparsely, sorted by day and then category: for each (day, category)
+    pair with at least one transaction, the sum, count, minimum and maximum of its
+    (signed) amounts. Coarser buckets are derived by combining cells, and the mean is
+    the sum over the count. Categories are referenced by name through the cube's own
+    table, so cubes built from separately categorized batches can be merged.
+    """
+    __slots__ = ("categories", "days", "codes", "sums", "counts", "mins", "maxs")
+
+    def __init__(self, categories: List[str], days: np.ndarray, codes: np.ndarray, sums: np.ndarray,
+                 counts: np.ndarray, mins: np.ndarray, maxs: np.ndarray):
+        """
+        Initializes the cube from its cells.
+
+        Args:
+            categories: The table of category names referenced by `codes`.
+            days: The day of each cell, as days since 1970-01-01 (int64).
+            codes: The category of each cell, as an index into `categories` (int32).
+            sums: The sum of the amounts in each cell (float64).
+            counts: The number of transactions in each cell (int64).
+            mins: The smallest amount in each cell (float64).
+            maxs: The largest amount in each cell (float64).
+        """
+        self.categories = categories
+        self.days = days
+        self.codes = codes
+        self.sums = sums
+        self.counts = counts
+        self.mins = mins
+        self.maxs = maxs
+
+    def __len__(self) -> int:
+        """Number of non-empty cells."""
+        return len(self.days)
+
+    @classmethod
+    def empty(cls) -> "RollupCube":
+        """Creates a cube without cells."""
+        return cls([], np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64),
+                   np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64))
+
+    @classmethod
+    def _from_keys(cls, categories: List[str], keys: np.ndarray, first_day: int, *stats: np.ndarray) -> "RollupCube":
+        """
+        Builds a cube from `(day - first_day) * len(categories) + code` cell keys and their statistics.
+        """
+        keys, sums, counts, mins, maxs = _reduce(keys, *stats)
+        size = max(len(categories), 1)
+        return cls(categories, keys // size + first_day, (keys % size).astype(np.int32), sums, counts, mins, maxs)
+
+    @classmethod
+    def build(cls, batch: TransactionBatch) -> "RollupCube":
+        """
+        Aggregates a categorized batch into day x category cells.
+
+        Args:
+            batch: The categorized transactions.
+
+        Returns:
+            The cube of the batch.
+        """
+        if not len(batch):
+            return cls.empty()
+        days = (batch.dates - _EPOCH).astype(np.int64)
+        first_day = int(days.min())
+        keys = (days - first_day) * len(batch.categories) + batch.category_codes.astype(np.int64)
+        amounts = batch.amounts.astype(np.float64)
+        return cls._from_keys(list(batch.categories), keys, first_day,
+                              amounts, np.ones(len(batch), dtype=np.int64), amounts, amounts)
+
+    def merge(self, other: "RollupCube") -> "RollupCube":
+        """
+        Combines two cubes, for instance the job's cube and the cube of appended transactions.
+        Cells of the same day and category name are added together. Costs about the
+        number of cells of both cubes.
+
+        Args:
+            other: The cube to add.
+
+        Returns:
+            A new cube; neither input is modified.
+        """
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        categories = list(self.categories)
+        positions = {name: code for code, name in enumerate(categories)}
+        for name in other.categories:
+            if name not in positions:
+                positions[name] = len(categories)
+                categories.append(name)
+        remap = np.array([positions[name] for name in other.categories], dtype=np.int64)
+        days = np.concatenate([self.days, other.days])
+        codes = np.concatenate([self.codes.astype(np.int64), remap[other.codes]])
+        first_day = int(days.min())
+        return self._from_keys(
+            categories, (days - first_day) * len(categories) + codes, first_day,
+            np.concatenate([self.sums, other.sums]), np.concatenate([self.counts, other.counts]),
+            np.concatenate([self.mins, other.mins]), np.concatenate([self.maxs, other.maxs]),
+        )
+
+    def query(self, bucket: str = "month", by_category: bool = True, category: Optional[str] = None,
+              date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Summarizes the transactions by time bucket and, optionally, by category.
+
+        Args:
+            bucket: One of `BUCKETS`.
+            by_category: Whether each bucket is broken down by category.
+            category: Only transactions with exactly this category.
+            date_from: Only transactions on or after this date.
+            date_to: Only transactions on or before this date.
+
+        Returns:
+            One row per non-empty group, ordered by period and then category name, with
+            the period label (None for 'all'), the category (None when not grouped by
+            category), and the count, sum, minimum, maximum and mean of the amounts.
+
+        Raises:
+            ValueError: If `bucket` is not supported.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unsupported bucket '{bucket}'. Expected one of {', '.join(BUCKETS)}.")
+
+        selected = np.ones(len(self), dtype=bool)
+        if date_from is not None:
+            selected &= self.days >= (np.datetime64(date_from, "D") - _EPOCH).astype(np.int64)
+        if date_to is not None:
+            selected &= self.days <= (np.datetime64(date_to, "D") - _EPOCH).astype(np.int64)
+        if category is not None:
+            if category not in self.categories:
+                return []
+            selected &= self.codes == self.categories.index(category)
+        if not selected.any():
+            return []
+
+        buckets = _bucket_of(self.days[selected], bucket)
+        first_bucket = int(buckets.min())
+        if by_category:
+            # Group by the category's rank by name, so rows come out alphabetically within a period
+            names = sorted(self.categories)
+            rank = np.empty(len(self.categories), dtype=np.int64)
+            rank[[self.categories.index(name) for name in names]] = np.arange(len(names))
+            size, codes = len(names), rank[self.codes[selected]]
+        else:
+            names, size, codes = [None], 1, np.zeros(int(selected.sum()), dtype=np.int64)
+        keys, sums, counts, mins, maxs = _reduce(
+            (buckets - first_bucket) * size + codes,
+            self.sums[selected], self.counts[selected], self.mins[selected], self.maxs[selected],
+        )
+
+        labels: Dict[int, Optional[str]] = {}
+        rows = []
+        for key, total, count, low, high in zip(keys.tolist(), sums.tolist(), counts.tolist(), mins.tolist(), maxs.tolist()):
+            ordinal = key // size + first_bucket
+            if ordinal not in labels:
+                labels[ordinal] = _bucket_label(ordinal, bucket)
+            rows.append({
+                "period": labels[ordinal],
+                "category": names[key % size],
+                "count": count,
+                "sum": round(total, 2),
+                "min": round(low, 2),
+                "max": round(high, 2),
+                "mean": round(total / count, 2),
+            })
+        return rows
+
+    @property
+    def means(self) -> np.ndarray:
+        """The mean amount of each cell."""
+        return self.sums / np.maximum(self.counts, 1)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the cube: a small JSON header followed by each array's raw bytes.
+        """
+        header = json.dumps({"categories": self.categories, "cells": len(self)}).encode("utf-8")
+        body = b"".join(np.ascontiguousarray(a).tobytes() for a in (
+            self.days, self.codes, self.sums, self.counts, self.mins, self.maxs
+        ))
+        return struct.pack("<I", len(header)) + header + body
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "RollupCube":
+        """
+        Restores a cube serialized with `to_bytes`.
+        """
+        (header_length,) = struct.unpack_from("<I", blob)
+        header = json.loads(blob[4:4 + header_length])
+        cells = header["cells"]
+        offset = 4 + header_length
+        arrays = []
+        for dtype in (np.int64, np.int32, np.float64, np.int64, np.float64, np.float64):
+            array = np.frombuffer(blob, dtype=dtype, count=cells, offset=offset)
+            offset += array.nbytes
+            arrays.append(array)
+        return cls(header["categories"], *arrays)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory footprint of the cube in bytes.
+        """
+        return sum(a.nbytes for a in (self.days, self.codes, self.sums, self.counts, self.mins, self.maxs))
@@ -4,6 +4,10 @@ from uuid import UUID, uuid4
 from datetime import datetime, date
 from enum import Enum
 
+# Alias used for annotations on models that also have a field named `date`,
+# which would otherwise shadow the type while pydantic evaluates the class.
+DateType = date
+
 class JobStatus(str, Enum):
     """
     Enum for the status of an analysis job.
@@ -21,13 +25,20 @@ class AnalysisJob(BaseModel):
     status: JobStatus = Field(default=JobStatus.PENDING, description="The current status of the job.")
     error_message: Optional[str] = Field(default=None, description="A descriptive message if the job failed.")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="The timestamp when the job was created.")
+    duplicates_skipped: Optional[int] = Field(default=None, description="Rows of the last appended file that were skipped because the job already contained them.")
+    queue_position: Optional[int] = Field(default=None, description="While an upload or append for this job is queued, the number of queued jobs that will run before it.")
+    filename: Optional[str] = Field(default=None, description="For a file of a batch upload, the name of the file (or archive member).")
+    parent_job_id: Optional[UUID] = Field(default=None, description="For a file of a batch upload, the job that merges every file of the batch.")
+    child_job_ids: Optional[List[UUID]] = Field(default=None, description="For a batch upload, the jobs of its individual files, in upload order.")
+    results_version: int = Field(default=0, description="Incremented each time the job's results are stored: on completion and after every append that adds rows.")
+    reused: bool = Field(default=False, description="Whether the upload was attached to an existing job with the same content or idempotency key instead of being analyzed again.")
 
 class Transaction(BaseModel):
     """
     Represents a single financial transaction extracted from the user's file.
     """
     id: UUID = Field(default_factory=uuid4, description="A unique identifier for the transaction within our system.")
-    date: date = Field(description="The date the transaction occurred.")
+    date: DateType = Field(description="The date the transaction occurred.")
     description: str = Field(description="The original transaction description/memo.")
     amount: float = Field(description="The monetary value of the transaction. Can be positive or negative.")
     currency: str = Field(default="USD", description="The currency code (e.g., 'USD').")
@@ -56,3 +67,17 @@ class Prediction(BaseModel):
     period: str = Field(description="The time period for the prediction (e.g., '2025-12').")
     predicted_amount: float = Field(description="The total predicted spending for the period.")
     confidence_score: float = Field(description="A score between 0 and 1 indicating the model's confidence in the prediction.")
+    category: Optional[str] = Field(default=None, description="The category forecast, or None for total spending across categories.")
+    model: Optional[str] = Field(default=None, description="The forecasting model that produced the prediction (e.g., 'exponential_smoothing').")
+
+class SummaryRow(BaseModel):
+    """
+    Represents one group of a transaction summary: a time bucket, optionally broken down by category.
+    """
+    period: Optional[str] = Field(default=None, description="The time bucket (e.g., '2025-12', '2025-Q4', or the Monday starting a week), or None when summarizing the whole date range.")
+    category: Optional[str] = Field(default=None, description="The category, or None when the summary is not broken down by category.")
+    count: int = Field(description="The number of transactions in the group.")
+    sum: float = Field(description="The sum of the transaction amounts; expenses are positive.")
+    min: float = Field(description="The smallest transaction amount in the group.")
+    max: float = Field(description="The largest transaction amount in the group.")
+    mean: float = Field(description="The mean transaction amount in the group.")
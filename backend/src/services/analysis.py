@@ -1,89 +1,229 @@
-from typing import List, Dict, Any
-from src.models.schemas import Transaction, Insight, Prediction, InsightType
-from src.services.groq_client import groq_client
-from collections import defaultdict
-from datetime import date
+import asyncio
+import numpy as np
+from typing import List, Dict, Any, AsyncIterator, Optional, Sequence, Tuple
+from src.models.schemas import Insight, InsightType, Prediction
+from src.models.aggregates import Deduplicator, RunningAggregates
+from src.models.batch import TransactionBatch
+from src.models.index import TransactionIndex
+from src.models.rollup import RollupCube
+from src.services.categorizer import categorizer
+from src.services.events import JobProgress
+from src.services.workers import build_report_from_bytes, build_index_from_bytes, build_rollup_from_bytes
+from src.core.config import settings
+from src.core.executor import run_cpu_bound
+from src.core.metrics import JOB_STAGE_SECONDS
 
 class AnalysisService:
     """
     Service responsible for orchestrating the AI-powered analysis of financial transactions.
     """
-    async def analyze_transactions(self, transactions: List[Transaction]) -> Dict[str, Any]:
+    async def analyze_transactions(self, transactions: TransactionBatch) -> Dict[str, Any]:
         """
         Orchestrates the analysis of transactions: categorization, pattern detection, and predictions.
-        
+
         Args:
-            transactions: A list of Transaction objects to analyze.
-            
+            transactions: A TransactionBatch to analyze.
+
         Returns:
-            A dictionary containing categorized transactions, generated insights, and predictions.
+            A dictionary containing the categorized TransactionBatch, its TransactionIndex,
+            RollupCube and running aggregates, generated insights, and predictions.
         """
-        if not transactions:
-            return {
-                "categorized_transactions": [],
-                "insights": [],
-                "predictions": []
-            }
+        if not len(transactions):
+            return await self._build_report(transactions)
 
         # 1. Categorization
-        descriptions = [t.description for t in transactions]
-        categories = await groq_client.categorize_transactions(descriptions)
-
-        categorized_transactions: List[Transaction] = []
-        for i, transaction in enumerate(transactions):
-            transaction.category = categories[i] if i < len(categories) else "Uncategorized"
-            categorized_transactions.append(transaction)
-
-        # 2. Spending Patterns (Simple example: total spent per category)
-        category_spending = defaultdict(float)
-        for t in categorized_transactions:
-            category_spending[t.category] += t.amount
-
-        insights: List[Insight] = []
-        for category, total_spent in category_spending.items():
-            if total_spent > 0: # Only consider expenses
-                insights.append(
-                    Insight(
-                        type=InsightType.SPENDING_PATTERN,
-                        title=f"Spending Pattern: {category}",
-                        description=f"You spent a total of {total_spent:.2f} in '{category}'.",
-                        data={"category": category, "total_spent": total_spent}
-                    )
-                )
-        
-        # 3. Anomalous Transactions (Simple example: unusually high single transaction)
-        # This is a very basic anomaly detection. A real system would use statistical methods.
-        average_transaction_amount = sum(t.amount for t in transactions) / len(transactions) if transactions else 0 # Added check for empty transactions
-        for t in categorized_transactions:
-            if t.amount > (average_transaction_amount * 3) and t.amount > 100: # Example threshold
-                insights.append(
-                    Insight(
-                        type=InsightType.ANOMALY_DETECTED,
-                        title=f"Anomaly Detected: Large Transaction in {t.category}",
-                        description=f"An unusually large transaction of {t.amount:.2f} was detected in '{t.category}' on {t.date}.",
-                        data={"transaction_id": str(t.id), "amount": t.amount, "category": t.category}
-                    )
-                )
+        categorized_transactions = await self._categorize(transactions)
+        return await self._build_report(categorized_transactions)
 
-        # 4. Monthly Spending Predictions (Very basic example: average of current month's spending)
-        # This is a placeholder. Real predictions require historical data and time-series models.
-        predictions: List[Prediction] = []
-        current_month_transactions = [t for t in transactions if t.date.month == date.today().month and t.date.year == date.today().year]
-        if current_month_transactions:
-            current_month_total = sum(t.amount for t in current_month_transactions)
-            predictions.append(
-                Prediction(
-                    period=date.today().strftime("%Y-%m"),
-                    predicted_amount=current_month_total, # Simple projection
-                    confidence_score=0.5 # Low confidence for simple projection
-                )
-            )
+    async def analyze_categorized(self, transactions: TransactionBatch) -> Dict[str, Any]:
+        """
+        Analyzes transactions whose categories are already assigned, such as the merged
+        transactions of the files of a batch upload, without categorizing them again.
+
+        Args:
+            transactions: A categorized TransactionBatch.
+
+        Returns:
+            A dictionary containing the TransactionBatch, its TransactionIndex,
+            RollupCube and running aggregates, generated insights, and predictions.
+        """
+        return await self._build_report(transactions)
+
+    async def analyze_transaction_stream(self, batches: AsyncIterator[TransactionBatch],
+                                         progress: Optional[JobProgress] = None) -> Dict[str, Any]:
+        """
+        Analyzes transactions arriving in batches from a streaming parser.
+
+        Each batch is sent for categorization as soon as it arrives, so the first
+        categorization call starts before the whole file has been read. At most
+        `ANALYSIS_MAX_INFLIGHT_BATCHES` batches are categorized at once; reading
+        pauses until one completes, which keeps the amount of buffered data bounded.
+
+        Args:
+            batches: An async iterator yielding parsed TransactionBatch objects.
+            progress: If given, parsed and categorized batches and the analysis stage are recorded in it.
+
+        Returns:
+            A dictionary containing the categorized TransactionBatch, its TransactionIndex,
+            RollupCube and running aggregates, generated insights, and predictions.
+        """
+        categorized_transactions, _ = await self._categorize_stream(batches, progress=progress)
+        if progress is not None:
+            progress.enter_stage("analyzing")
+        return await self._build_report(categorized_transactions)
+
+    async def append_transaction_stream(self, results: Dict[str, Any],
+                                        batches: AsyncIterator[TransactionBatch],
+                                        progress: Optional[JobProgress] = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Appends newly uploaded transactions to a job's existing results.
+
+        Rows already present in the job (same date, description and amount) are dropped
+        before categorization. Totals, anomalies and predictions are then updated from
+        the job's stored running aggregates, the query indexes are extended rather than
+        rebuilt, and the rollup cube of the new rows is merged into the job's, so the
+        analysis cost scales with the number of new rows.
+
+        Args:
+            results: The job's current results, as stored in the job store.
+            batches: An async iterator yielding the parsed TransactionBatch objects to append.
+            progress: If given, parsed and categorized batches and the analysis stage are recorded in it.
+
+        Returns:
+            The updated results, and the number of duplicate rows that were skipped.
+        """
+        existing: TransactionBatch = results["categorized_transactions"]
+        aggregates: RunningAggregates = results["aggregates"]
+        new_transactions, duplicates = await self._categorize_stream(batches, aggregates.deduplicator(), progress)
+        if not len(new_transactions):
+            return results, duplicates
+        if progress is not None:
+            progress.enter_stage("analyzing")
+
+        previous_anomalies = [insight for insight in results["insights"] if insight.type == InsightType.ANOMALY_DETECTED]
+        report = await self._build_report(new_transactions, aggregates, previous_anomalies)
+        combined = TransactionBatch.concat([existing, new_transactions])
+        report["categorized_transactions"] = combined
+        with JOB_STAGE_SECONDS.time(stage="index"):
+            report["transaction_index"] = await asyncio.to_thread(results["transaction_index"].extend, combined, len(existing))
+        report["rollup"] = results["rollup"].merge(report["rollup"])
+        return report, duplicates
+
+    async def _categorize_stream(self, batches: AsyncIterator[TransactionBatch],
+                                 deduplicator: Optional[Deduplicator] = None,
+                                 progress: Optional[JobProgress] = None) -> Tuple[TransactionBatch, int]:
+        """
+        Categorizes batches as they arrive, keeping at most `ANALYSIS_MAX_INFLIGHT_BATCHES` in flight.
+
+        Args:
+            batches: An async iterator yielding parsed TransactionBatch objects.
+            deduplicator: If given, rows it reports as already known are dropped before categorization.
+            progress: If given, parsed and categorized batches are recorded in it.
+
+        Returns:
+            The categorized transactions, concatenated in order, and the number of dropped rows.
+        """
+        tasks: List[asyncio.Task] = []
+        dropped = 0
+
+        async def categorize(batch: TransactionBatch) -> TransactionBatch:
+            categorized = await self._categorize(batch)
+            if progress is not None:
+                progress.categorized(len(categorized))
+            return categorized
+
+        try:
+            async for batch in batches:
+                if deduplicator is not None:
+                    new_rows = deduplicator.new_rows(batch)
+                    if not new_rows.all():
+                        dropped += len(batch) - int(new_rows.sum())
+                        batch = batch.take(np.flatnonzero(new_rows))
+                if progress is not None:
+                    # Skipped duplicates count as neither parsed nor categorized, so they do not hold back the percentage
+                    progress.parsed(len(batch))
+                if not len(batch):
+                    continue
+                tasks.append(asyncio.create_task(categorize(batch)))
+                in_flight = [task for task in tasks if not task.done()]
+                if len(in_flight) >= settings.ANALYSIS_MAX_INFLIGHT_BATCHES:
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            if progress is not None:
+                progress.finish_parsing()
+            categorized_batches = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        return TransactionBatch.concat(categorized_batches), dropped
+
+    async def _categorize(self, transactions: TransactionBatch) -> TransactionBatch:
+        """
+        Assigns an AI-generated category to each transaction. Only the batch's
+        distinct descriptions are sent for categorization, and the categorizer
+        answers repeat merchants from its cache.
 
+        Args:
+            transactions: The transactions to categorize.
+
+        Returns:
+            The same batch, with its categories assigned.
+        """
+        with JOB_STAGE_SECONDS.time(stage="categorize"):
+            categories = await categorizer.categorize(transactions.descriptions)
+        transactions.assign_categories(categories)
+        return transactions
+
+    async def _build_report(self, categorized_transactions: TransactionBatch,
+                            aggregates: Optional[RunningAggregates] = None,
+                            previous_anomalies: Sequence[Insight] = ()) -> Dict[str, Any]:
+        """
+        Derives spending patterns, anomalies and predictions from categorized transactions,
+        and builds the indexes and rollup cube used to query them. The numeric stages run in the process
+        pool, so they never block the event loop.
+
+        Args:
+            categorized_transactions: A TransactionBatch with its categories already assigned.
+            aggregates: When appending to a job, its running aggregates; `categorized_transactions`
+                then holds only the new rows (see `build_report`).
+            previous_anomalies: When appending to a job, its existing anomaly insights.
+
+        Returns:
+            A dictionary containing the categorized TransactionBatch, its TransactionIndex
+            and RollupCube, the running aggregates, generated insights, and predictions.
+            When appending, the cube covers only the new rows.
+        """
+        with JOB_STAGE_SECONDS.time(stage="analysis"):
+            blob = categorized_transactions.to_bytes(compress=False)
+            # Row fingerprints are only needed here, for deduplication, and grow with the job's
+            # history; the pool gets the rest of the aggregates and adds the new rows' fingerprints
+            report = run_cpu_bound(
+                build_report_from_bytes, blob,
+                aggregates.to_bytes(fingerprints=False) if aggregates is not None else None,
+                [insight.model_dump(mode="json") for insight in previous_anomalies],
+            )
+            rollup = run_cpu_bound(build_rollup_from_bytes, blob)
+            if aggregates is None:
+                (insight_data, prediction_data, aggregates_blob), rollup_blob, index_blob = await asyncio.gather(
+                    report, rollup, run_cpu_bound(build_index_from_bytes, blob)
+                )
+                transaction_index = TransactionIndex.from_bytes(index_blob)
+            else:
+                # The caller extends the job's existing index and merges the cubes
+                (insight_data, prediction_data, aggregates_blob), rollup_blob = await asyncio.gather(report, rollup)
+                transaction_index = None
 
+        updated_aggregates = RunningAggregates.from_bytes(aggregates_blob)
+        if aggregates is not None:
+            updated_aggregates.merge_fingerprints(aggregates.fingerprints)
         return {
             "categorized_transactions": categorized_transactions,
-            "insights": insights,
-            "predictions": predictions
+            "transaction_index": transaction_index,
+            "rollup": RollupCube.from_bytes(rollup_blob),
+            "aggregates": updated_aggregates,
+            "insights": [Insight.model_validate(item) for item in insight_data],
+            "predictions": [Prediction.model_validate(item) for item in prediction_data],
         }
 
 analysis_service = AnalysisService()
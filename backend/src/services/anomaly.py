@@ -0,0 +1,180 @@
+"""
+Vectorized statistical anomaly detection for transaction amounts.
+
+Every expense (positive amount) is scored against robust baselines of its own
+category, computed in one batch with NumPy:
+
+- a robust z-score against the category's median and MAD, refined by a
+  day-of-week baseline when the category has enough transactions on that weekday;
+- a rolling z-score against the mean and standard deviation of the category's
+  previous `window` transactions, in date order.
+
+A transaction's score is the smaller of the two (both views must agree it is
+unusual) and it is flagged when the score reaches the sensitivity threshold.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.core.config import settings
+from src.models.aggregates import category_date_order
+
+# Scales a median absolute deviation to a standard deviation for normal data
+_MAD_TO_SIGMA = 1.4826
+# Scales a mean absolute deviation to a standard deviation for normal data
+_MEAN_AD_TO_SIGMA = 1.2533
+# Spread floor relative to the baseline, so constant series (rent, subscriptions) do not flag cents
+_MIN_RELATIVE_SPREAD = 0.05
+# Absolute spread floor, in currency units
+_MIN_ABSOLUTE_SPREAD = 1.0
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+class AnomalyScores:
+    """
+    The flagged transactions of one detection run, ordered by decreasing score.
+    Row numbers refer to the arrays passed as new transactions.
+    """
+    __slots__ = ("rows", "scores", "robust_z", "rolling_z", "baselines", "weekdays")
+
+    def __init__(self, rows: np.ndarray, scores: np.ndarray, robust_z: np.ndarray,
+                 rolling_z: np.ndarray, baselines: np.ndarray, weekdays: np.ndarray):
+        self.rows = rows
+        self.scores = scores
+        self.robust_z = robust_z
+        self.rolling_z = rolling_z
+        """Rolling z-scores; NaN where the category had too little prior history."""
+        self.baselines = baselines
+        """The expected amount each flagged transaction was compared with."""
+        self.weekdays = weekdays
+        """Day of week of each flagged transaction (Monday is 0)."""
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def weekday(days: np.ndarray) -> np.ndarray:
+    """
+    Returns the day of week (Monday is 0) of dates given as days since 1970-01-01.
+    """
+    return ((days + 3) % 7).astype(np.uint8) # 1970-01-01 was a Thursday
+
+
+def _spread(values: np.ndarray, center: float) -> float:
+    """
+    Robust standard deviation estimate around `center`, with floors for near-constant series.
+    """
+    deviations = np.abs(values - center)
+    spread = _MAD_TO_SIGMA * float(np.median(deviations))
+    if spread == 0.0:
+        spread = _MEAN_AD_TO_SIGMA * float(deviations.mean())
+    return max(spread, _MIN_RELATIVE_SPREAD * abs(center), _MIN_ABSOLUTE_SPREAD)
+
+
+def detect_anomalies(amounts: np.ndarray, days: np.ndarray, codes: np.ndarray,
+                     history: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                     sensitivity: Optional[float] = None, min_amount: Optional[float] = None,
+                     min_samples: Optional[int] = None, window: Optional[int] = None,
+                     max_results: Optional[int] = None) -> AnomalyScores:
+    """
+    Scores new transactions against per-category baselines and returns the anomalous ones.
+
+    Args:
+        amounts: Amounts of the new transactions.
+        days: Dates of the new transactions, as days since 1970-01-01.
+        codes: Category codes of the new transactions.
+        history: Earlier transactions (amounts, days, codes) that feed the baselines
+            but are not flagged themselves, for instance a job's recent history when
+            appending. Codes must use the same category table.
+        sensitivity: Minimum score to flag. Defaults to `ANOMALY_SENSITIVITY`.
+        min_amount: Minimum amount to flag. Defaults to `ANOMALY_MIN_AMOUNT`.
+        min_samples: Transactions a category (or weekday) needs for its own baseline;
+            smaller categories are compared with all expenses. Defaults to `ANOMALY_MIN_SAMPLES`.
+        window: Number of prior transactions in the rolling baseline. Defaults to `ANOMALY_ROLLING_WINDOW`.
+        max_results: Maximum number of anomalies to return, highest scores first.
+            Defaults to `ANOMALY_MAX_INSIGHTS`.
+
+    Returns:
+        The flagged transactions and their scores.
+    """
+    sensitivity = settings.ANOMALY_SENSITIVITY if sensitivity is None else sensitivity
+    min_amount = settings.ANOMALY_MIN_AMOUNT if min_amount is None else min_amount
+    min_samples = settings.ANOMALY_MIN_SAMPLES if min_samples is None else min_samples
+    window = settings.ANOMALY_ROLLING_WINDOW if window is None else window
+    max_results = settings.ANOMALY_MAX_INSIGHTS if max_results is None else max_results
+
+    history_count = 0
+    if history is not None and len(history[0]):
+        history_count = len(history[0])
+        amounts = np.concatenate([history[0], amounts])
+        days = np.concatenate([history[1], days])
+        codes = np.concatenate([history[2], codes])
+
+    # Only expenses form baselines and can be flagged
+    expense_rows = np.flatnonzero(amounts > 0)
+    if not len(expense_rows):
+        empty = np.empty(0)
+        return AnomalyScores(np.empty(0, dtype=np.int64), empty, empty, empty, empty, np.empty(0, dtype=np.int64))
+
+    # Group by category, in date order within each category
+    order = expense_rows[category_date_order(codes[expense_rows], days[expense_rows])]
+    values = amounts[order]
+    sorted_codes = codes[order]
+    weekdays = weekday(days[order])
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+
+    center = np.empty(len(order)) # Category median
+    expected = np.empty(len(order)) # Category median, or weekday median when available
+    spread = np.empty(len(order))
+    overall_center = float(np.median(values))
+    overall_spread = _spread(values, overall_center)
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        segment = values[start:end]
+        if end - start < min_samples:
+            center[start:end] = expected[start:end] = overall_center
+            spread[start:end] = overall_spread
+            continue
+        median = float(np.median(segment))
+        center[start:end] = expected[start:end] = median
+        spread[start:end] = _spread(segment, median)
+        # Weekday groups become contiguous after one radix pass over the category
+        by_weekday = np.argsort(weekdays[start:end], kind="stable") + start
+        bounds = np.r_[0, np.cumsum(np.bincount(weekdays[by_weekday], minlength=7))]
+        for day in np.flatnonzero(np.diff(bounds) >= min_samples).tolist():
+            positions = by_weekday[bounds[day]:bounds[day + 1]]
+            day_values = values[positions]
+            day_median = float(np.median(day_values))
+            expected[positions] = day_median
+            spread[positions] = _spread(day_values, day_median)
+    robust_z = (values - expected) / spread
+
+    # Rolling baseline over the previous `window` transactions of the same category,
+    # from prefix sums of amounts centered on the category median (for numerical stability)
+    centered = values - center
+    sums = np.concatenate([[0.0], np.cumsum(centered)])
+    squares = np.concatenate([[0.0], np.cumsum(centered * centered)])
+    positions = np.arange(len(order))
+    group_starts = np.repeat(starts, ends - starts)
+    lows = np.maximum(group_starts, positions - window)
+    counts = positions - lows
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (sums[positions] - sums[lows]) / counts
+        variances = (squares[positions] - squares[lows]) / counts - means * means
+        floors = np.maximum(_MIN_RELATIVE_SPREAD * np.abs(center), _MIN_ABSOLUTE_SPREAD)
+        deviations = np.maximum(np.sqrt(np.maximum(variances, 0.0)), floors)
+        rolling_z = np.where(counts >= min(min_samples, window), (centered - means) / deviations, np.nan)
+
+    scores = np.where(np.isnan(rolling_z), robust_z, np.minimum(robust_z, rolling_z))
+    flagged = np.flatnonzero((order >= history_count) & (scores >= sensitivity) & (values >= min_amount))
+    flagged = flagged[np.argsort(-scores[flagged], kind="stable")][:max_results]
+    return AnomalyScores(
+        rows=order[flagged] - history_count,
+        scores=scores[flagged],
+        robust_z=robust_z[flagged],
+        rolling_z=rolling_z[flagged],
+        baselines=expected[flagged],
+        weekdays=weekdays[flagged],
+    )
+
@@ -0,0 +1,196 @@
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Card-network suffixes and reference markers that vary between otherwise identical merchants,
+# e.g. "UBER *TRIP 1234", "SQ *COFFEE #0042", "AMAZON MKTPLACE PMTS XXXX1234".
+_REFERENCE_TOKENS = re.compile(r"(?:\bX{2,}\w*|#\s*\w+|\*+)")
+_NON_WORD = re.compile(r"[^A-Z0-9&.' ]+")
+_NOISE_WORDS = frozenset({"STORE", "NO", "REF", "POS", "PURCHASE", "DEBIT", "CARD"})
+
+
+def normalize_description(description: str) -> str:
+    """
+    Normalizes a transaction description to a merchant key, so that variants of
+    the same merchant share one cache entry.
+
+    Card suffixes, reference numbers, store numbers and any token containing digits
+    are dropped, and case and whitespace are normalized.
+    For example, "Uber *Trip 1234" and "UBER *TRIP 9876" both become "UBER TRIP".
+
+    Args:
+        description: The original transaction description.
+
+    Returns:
+        The normalized merchant key. Falls back to the stripped, upper-cased
+        description if nothing would be left after normalization.
+    """
+    text = _REFERENCE_TOKENS.sub(" ", description.upper())
+    text = _NON_WORD.sub(" ", text)
+    tokens = (token.strip(".'") for token in text.split() if not any(ch.isdigit() for ch in token))
+    key = " ".join(token for token in tokens if token and token not in _NOISE_WORDS)
+    return key or " ".join(description.upper().split())
+
+
+class CategorizationCache:
+    """
+    Two-level cache of merchant key -> category.
+
+    The first level is an in-process LRU bounded by an approximate byte budget;
+    the second is an optional SQLite table that survives restarts and is shared
+    by every process pointing at the same file. Lookups that miss the LRU but hit
+    SQLite are promoted back into the LRU.
+
+    The methods are synchronous; with a SQLite level (see `persistent`), async
+    callers run them in a thread so that disk I/O never blocks the event loop.
+    """
+    # Rough per-entry overhead of the OrderedDict node and the two str objects
+    _ENTRY_OVERHEAD = 100
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Initializes the cache.
+
+        Args:
+            path: Path of the SQLite database file. If empty, the cache is memory-only.
+            max_bytes: Approximate memory budget of the in-process LRU.
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS categories (merchant_key TEXT PRIMARY KEY, category TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+        self.memory_hits = 0
+        """Lookups answered from the in-process LRU."""
+        self.disk_hits = 0
+        """Lookups answered from the SQLite store."""
+        self.misses = 0
+        """Lookups that had to go to the model."""
+        self.evictions = 0
+        """Entries evicted from the LRU to stay within `max_bytes`."""
+
+    @property
+    def persistent(self) -> bool:
+        """
+        Whether the cache has a SQLite level, so that lookups and stores may block on disk.
+        """
+        return self._conn is not None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Looks up several merchant keys at once and updates the hit/miss counters.
+
+        Args:
+            keys: The distinct normalized merchant keys to look up.
+
+        Returns:
+            A mapping of the keys that were found to their cached category.
+        """
+        found: Dict[str, str] = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                category = self._entries.get(key)
+                if category is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = category
+            self.memory_hits += len(found)
+
+            if missing and self._conn is not None:
+                from_disk = self._select(missing)
+                for key, category in from_disk.items():
+                    self._remember(key, category)
+                found.update(from_disk)
+                self.disk_hits += len(from_disk)
+                self.misses += len(missing) - len(from_disk)
+            else:
+                self.misses += len(missing)
+        return found
+
+    def put_many(self, categories: Dict[str, str]) -> None:
+        """
+        Stores model results in both cache levels.
+
+        Args:
+            categories: A mapping of normalized merchant key to category.
+        """
+        if not categories:
+            return
+        with self._lock:
+            for key, category in categories.items():
+                self._remember(key, category)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO categories (merchant_key, category) VALUES (?, ?)",
+                    categories.items(),
+                )
+                self._conn.commit()
+
+    def items(self) -> List[Tuple[str, str]]:
+        """
+        Returns every cached (merchant key, category) pair, from SQLite when configured.
+        """
+        with self._lock:
+            if self._conn is not None:
+                return self._conn.execute("SELECT merchant_key, category FROM categories").fetchall()
+            return list(self._entries.items())
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the cache counters and the current LRU footprint.
+        """
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+    def _select(self, keys: list) -> Dict[str, str]:
+        """
+        Reads the given keys from SQLite, in chunks that respect the bound-parameter limit.
+        """
+        found: Dict[str, str] = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT merchant_key, category FROM categories WHERE merchant_key IN ({placeholders})", chunk
+            )
+            found.update(rows)
+        return found
+
+    def _remember(self, key: str, category: str) -> None:
+        """
+        Inserts an entry into the LRU and evicts the least recently used entries over budget.
+        Must be called with the lock held.
+        """
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= self._entry_size(key, previous)
+        self._entries[key] = category
+        self._size += self._entry_size(key, category)
+        while self._size > self.max_bytes and self._entries:
+            old_key, old_category = self._entries.popitem(last=False)
+            self._size -= self._entry_size(old_key, old_category)
+            self.evictions += 1
+
+    def _entry_size(self, key: str, category: str) -> int:
+        return len(key) + len(category) + self._ENTRY_OVERHEAD
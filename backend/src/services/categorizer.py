@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from src.core.config import settings
+from src.core.metrics import CATEGORIZATIONS, JOB_STAGE_SECONDS
+from src.services.categorization_cache import CategorizationCache, normalize_description
+from src.services.local_categorizer import LocalCategorizer
+from src.services.groq_client import groq_client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class Categorizer:
+    """
+    Categorization layer in front of the Groq model.
+
+    Descriptions are normalized to merchant keys and deduplicated, answered from the
+    categorization cache where possible, then from the offline local categorizer when
+    it is confident enough, and only the remaining keys are sent to the model. Keys
+    already being categorized for another batch are awaited rather than sent again,
+    so a merchant is classified at most once per job. When the model is unavailable,
+    keys it did not answer fall back to the best local prediction, or "Uncategorized".
+    """
+    # Retrain the local model once the model has labelled this share of new merchants
+    _RETRAIN_GROWTH = 0.1
+    _RETRAIN_MIN_EXAMPLES = 50
+
+    def __init__(self, cache: CategorizationCache, local: Optional[LocalCategorizer] = None,
+                 local_threshold: float = 0.8):
+        """
+        Initializes the categorizer.
+
+        Args:
+            cache: The cache of previously categorized merchant keys.
+            local: The offline categorizer consulted before the model, if any.
+            local_threshold: Minimum confidence for a local prediction to be accepted.
+        """
+        self.cache = cache
+        self.local = local
+        self.local_threshold = local_threshold
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._trained_examples: Optional[int] = None
+        self._new_examples = 0
+        self._training: Optional[asyncio.Task] = None
+        self.local_hits = 0
+        """Number of merchant keys answered by the local categorizer."""
+        self.model_items = 0
+        """Number of merchant keys sent to the model."""
+        self.model_seconds = 0.0
+        """Total time spent waiting on the model."""
+
+    async def categorize(self, descriptions: List[str]) -> List[str]:
+        """
+        Categorizes transaction descriptions, consulting the cache before the model.
+
+        Args:
+            descriptions: The transaction descriptions to categorize.
+
+        Returns:
+            A list of categories, in the same order as the input descriptions.
+        """
+        keys = [normalize_description(d) for d in descriptions]
+        # One representative description per distinct merchant key
+        representatives: Dict[str, str] = {}
+        for key, description in zip(keys, descriptions):
+            representatives.setdefault(key, description)
+
+        resolved = await self._run_cache(self.cache.get_many, representatives)
+        CATEGORIZATIONS.inc(len(resolved), source="cache")
+        # Local predictions below the threshold, used if the model cannot answer
+        guesses: Dict[str, str] = {}
+        if self.local is not None:
+            self._maybe_retrain()
+            local_hits = 0
+            for key in representatives:
+                if key in resolved:
+                    continue
+                category, confidence = self.local.predict(key)
+                if category is not None and confidence >= self.local_threshold:
+                    resolved[key] = category
+                    local_hits += 1
+                elif category is not None:
+                    guesses[key] = category
+            self.local_hits += local_hits
+            CATEGORIZATIONS.inc(local_hits, source="local")
+
+        waiting = {key: self._pending[key] for key in representatives if key not in resolved and key in self._pending}
+        misses = [key for key in representatives if key not in resolved and key not in waiting]
+        CATEGORIZATIONS.inc(len(waiting), source="shared")
+
+        if misses:
+            resolved.update(await self._categorize_with_model(misses, representatives, guesses))
+        for key, future in waiting.items():
+            resolved[key] = await asyncio.shield(future)
+
+        return [resolved.get(key, "Uncategorized") for key in keys]
+
+    async def _run_cache(self, method: Callable[..., T], *args: Any) -> T:
+        """
+        Calls a cache method, in a worker thread when it may touch the SQLite level.
+        """
+        if self.cache.persistent:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _categorize_with_model(self, keys: List[str], representatives: Dict[str, str],
+                                     guesses: Dict[str, str]) -> Dict[str, str]:
+        """
+        Sends cache misses to the model and stores its answers in the cache.
+
+        Keys the model does not answer, including all of them when it is unavailable
+        (no API key, or requests still failing after retries), get their entry in
+        `guesses`, or "Uncategorized". These fallbacks are not cached.
+        """
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in keys}
+        self._pending.update(futures)
+        try:
+            started = time.perf_counter()
+            try:
+                categories = await groq_client.categorize_transactions([representatives[key] for key in keys])
+            except Exception as e:
+                logger.warning(f"Model unavailable, using local fallbacks for {len(keys)} merchants: {e}")
+                categories = [None] * len(keys)
+            else:
+                elapsed = time.perf_counter() - started
+                JOB_STAGE_SECONDS.observe(elapsed, stage="llm")
+                self.model_seconds += elapsed
+                self.model_items += len(keys)
+
+            # Only cache real model answers, not the fallback for items it did not answer
+            answered = {key: category for key, category in zip(keys, categories) if category is not None}
+            await self._run_cache(self.cache.put_many, answered)
+            self._new_examples += len(answered)
+            CATEGORIZATIONS.inc(len(answered), source="model")
+            CATEGORIZATIONS.inc(len(keys) - len(answered), source="fallback")
+            results = {key: answered.get(key) or guesses.get(key, "Uncategorized") for key in keys}
+            for key, future in futures.items():
+                future.set_result(results[key])
+            return results
+        except BaseException as e:
+            for future in futures.values():
+                if future.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    future.exception() # Mark as retrieved; waiters re-raise it themselves
+            raise
+        finally:
+            for key in keys:
+                self._pending.pop(key, None)
+
+    def _maybe_retrain(self) -> None:
+        """
+        Starts background training of the local model from the cached model labels on
+        first use, and again whenever enough new merchants have been labelled since.
+        """
+        if self._training is not None and not self._training.done():
+            return
+        if self._trained_examples is not None:
+            threshold = max(self._RETRAIN_MIN_EXAMPLES, self._trained_examples * self._RETRAIN_GROWTH)
+            if self._new_examples < threshold:
+                return
+        self._new_examples = 0
+        self._training = asyncio.create_task(self._retrain())
+
+    async def _retrain(self) -> None:
+        """
+        Trains the local model in a worker thread; predictions keep using the previous model meanwhile.
+        """
+        try:
+            examples = await asyncio.to_thread(self.cache.items)
+            await asyncio.to_thread(self.local.train, examples)
+            self._trained_examples = len(examples)
+        except Exception:
+            logger.exception("Training the local categorizer failed.")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the cache counters together with an estimate of the model time they saved.
+        """
+        stats = self.cache.stats()
+        seconds_per_item = self.model_seconds / self.model_items if self.model_items else 0.0
+        stats["local_hits"] = self.local_hits
+        stats["model_items"] = self.model_items
+        stats["model_seconds"] = round(self.model_seconds, 3)
+        stats["estimated_seconds_saved"] = round((stats["memory_hits"] + stats["disk_hits"] + self.local_hits) * seconds_per_item, 3)
+        return stats
+
+categorizer = Categorizer(
+    CategorizationCache(settings.CATEGORY_CACHE_PATH, settings.CATEGORY_CACHE_MAX_BYTES),
+    local=LocalCategorizer(use_tfidf=settings.LOCAL_CATEGORIZER_TFIDF) if settings.LOCAL_CATEGORIZER_ENABLED else None,
+    local_threshold=settings.LOCAL_CATEGORIZER_THRESHOLD,
+)
@@ -0,0 +1,158 @@
+"""
+Parsers for columnar uploads: Parquet and Arrow IPC (`.arrow`, `.feather`).
+
+Columnar files already hold typed columns, so they are decoded straight into
+TransactionBatch arrays with vectorized Arrow kernels: no cell is converted in
+Python and no per-row object is built. Files are opened memory-mapped; fixed-width
+columns of uncompressed Arrow files are used without copying.
+
+pyarrow is optional: without it, `COLUMNAR_EXTENSIONS` uploads are rejected.
+"""
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError: # Optional dependency
+    pa = None
+
+from src.models.batch import TransactionBatch
+from src.services.parser import FileParsingError
+
+PARQUET_EXTENSIONS: Tuple[str, ...] = (".parquet", ".pq")
+"""File extensions read as Parquet."""
+
+ARROW_EXTENSIONS: Tuple[str, ...] = (".arrow", ".feather", ".ipc")
+"""File extensions read as Arrow IPC (file or stream format; Feather v2 is the IPC file format)."""
+
+COLUMNAR_EXTENSIONS: Tuple[str, ...] = PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+"""Every file extension handled by this module."""
+
+_COLUMNS = ("Date", "Description", "Amount")
+
+def columnar_available() -> bool:
+    """
+    Returns whether pyarrow is installed, so columnar uploads can be parsed.
+    """
+    return pa is not None
+
+def iter_columnar_batches(path: str, batch_size: int = 1000) -> Iterator[TransactionBatch]:
+    """
+    Reads a Parquet or Arrow IPC file from disk and yields its transactions in batches.
+    Only the 'Date', 'Description' and 'Amount' columns are read.
+
+    Dates may be date, timestamp or 'YYYY-MM-DD' string columns, amounts any numeric
+    or numeric string column, and descriptions string or dictionary-encoded columns.
+    The yielded batches may reference the memory-mapped file.
+
+    Args:
+        path: The path of the file; its extension selects the format.
+        batch_size: The maximum number of transactions per yielded batch.
+
+    Yields:
+        TransactionBatch objects of at most `batch_size` transactions.
+
+    Raises:
+        FileParsingError: If pyarrow is not installed, the file cannot be read, required
+            columns are missing or contain nulls, or data conversion fails.
+    """
+    if pa is None:
+        raise FileParsingError("Parquet and Arrow uploads require the optional 'pyarrow' package.")
+
+    try:
+        if path.lower().endswith(PARQUET_EXTENSIONS):
+            record_batches = _iter_parquet(path, batch_size)
+        else:
+            record_batches = _iter_arrow_ipc(path, batch_size)
+        for record_batch in record_batches:
+            if record_batch.num_rows:
+                yield _to_transaction_batch(record_batch)
+    except (pa.ArrowException, OSError) as e:
+        raise FileParsingError(f"Unable to read columnar file: {e}")
+
+def _check_columns(names: List[str], kind: str) -> None:
+    missing = next((name for name in _COLUMNS if name not in names), None)
+    if missing is not None:
+        raise FileParsingError(f"Missing expected column in {kind}: '{missing}'. Ensure 'Date', 'Description', 'Amount' are present.")
+
+def _iter_parquet(path: str, batch_size: int) -> Iterator["pa.RecordBatch"]:
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    _check_columns(parquet_file.schema_arrow.names, "Parquet")
+    # Only the needed columns are decoded, a row group at a time
+    yield from parquet_file.iter_batches(batch_size=batch_size, columns=list(_COLUMNS))
+
+def _iter_arrow_ipc(path: str, batch_size: int) -> Iterator["pa.RecordBatch"]:
+    with pa.memory_map(path, "r") as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            record_batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            # Not the random-access file format; try the streaming format
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            record_batches = iter(reader)
+        _check_columns(reader.schema.names, "Arrow file")
+        for record_batch in record_batches:
+            record_batch = record_batch.select(list(_COLUMNS))
+            # Slicing is zero-copy, so large record batches cost nothing extra to split
+            for offset in range(0, record_batch.num_rows, batch_size):
+                yield record_batch.slice(offset, batch_size)
+
+def _to_transaction_batch(record_batch: "pa.RecordBatch") -> TransactionBatch:
+    """
+    Converts a record batch with 'Date', 'Description' and 'Amount' columns into a TransactionBatch.
+    """
+    dates, descriptions, amounts = (record_batch.column(name) for name in _COLUMNS)
+    for name, column in zip(_COLUMNS, (dates, descriptions, amounts)):
+        if column.null_count and name != "Description":
+            raise FileParsingError(f"Column '{name}' contains empty values.")
+
+    try:
+        description_codes, description_table = _dictionary_encode(descriptions)
+        return TransactionBatch.from_columns(
+            dates=_to_days(dates),
+            amounts=pc.cast(amounts, pa.float64()).to_numpy(zero_copy_only=False),
+            description_codes=description_codes,
+            descriptions=description_table,
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        raise FileParsingError(f"Data type conversion error in columnar file: {e}. Check 'Date' and 'Amount' formats.")
+
+def _to_days(column: "pa.Array") -> np.ndarray:
+    """
+    Converts a date, timestamp or 'YYYY-MM-DD' string column to a `datetime64[D]` array.
+    """
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        column = pc.strptime(column, format="%Y-%m-%d", unit="s")
+    if not pa.types.is_date32(column.type):
+        column = pc.cast(column, pa.date32())
+    # date32 holds days since the epoch, which is exactly datetime64[D] once widened
+    return column.view(pa.int32()).to_numpy(zero_copy_only=False).astype("datetime64[D]")
+
+def _dictionary_encode(column: "pa.Array") -> Tuple[np.ndarray, List[str]]:
+    """
+    Returns the description codes and the table of distinct descriptions of a column.
+    Only the distinct values become Python strings; missing descriptions are empty.
+    """
+    if not pa.types.is_dictionary(column.type):
+        if not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+            column = pc.cast(column, pa.string())
+        column = pc.dictionary_encode(pc.fill_null(column, ""))
+    elif column.null_count:
+        column = pc.dictionary_encode(pc.fill_null(column.dictionary_decode(), ""))
+
+    codes = column.indices.to_numpy(zero_copy_only=False)
+    table = column.dictionary
+    # Dictionaries read from Parquet cover the whole column chunk; keep only the values used here
+    used = np.unique(codes)
+    if len(used) < len(table):
+        remap = np.zeros(len(table), dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        codes = remap[codes]
+        table = table.take(pa.array(used))
+    if not (pa.types.is_string(table.type) or pa.types.is_large_string(table.type)):
+        table = pc.cast(table, pa.string())
+    return codes.astype(np.int32, copy=False), table.to_pylist()
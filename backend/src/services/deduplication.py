@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from uuid import UUID
+from src.core.config import settings
+from src.core.storage import job_store
+from src.models.schemas import AnalysisJob, JobStatus
+
+# Jobs in these states can be attached to: queued or running ones coalesce, completed ones are reused
+_REUSABLE_STATUSES = (JobStatus.PENDING, JobStatus.IN_PROGRESS, JobStatus.COMPLETED)
+
+class UploadRegistry:
+    """
+    Maps uploaded content and idempotency keys to the jobs that analyze them, so a
+    repeated upload attaches to the existing job instead of parsing and categorizing
+    the same file again.
+
+    Content keys are the SHA-256 of the uploaded bytes together with everything else
+    that affects the result (tenant, file type and worksheet). Entries are dropped once
+    their job has failed or expired, and when the job is appended to, since its results
+    then no longer match the content. The registry is per process and bounded; the
+    least recently used entries are evicted first.
+    """
+    def __init__(self, max_entries: int):
+        """
+        Initializes the registry.
+
+        Args:
+            max_entries: Maximum number of content and idempotency keys remembered.
+        """
+        self.max_entries = max_entries
+        self._jobs: "OrderedDict[Tuple[str, ...], UUID]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_key(tenant: str, digest: str, filename: str, sheet: Optional[str]) -> Tuple[str, ...]:
+        """
+        Returns the key of an upload's content, from the hex SHA-256 of its bytes.
+        """
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        return ("content", tenant, digest, extension, sheet or "")
+
+    @staticmethod
+    def idempotency_key(tenant: str, key: str) -> Tuple[str, ...]:
+        """
+        Returns the key of a client-supplied `Idempotency-Key` header.
+        """
+        return ("idempotency", tenant, key)
+
+    def lookup(self, key: Tuple[str, ...]) -> Optional[AnalysisJob]:
+        """
+        Returns the job registered under `key` if it is queued, running or completed.
+        Entries of failed or expired jobs are dropped.
+        """
+        with self._lock:
+            job_id = self._jobs.get(key)
+        if job_id is None:
+            return None
+        job = job_store.get_job(job_id)
+        if job is None or job.status not in _REUSABLE_STATUSES:
+            with self._lock:
+                if self._jobs.get(key) == job_id:
+                    del self._jobs[key]
+            return None
+        with self._lock:
+            if key in self._jobs:
+                self._jobs.move_to_end(key)
+        return job
+
+    def register(self, job_id: UUID, *keys: Optional[Tuple[str, ...]]) -> None:
+        """
+        Registers a job under the given keys; None keys are ignored.
+        """
+        with self._lock:
+            for key in keys:
+                if key is None:
+                    continue
+                self._jobs[key] = job_id
+                self._jobs.move_to_end(key)
+            while len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+
+    def forget_content(self, job_id: UUID) -> None:
+        """
+        Drops the content keys of a job whose results are about to change, for instance
+        by an append. Its idempotency keys still refer to it.
+        """
+        with self._lock:
+            for key in [key for key, registered in self._jobs.items() if registered == job_id and key[0] == "content"]:
+                del self._jobs[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+upload_registry = UploadRegistry(settings.UPLOAD_DEDUP_MAX_ENTRIES)
@@ -0,0 +1,255 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+from uuid import UUID
+from src.core.metrics import EVENT_SUBSCRIBERS
+from src.core.storage import job_store, run_store
+from src.models.schemas import AnalysisJob, JobStatus
+from src.services.scheduler import scheduler
+
+# Subscribers that fall this far behind lose their oldest events; progress events are snapshots,
+# and the stream re-reads the job's status before ending, so nothing essential is lost
+_SUBSCRIBER_QUEUE_SIZE = 64
+
+# Progress events are published at most this often per job; stage changes are always published
+_PROGRESS_INTERVAL_SECONDS = 0.1
+
+Event = Tuple[str, Dict[str, Any]]
+
+def status_event(job: AnalysisJob, queue_position: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Returns the data of a status event for a job.
+    """
+    return {
+        "job_id": str(job.job_id),
+        "status": job.status.value,
+        "error_message": job.error_message,
+        "duplicates_skipped": job.duplicates_skipped,
+        "queue_position": queue_position,
+    }
+
+class JobEventBus:
+    """
+    In-process publish/subscribe channel for job status transitions and progress.
+
+    Each subscriber gets a bounded queue of (event type, data) pairs. The latest
+    progress event of every running job is kept, so a client that connects in the
+    middle of a job starts from its current progress. Must only be used from the
+    event loop; events of jobs run by other server processes are not seen.
+    """
+    def __init__(self):
+        self._subscribers: Dict[UUID, Set[asyncio.Queue]] = {}
+        self._progress: Dict[UUID, Dict[str, Any]] = {}
+
+    def publish(self, job_id: UUID, event_type: str, data: Dict[str, Any]) -> None:
+        """
+        Sends an event to every subscriber of a job.
+
+        Args:
+            job_id: The job the event belongs to.
+            event_type: "status" or "progress".
+            data: The JSON-compatible event data.
+        """
+        if event_type == "progress":
+            self._progress[job_id] = data
+        elif data.get("status") in (JobStatus.COMPLETED.value, JobStatus.FAILED.value):
+            self._progress.pop(job_id, None)
+        for queue in self._subscribers.get(job_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event_type, data))
+
+    def publish_status(self, job: AnalysisJob) -> None:
+        """
+        Publishes a job's current status.
+        """
+        self.publish(job.job_id, "status", status_event(job))
+
+    def latest_progress(self, job_id: UUID) -> Optional[Dict[str, Any]]:
+        """
+        Returns the last progress event of a running job, or None.
+        """
+        return self._progress.get(job_id)
+
+    def subscribe(self, job_id: UUID) -> asyncio.Queue:
+        """
+        Registers a subscriber for a job's events. Call `unsubscribe` when done.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: UUID, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def subscriber_count(self) -> int:
+        """
+        Returns the number of open subscriptions across jobs.
+        """
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+class JobProgress:
+    """
+    Tracks how far a running job has got and publishes it as progress events.
+
+    Parsing and categorization overlap, so completion is estimated as the share of
+    the input read times the share of parsed rows already categorized, scaled to
+    90%; the remaining stages (analysis, storage) take it to 100%. The input share
+    is known while CSV files are streamed; other formats count as read once parsed.
+    """
+    _STREAMING_SHARE = 90.0
+    _STAGE_PERCENT = {"analyzing": 90.0, "storing": 95.0}
+
+    def __init__(self, job_id: UUID, bytes_total: Optional[int] = None, bus: Optional[JobEventBus] = None):
+        """
+        Initializes the tracker.
+
+        Args:
+            job_id: The job being processed.
+            bytes_total: The size of the uploaded file, if known.
+            bus: The bus to publish to. Defaults to `job_events`.
+        """
+        self.job_id = job_id
+        self.bus = bus if bus is not None else job_events
+        self.stage = "parsing"
+        self.bytes_total = bytes_total
+        self.bytes_read = 0
+        self.parsing_done = False
+        self.rows_parsed = 0
+        self.rows_categorized = 0
+        self.batches_parsed = 0
+        self.batches_categorized = 0
+        self._published_at = 0.0
+
+    @property
+    def percent(self) -> float:
+        if self.stage in self._STAGE_PERCENT:
+            return self._STAGE_PERCENT[self.stage]
+        if self.parsing_done or not self.bytes_total:
+            read_share = 1.0 if self.parsing_done else 0.0
+        else:
+            read_share = min(self.bytes_read / self.bytes_total, 1.0)
+        categorized_share = self.rows_categorized / self.rows_parsed if self.rows_parsed else 0.0
+        return round(self._STREAMING_SHARE * read_share * categorized_share, 1)
+
+    def read(self, nbytes: int) -> None:
+        """
+        Records bytes read from the upload. Not published on its own.
+        """
+        self.bytes_read += nbytes
+
+    def parsed(self, rows: int) -> None:
+        """
+        Records a parsed batch of `rows` transactions.
+        """
+        self.rows_parsed += rows
+        self.batches_parsed += 1
+        self._publish()
+
+    def finish_parsing(self) -> None:
+        """
+        Records that the whole upload has been parsed.
+        """
+        self.parsing_done = True
+        self._publish(force=True)
+
+    def categorized(self, rows: int) -> None:
+        """
+        Records a categorized batch of `rows` transactions.
+        """
+        self.rows_categorized += rows
+        self.batches_categorized += 1
+        self._publish()
+
+    def enter_stage(self, stage: str) -> None:
+        """
+        Records that the job moved on to a later stage ("analyzing" or "storing").
+        """
+        self.stage = stage
+        self._publish(force=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the data of a progress event.
+        """
+        return {
+            "job_id": str(self.job_id),
+            "stage": self.stage,
+            "percent": self.percent,
+            "bytes_read": self.bytes_read,
+            "bytes_total": self.bytes_total,
+            "rows_parsed": self.rows_parsed,
+            "rows_categorized": self.rows_categorized,
+            "batches_parsed": self.batches_parsed,
+            "batches_categorized": self.batches_categorized,
+        }
+
+    def _publish(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._published_at < _PROGRESS_INTERVAL_SECONDS:
+            return
+        self._published_at = now
+        self.bus.publish(self.job_id, "progress", self.snapshot())
+
+job_events = JobEventBus()
+EVENT_SUBSCRIBERS.set_function(job_events.subscriber_count)
+
+def _finished(data: Dict[str, Any]) -> bool:
+    """
+    Whether a status event ends a job's stream: the job has completed or failed, with no append queued.
+    """
+    return data["status"] in (JobStatus.COMPLETED.value, JobStatus.FAILED.value) and data["queue_position"] is None
+
+async def _current_status(job_id: UUID) -> Optional[Dict[str, Any]]:
+    job = await run_store(job_store.get_job, job_id)
+    return status_event(job, scheduler.position(job_id)) if job is not None else None
+
+async def watch_job(job_id: UUID, heartbeat_seconds: float) -> AsyncIterator[Optional[Event]]:
+    """
+    Follows a job until it finishes, as a sequence of (event type, data) pairs.
+
+    The job's current status comes first (with its latest progress, if it is running),
+    then every status and progress event published for it. After `heartbeat_seconds`
+    without events the stored status is re-read: a change (such as a new queue position,
+    or a job run by another server process) is reported as a status event, otherwise
+    None is yielded so the caller can send a keep-alive.
+
+    Args:
+        job_id: The job to follow.
+        heartbeat_seconds: Longest wait for an event.
+
+    Yields:
+        Events, or None as a keep-alive. Nothing if the job does not exist.
+    """
+    # Subscribe before reading the state, so no transition falls in between
+    queue = job_events.subscribe(job_id)
+    try:
+        last = await _current_status(job_id)
+        if last is None:
+            return
+        yield "status", last
+        progress = job_events.latest_progress(job_id)
+        if progress is not None and last["status"] == JobStatus.IN_PROGRESS.value:
+            yield "progress", progress
+
+        while not _finished(last):
+            try:
+                event_type, data = await asyncio.wait_for(queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                data = await _current_status(job_id)
+                if data is None:
+                    return
+                if data == last:
+                    yield None
+                    continue
+                event_type = "status"
+            if event_type == "status":
+                # The queue position changes as the queue drains, so it is computed when sent
+                data = last = {**data, "queue_position": scheduler.position(job_id)}
+            yield event_type, data
+    finally:
+        job_events.unsubscribe(job_id, queue)
@@ -0,0 +1,51 @@
+import csv
+import io
+from typing import Dict, Iterator
+from src.core.serialization import dumps
+from src.models.batch import TransactionBatch
+
+EXPORT_FORMATS: Dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+"""Export formats and their media types."""
+
+# Column order of CSV exports; the fields of a serialized Transaction
+_CSV_COLUMNS = ("id", "date", "description", "amount", "currency", "category")
+
+def iter_export(batch: TransactionBatch, export_format: str, chunk_rows: int = 5000) -> Iterator[bytes]:
+    """
+    Encodes categorized transactions as NDJSON (one Transaction object per line) or
+    CSV (with a header row), `chunk_rows` transactions at a time. Only one chunk is
+    encoded at once, so memory use does not grow with the number of transactions.
+
+    Args:
+        batch: The categorized transactions, in the order they are exported.
+        export_format: "ndjson" or "csv".
+        chunk_rows: The number of transactions encoded per yielded chunk.
+
+    Yields:
+        UTF-8 encoded chunks of the export.
+
+    Raises:
+        ValueError: If the format is not one of `EXPORT_FORMATS`.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'.")
+    chunk_rows = max(1, chunk_rows)
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(_CSV_COLUMNS)
+        yield buffer.getvalue().encode("utf-8")
+
+    for start in range(0, len(batch), chunk_rows):
+        records = batch.to_records(range(start, min(start + chunk_rows, len(batch))))
+        if export_format == "ndjson":
+            yield b"".join(dumps(record) + b"\n" for record in records)
+        else:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([record[column] for column in _CSV_COLUMNS] for record in records)
+            yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,157 @@
+"""
+Vectorized monthly spending forecasts for every category at once.
+
+The job's spending is kept as a month x category matrix (see `RunningAggregates`).
+Two lightweight models are fitted to every column in one pass over the months:
+
+- simple exponential smoothing, with the smoothing factor chosen per category
+  from a small grid by one-step-ahead squared error;
+- seasonal naive (the same month one year earlier), once a category has two
+  full years of history.
+
+Each category uses the model with the lower one-step-ahead error, and the
+confidence of its predictions is derived from that error relative to the
+category's typical monthly spending, decreasing with the forecast horizon.
+"""
+from typing import Optional
+
+import numpy as np
+
+from src.core.config import settings
+
+SEASON_LENGTH = 12
+"""Months in one seasonal cycle."""
+
+EXPONENTIAL_SMOOTHING = "exponential_smoothing"
+SEASONAL_NAIVE = "seasonal_naive"
+
+# Smoothing factors tried for every category
+_ALPHAS = np.linspace(0.1, 0.9, 9)
+# Relative error assumed when a series is too short to have residuals
+_DEFAULT_RELATIVE_ERROR = 1.0
+_MIN_CONFIDENCE = 0.05
+_MAX_CONFIDENCE = 0.95
+
+
+class SpendingForecast:
+    """
+    Forecast spending for the months following a job's history.
+    """
+    __slots__ = ("first_month", "amounts", "confidence", "seasonal", "totals", "total_confidence")
+
+    def __init__(self, first_month: int, amounts: np.ndarray, confidence: np.ndarray, seasonal: np.ndarray,
+                 totals: np.ndarray, total_confidence: np.ndarray):
+        self.first_month = first_month
+        """The first forecast month, in months since 1970-01."""
+        self.amounts = amounts
+        """Predicted spending as a (horizon, categories) matrix."""
+        self.confidence = confidence
+        """Confidence of each prediction in `amounts`, between 0 and 1."""
+        self.seasonal = seasonal
+        """Whether each category uses the seasonal naive model rather than exponential smoothing."""
+        self.totals = totals
+        """Predicted spending across all categories for each forecast month."""
+        self.total_confidence = total_confidence
+        """Confidence of each prediction in `totals`."""
+
+    @property
+    def horizon(self) -> int:
+        """Number of forecast months."""
+        return len(self.totals)
+
+    def period(self, step: int) -> str:
+        """
+        Returns the forecast month `step` (0-based) as 'YYYY-MM'.
+        """
+        return str(np.datetime64(self.first_month + step, "M"))
+
+
+def _confidence(relative_error: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Maps relative one-step errors to confidence scores for steps 1..horizon, as a
+    (horizon, ...) array; the error of a random walk grows with the square root of the step.
+    """
+    steps = np.sqrt(np.arange(1, horizon + 1)).reshape((horizon,) + (1,) * np.ndim(relative_error))
+    return np.clip(1.0 / (1.0 + relative_error * steps), _MIN_CONFIDENCE, _MAX_CONFIDENCE)
+
+
+def forecast_spending(month_spending: np.ndarray, first_month: int, last_day: Optional[int] = None,
+                      horizon: Optional[int] = None) -> SpendingForecast:
+    """
+    Forecasts the monthly spending of every category.
+
+    If the history ends before the end of its last month, that month is incomplete:
+    it is left out of the fit and becomes the first forecast month, predicted as the
+    spending so far plus the forecast prorated over the month's remaining days.
+
+    Args:
+        month_spending: Spending as a (months, categories) matrix of consecutive months.
+        first_month: The month of the first row, in months since 1970-01.
+        last_day: Date of the latest transaction, in days since 1970-01-01.
+        horizon: Number of months to forecast. Defaults to `FORECAST_HORIZON_MONTHS`.
+
+    Returns:
+        The forecast of every category and of the total.
+    """
+    horizon = settings.FORECAST_HORIZON_MONTHS if horizon is None else horizon
+    history = np.asarray(month_spending, dtype=np.float64)
+    month_to_date = None
+    if last_day is not None and len(history) > 1:
+        last_month = np.datetime64(last_day, "D").astype("datetime64[M]")
+        if (np.datetime64(last_day + 1, "D").astype("datetime64[M]") == last_month
+                and int(last_month.astype(np.int64)) == first_month + len(history) - 1):
+            month_to_date = history[-1]
+            history = history[:-1]
+            month_start = last_month.astype("datetime64[D]")
+            days_in_month = int(((last_month + 1).astype("datetime64[D]") - month_start).astype(np.int64))
+            remaining = 1.0 - (int((np.datetime64(last_day, "D") - month_start).astype(np.int64)) + 1) / days_in_month
+    months, categories = history.shape
+    start = first_month + months
+
+    # Simple exponential smoothing for every (alpha, category) pair at once
+    level = np.broadcast_to(history[0], (len(_ALPHAS), categories)).copy()
+    alphas = _ALPHAS[:, None]
+    smoothing_errors = np.empty((months - 1, len(_ALPHAS), categories))
+    for t in range(1, months):
+        error = history[t] - level
+        smoothing_errors[t - 1] = error
+        level += alphas * error
+    best = np.argmin((smoothing_errors ** 2).sum(axis=0), axis=0) if months > 1 else np.zeros(categories, dtype=np.int64)
+    smoothing_errors = smoothing_errors[:, best, np.arange(categories)]
+    smoothing_forecast = np.broadcast_to(level[best, np.arange(categories)], (horizon, categories))
+
+    # Seasonal naive, compared with smoothing over the months both can predict
+    errors = smoothing_errors
+    amounts = smoothing_forecast
+    seasonal = np.zeros(categories, dtype=bool)
+    if months >= 2 * SEASON_LENGTH:
+        seasonal_errors = history[SEASON_LENGTH:] - history[:-SEASON_LENGTH]
+        overlap = smoothing_errors[SEASON_LENGTH - 1:]
+        seasonal = (seasonal_errors ** 2).mean(axis=0) < (overlap ** 2).mean(axis=0)
+        seasonal_forecast = history[months - SEASON_LENGTH + np.arange(horizon) % SEASON_LENGTH]
+        amounts = np.where(seasonal, seasonal_forecast, smoothing_forecast)
+        errors = np.where(seasonal, seasonal_errors, overlap)
+
+    # Confidence from the root mean squared one-step error, relative to typical spending;
+    # errors of the total assume independent categories
+    typical = np.maximum(history.mean(axis=0), 1.0)
+    if len(errors):
+        mean_squared = (errors ** 2).mean(axis=0)
+        relative_error = np.sqrt(mean_squared) / typical
+        total_relative_error = np.sqrt(mean_squared.sum()) / max(float(history.sum(axis=1).mean()), 1.0)
+    else:
+        relative_error = np.full(categories, _DEFAULT_RELATIVE_ERROR)
+        total_relative_error = _DEFAULT_RELATIVE_ERROR
+    amounts = np.maximum(amounts, 0.0)
+    if month_to_date is not None:
+        # Money already spent in the incomplete month counts towards its forecast
+        amounts = amounts.copy()
+        amounts[0] = np.maximum(month_to_date, 0.0) + amounts[0] * remaining
+    return SpendingForecast(
+        first_month=start,
+        amounts=amounts,
+        confidence=_confidence(relative_error, horizon),
+        seasonal=seasonal,
+        totals=amounts.sum(axis=1),
+        total_confidence=_confidence(np.float64(total_relative_error), horizon),
+    )
@@ -0,0 +1,540 @@
+"""
+Column mapping and format inference for heterogeneous bank exports.
+
+Statements differ in their header names (or have none), preamble lines, field
+delimiters, date formats, decimal conventions, and in holding one signed amount
+column or separate debit and credit columns. `infer_layout` samples the first rows
+of a file and records these choices in a `ColumnLayout`; `iter_layout_batches`
+then converts the rows a batch at a time, column by column: each distinct date is
+parsed once (through a cache shared across batches), and amounts are converted by
+NumPy, after one cleanup pass over the whole column when they are not plain numbers.
+
+Amounts follow the application's convention: expenses are positive. With separate
+debit and credit columns, the amount is the debit minus the credit.
+
+Problems are raised as ValueError with a message meant for the user; the parsers
+report them as FileParsingError.
+"""
+import csv
+import functools
+import re
+from datetime import date, datetime
+from io import StringIO
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.core.config import settings
+from src.models.batch import TransactionBatch
+
+SAMPLE_ROWS = 50
+"""Number of rows sampled to find the header and infer the formats of a file."""
+
+ISO_DATE_FORMAT = "%Y-%m-%d"
+"""The `strptime` format of ISO 8601 dates, which are parsed through a fast path."""
+
+# Recognized header names per field, most specific first. Headers are compared
+# lower-cased, without bracketed suffixes such as "(USD)" and without punctuation.
+_HEADER_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "date": ("date", "transaction date", "trans date", "txn date", "posting date", "posted date", "post date",
+             "booking date", "value date", "effective date", "datum", "buchungstag", "fecha"),
+    "description": ("description", "transaction description", "details", "transaction details", "memo", "narrative",
+                    "narration", "payee", "merchant", "merchant name", "particulars", "name", "reference", "text",
+                    "beschreibung", "verwendungszweck", "buchungstext", "concepto"),
+    "amount": ("amount", "transaction amount", "amt", "value", "betrag", "importe", "montant"),
+    "debit": ("debit", "debits", "debit amount", "withdrawal", "withdrawals", "withdrawal amount", "money out",
+              "paid out", "outflow", "soll"),
+    "credit": ("credit", "credits", "credit amount", "deposit", "deposits", "deposit amount", "money in",
+               "paid in", "inflow", "haben"),
+}
+
+_DELIMITERS = (",", ";", "\t", "|")
+
+_YEAR_FIRST_FORMATS = (ISO_DATE_FORMAT, "%Y/%m/%d", "%Y.%m.%d", "%Y%m%d")
+_MONTH_FIRST_FORMATS = ("%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%m-%d-%y")
+_DAY_FIRST_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d.%m.%Y", "%d.%m.%y")
+# Each day/month-ambiguous format and its counterpart with day and month swapped
+_SWAPPED_DATE_FORMATS = {
+    date_format: date_format.replace("%d", "\0").replace("%m", "%d").replace("\0", "%m")
+    for date_format in _MONTH_FIRST_FORMATS + _DAY_FIRST_FORMATS
+}
+_MONTH_NAME_FORMATS = ("%d %b %Y", "%d-%b-%Y", "%d/%b/%Y", "%d %b %y", "%d-%b-%y", "%d %B %Y",
+                       "%b %d, %Y", "%B %d, %Y", "%b %d %Y")
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Excel serial dates count days from 1899-12-30
+_EXCEL_EPOCH_ORDINAL = date(1899, 12, 30).toordinal()
+
+# Amount cleanup, applied to a whole column joined by newlines; [^\S\n] is whitespace within a line
+_CREDIT_SUFFIX = re.compile(r"^[^\S\n]*(.*?)[^\S\n]*(?:CR|Cr|cr)\.?[^\S\n]*$", re.MULTILINE)
+_DEBIT_SUFFIX = re.compile(r"[^\S\n]*(?:DR|Dr|dr)\.?[^\S\n]*$", re.MULTILINE)
+_PARENTHESES = re.compile(r"^[^\S\n]*\((.*)\)[^\S\n]*$", re.MULTILINE)
+_TRAILING_MINUS = re.compile(r"^[^\S\n]*([^\n-]*?)[^\S\n]*-[^\S\n]*$", re.MULTILINE)
+_AMOUNT_NOISE = re.compile(r"[^0-9.\-\n]")
+_BLANK_LINE = re.compile(r"^$", re.MULTILINE)
+# A comma followed by one or two final digits ("12,5", "12,50 EUR"), or a dot grouping thousands before a comma
+_DECIMAL_COMMA = re.compile(r",\d{1,2}(?!\d)[^\d,.]*$|\.\d{3},")
+# Digits with separators, optionally signed, bracketed, or with a currency symbol or code
+_NUMBER = re.compile(r"[(+\-]?[^\w\s]{0,3}[A-Z]{0,3}\s?[+\-]?[\d.,'\s]*\d[\d.,'\s]*\)?-?(?:\s?[A-Za-z]{2,3}\.?|[^\w\s]{0,3})")
+
+class ColumnLayout:
+    """
+    Where a file's fields are and how they are written, as inferred by `infer_layout`.
+    Sent to worker processes along with blocks of CSV records, so it must stay picklable.
+    """
+    __slots__ = ("date", "description", "amount", "debit", "credit", "date_format", "decimal", "delimiter",
+                 "alternate_date_format")
+
+    def __init__(self, date: int, description: int, amount: Optional[int] = None, debit: Optional[int] = None,
+                 credit: Optional[int] = None, date_format: str = ISO_DATE_FORMAT, decimal: str = ".",
+                 delimiter: str = ",", alternate_date_format: Optional[str] = None):
+        """
+        Initializes the layout.
+
+        Args:
+            date: Index of the date column.
+            description: Index of the description column.
+            amount: Index of the signed amount column, if the file has one.
+            debit: Index of the debit column, for files with separate debit and credit columns.
+            credit: Index of the credit column, for files with separate debit and credit columns.
+            date_format: The `strptime` format of dates written as text.
+            decimal: The decimal separator of amounts written as text, "." or ",".
+            delimiter: The field delimiter of CSV files.
+            alternate_date_format: While every date read fits both orders (every day at most 12),
+                the format with day and month swapped; None once the order is settled
+                (see `settle_date_order`).
+        """
+        self.date = date
+        self.description = description
+        self.amount = amount
+        self.debit = debit
+        self.credit = credit
+        self.date_format = date_format
+        self.decimal = decimal
+        self.delimiter = delimiter
+        self.alternate_date_format = alternate_date_format
+
+    @property
+    def width(self) -> int:
+        """
+        The number of cells a row needs to hold every mapped column.
+        """
+        return max(i for i in (self.date, self.description, self.amount, self.debit, self.credit) if i is not None) + 1
+
+def infer_csv_layout(records: Sequence[str]) -> Tuple[ColumnLayout, int]:
+    """
+    Infers the layout of a CSV file from its first records, including the delimiter.
+
+    Args:
+        records: The first records of the file, each a complete line of CSV text.
+
+    Returns:
+        The layout, and the number of leading records (preamble and header) that hold no transactions.
+
+    Raises:
+        ValueError: If no date, description or amount column can be identified, or
+            the sampled dates are in an unrecognized format.
+    """
+    text = "".join(records)
+    # Try the most frequent delimiters first; the right one is the one that yields a header
+    delimiters = sorted(_DELIMITERS, key=text.count, reverse=True)
+    parsed = {delimiter: [next(csv.reader(StringIO(record), delimiter=delimiter), []) for record in records]
+              for delimiter in delimiters}
+    delimiter = next((d for d in delimiters if _find_header(parsed[d]) is not None), delimiters[0])
+    layout, skip = infer_layout(parsed[delimiter], "CSV")
+    layout.delimiter = delimiter
+    return layout, skip
+
+def infer_layout(rows: Sequence[Sequence[Any]], kind: str) -> Tuple[ColumnLayout, int]:
+    """
+    Infers the layout of a file from its first rows.
+
+    The header is the first row naming a date column and an amount, debit or credit
+    column (see `_HEADER_ALIASES`); rows before it are skipped as preamble. Without
+    such a row, the file is taken to have no header, and columns are identified from
+    their content: dates, then numbers, then the longest text.
+
+    Args:
+        rows: The first rows of the file, as sequences of cell values.
+        kind: The kind of file, for error messages ("CSV" or "Excel").
+
+    Returns:
+        The layout, and the number of leading rows (preamble and header) that hold no transactions.
+
+    Raises:
+        ValueError: If no date, description or amount column can be identified, or
+            the sampled dates are in an unrecognized format.
+    """
+    header_index = _find_header(rows)
+    skip = 0 if header_index is None else header_index + 1
+    sample = [list(row) for row in rows[skip:] if any(_present(cell) for cell in row)][:SAMPLE_ROWS]
+    if header_index is not None:
+        columns = _map_headers(rows[header_index])
+    else:
+        columns = _map_content(sample)
+        if not ("date" in columns and "amount" in columns):
+            # Most likely a header lacking a recognized column; report what it lacks
+            columns = next(filter(None, map(_map_headers, rows[:SAMPLE_ROWS])), columns)
+
+    missing = None if "date" in columns else "Date"
+    if missing is None and "description" not in columns:
+        description = _description_by_content(sample, set(columns.values()))
+        if description is None:
+            missing = "Description"
+        else:
+            columns["description"] = description
+    if missing is None and not ("amount" in columns or "debit" in columns or "credit" in columns):
+        missing = "Amount"
+    if missing is not None:
+        raise ValueError(f"Missing expected column in {kind}: '{missing}'. Ensure 'Date', 'Description', 'Amount' "
+                         f"(or alternatives such as 'Posting Date', 'Memo', 'Debit' and 'Credit') are present.")
+
+    has_amount = "amount" in columns
+    amount_columns = [columns[name] for name in ("amount", "debit", "credit") if name in columns]
+    date_format, alternate_date_format = _infer_date_format(_column(sample, columns["date"]), kind)
+    layout = ColumnLayout(
+        date=columns["date"],
+        description=columns["description"],
+        amount=columns.get("amount"),
+        debit=None if has_amount else columns.get("debit"),
+        credit=None if has_amount else columns.get("credit"),
+        date_format=date_format,
+        alternate_date_format=alternate_date_format,
+        decimal=_infer_decimal([value for i in amount_columns for value in _column(sample, i)]),
+    )
+    return layout, skip
+
+def iter_layout_batches(rows: Iterable[Sequence[Any]], layout: ColumnLayout, batch_size: int, kind: str) -> Iterator[TransactionBatch]:
+    """
+    Converts data rows into batches of transactions, a column at a time.
+
+    Rows without a date, or too short to hold every mapped column, are skipped: bank
+    exports use them for blank lines, section titles, totals and balances. If the
+    layout's day/month order is still open, rows are held back until a date settles
+    it (see `settle_date_order`), so that every row is read in the same order.
+
+    Args:
+        rows: The data rows (after the header), as sequences of cell values: strings
+            for CSV files, native values (dates, numbers, strings or None) for Excel files.
+        layout: The file's layout.
+        batch_size: The maximum number of transactions per yielded batch.
+        kind: The kind of file, for error messages ("CSV" or "Excel").
+
+    Yields:
+        TransactionBatch objects of at most `batch_size` transactions.
+
+    Raises:
+        ValueError: If a date or amount cannot be converted.
+    """
+    rows = _settled_rows(rows, layout)
+    width = layout.width
+    date_col, description_col = layout.date, layout.description
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return
+        chunk = [row for row in chunk if len(row) >= width and _present(row[date_col])]
+        if not chunk:
+            continue
+
+        try:
+            days = to_days([row[date_col] for row in chunk], layout.date_format)
+            if layout.amount is not None:
+                amounts = to_amounts([row[layout.amount] for row in chunk], layout.decimal)
+            else:
+                amounts = np.zeros(len(chunk))
+                # Some banks sign their debit or credit columns; the column says which it is
+                if layout.debit is not None:
+                    amounts += np.abs(to_amounts([row[layout.debit] for row in chunk], layout.decimal, blank=0.0))
+                if layout.credit is not None:
+                    amounts -= np.abs(to_amounts([row[layout.credit] for row in chunk], layout.decimal, blank=0.0))
+        except ValueError as e:
+            raise ValueError(f"Data type conversion error in {kind}: {e}. Check 'Date' and 'Amount' formats.") from e
+
+        descriptions: Dict[str, int] = {}
+        codes = [descriptions.setdefault(_text(row[description_col]), len(descriptions)) for row in chunk]
+        yield TransactionBatch.from_columns(
+            dates=days.astype("datetime64[D]"),
+            amounts=amounts,
+            description_codes=np.array(codes, dtype=np.int32),
+            descriptions=list(descriptions),
+        )
+
+def to_days(values: Sequence[Any], date_format: str = ISO_DATE_FORMAT) -> np.ndarray:
+    """
+    Converts a column of dates to days since 1970-01-01.
+
+    Each distinct value is parsed once, since statements hold far fewer distinct
+    dates than rows. Text is parsed with `date_format`, ignoring any time of day;
+    Excel cells may also hold dates, datetimes or serial day numbers.
+
+    Returns:
+        An int64 array.
+
+    Raises:
+        ValueError: If a value is not a date in the expected format.
+    """
+    days = {value: _to_day(value, date_format) for value in dict.fromkeys(values)}
+    return np.fromiter(map(days.__getitem__, values), dtype=np.int64, count=len(values))
+
+def to_amounts(values: Sequence[Any], decimal: str = ".", blank: Optional[float] = None) -> np.ndarray:
+    """
+    Converts a column of amounts to floats.
+
+    Plain numbers are converted by NumPy directly. Otherwise the whole column is
+    cleaned in a few passes over its joined text: thousands separators, currency
+    symbols and codes, and spaces are dropped, the decimal separator normalized, and
+    negatives written as "(12.50)", "12.50-" or "12.50 CR" given a minus sign.
+
+    Args:
+        values: The cell values: strings, or numbers (and None) from Excel files.
+        decimal: The decimal separator used in text, "." or ",".
+        blank: The value of empty cells. None means empty cells are an error.
+
+    Returns:
+        A float64 array.
+
+    Raises:
+        ValueError: If a value is not a number.
+    """
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        return np.array(values, dtype=np.float64)
+
+    texts = [_amount_text(value, decimal) for value in values]
+    if decimal == ".":
+        try:
+            return np.array(texts, dtype=np.float64)
+        except ValueError:
+            pass # Not plain numbers; clean them up below
+
+    text = "\n".join(texts)
+    if text.count("\n") != len(texts) - 1:
+        raise ValueError("amounts must not span several lines")
+    text = _DEBIT_SUFFIX.sub("", _CREDIT_SUFFIX.sub(r"-\1", text))
+    text = _TRAILING_MINUS.sub(r"-\1", _PARENTHESES.sub(r"-\1", text))
+    if decimal == ",":
+        text = text.replace(".", "").replace(",", ".")
+    text = _AMOUNT_NOISE.sub("", text)
+    if blank is not None:
+        text = _BLANK_LINE.sub(repr(blank), text)
+    cleaned = text.split("\n")
+    try:
+        return np.array(cleaned, dtype=np.float64)
+    except ValueError:
+        bad = next(value for value, clean in zip(values, cleaned) if not _is_float(clean))
+        raise ValueError(f"could not convert amount {bad!r} to a number")
+
+def _to_day(value: Any, date_format: str) -> int:
+    if isinstance(value, str):
+        return _parse_date(value, date_format)
+    if isinstance(value, (date, datetime)):
+        return value.toordinal() - _EPOCH_ORDINAL
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value) + _EXCEL_EPOCH_ORDINAL - _EPOCH_ORDINAL
+    raise ValueError(f"unsupported date value {value!r}")
+
+@functools.lru_cache(maxsize=65536)
+def _parse_date(value: str, date_format: str) -> int:
+    """
+    Parses one date written as text into days since 1970-01-01. Cached, since the
+    batches of a statement, and statements of the same period, share their dates.
+    """
+    value = value.strip()
+    if date_format == ISO_DATE_FORMAT:
+        try:
+            return date.fromisoformat(value[:10]).toordinal() - _EPOCH_ORDINAL
+        except ValueError:
+            pass # For instance a single-digit month, which strptime accepts
+    try:
+        return datetime.strptime(value, date_format).toordinal() - _EPOCH_ORDINAL
+    except ValueError:
+        if " " in date_format:
+            raise
+        # Timestamps: drop the time of day
+        return datetime.strptime(re.split(r"[T ]", value, maxsplit=1)[0], date_format).toordinal() - _EPOCH_ORDINAL
+
+def _date_formats() -> Tuple[str, ...]:
+    """
+    Returns the candidate date formats in order of preference. Dates such as 03/04/2024
+    are read month first unless `INGEST_DAY_FIRST` is set; a sampled day above 12 settles it.
+    """
+    if settings.INGEST_DAY_FIRST:
+        ambiguous = _DAY_FIRST_FORMATS + _MONTH_FIRST_FORMATS
+    else:
+        ambiguous = _MONTH_FIRST_FORMATS + _DAY_FIRST_FORMATS
+    return _YEAR_FIRST_FORMATS + ambiguous + _MONTH_NAME_FORMATS
+
+def _infer_date_format(values: Sequence[Any], kind: str) -> Tuple[str, Optional[str]]:
+    """
+    Picks the first candidate format that parses every sampled date. If the format with
+    day and month swapped parses them too, the sample left the order open, and that
+    format is returned as the alternate for later rows to decide on.
+    """
+    texts = [value.strip() for value in values if isinstance(value, str) and value.strip()]
+    if not texts:
+        return ISO_DATE_FORMAT, None # Native dates, or nothing sampled
+    for date_format in _date_formats():
+        if all(_parses_as(text, date_format) for text in texts):
+            swapped = _SWAPPED_DATE_FORMATS.get(date_format)
+            if swapped and all(_parses_as(text, swapped) for text in texts):
+                return date_format, swapped
+            return date_format, None
+    raise ValueError(f"Unrecognized date format in {kind}: '{texts[0]}'. Check 'Date' and 'Amount' formats.")
+
+def settle_date_order(layout: ColumnLayout, values: Iterable[Any]) -> bool:
+    """
+    Reads further dates of a file whose sampled dates fit both the day-first and the
+    month-first order. The first date that fits only one of them settles the order:
+    `layout.date_format` becomes that format and `layout.alternate_date_format` None.
+    A date that fits neither settles the preferred order, so that converting it
+    reports the error.
+
+    Args:
+        layout: The file's layout; updated once the order is settled.
+        values: Values of the date column, in file order.
+
+    Returns:
+        Whether the order is settled (always true for layouts without an alternate format).
+    """
+    for value in values:
+        if layout.alternate_date_format is None:
+            return True
+        text = value.strip() if isinstance(value, str) else ""
+        if not text:
+            continue
+        preferred = _parses_as(text, layout.date_format)
+        alternate = _parses_as(text, layout.alternate_date_format)
+        if preferred != alternate:
+            layout.date_format = layout.date_format if preferred else layout.alternate_date_format
+            layout.alternate_date_format = None
+        elif not preferred:
+            layout.alternate_date_format = None
+    return layout.alternate_date_format is None
+
+def _settled_rows(rows: Iterable[Sequence[Any]], layout: ColumnLayout) -> Iterator[Sequence[Any]]:
+    """
+    Yields the rows, holding them back while the layout's day/month order is open. If
+    the rows end before a date settles it, the preferred order is kept.
+    """
+    rows = iter(rows)
+    held = []
+    for row in rows:
+        if layout.alternate_date_format is None:
+            yield from held
+            yield row
+            break
+        held.append(row)
+        if len(row) > layout.date:
+            settle_date_order(layout, (row[layout.date],))
+    else:
+        layout.alternate_date_format = None
+        yield from held
+    yield from rows
+
+def _parses_as(text: str, date_format: str) -> bool:
+    try:
+        _parse_date(text, date_format)
+        return True
+    except ValueError:
+        return False
+
+def _infer_decimal(values: Sequence[Any]) -> str:
+    """
+    Returns "," if the sampled amounts use a decimal comma (as in "1.234,56" or "12,5"), otherwise ".".
+    """
+    return "," if any(isinstance(value, str) and _DECIMAL_COMMA.search(value) for value in values) else "."
+
+def _normalize_header(value: Any) -> str:
+    text = re.sub(r"[(\[].*?[)\]]", " ", _text(value).lower())
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+def _map_headers(row: Sequence[Any]) -> Dict[str, int]:
+    """
+    Maps each field to the column whose header is its most specific alias.
+    """
+    headers = [_normalize_header(cell) for cell in row]
+    columns: Dict[str, int] = {}
+    for field, aliases in _HEADER_ALIASES.items():
+        matches = [(aliases.index(header), i) for i, header in enumerate(headers)
+                   if header in aliases and i not in columns.values()]
+        if matches:
+            columns[field] = min(matches)[1]
+    return columns
+
+def _find_header(rows: Sequence[Sequence[Any]]) -> Optional[int]:
+    for i, row in enumerate(rows[:SAMPLE_ROWS]):
+        columns = _map_headers(row)
+        if "date" in columns and ("amount" in columns or "debit" in columns or "credit" in columns):
+            return i
+    return None
+
+def _map_content(rows: Sequence[Sequence[Any]]) -> Dict[str, int]:
+    """
+    Identifies the date and amount columns of a file without a header from the sampled values.
+    """
+    width = max((len(row) for row in rows), default=0)
+    columns: Dict[str, int] = {}
+    for i in range(width):
+        values = [value for value in _column(rows, i) if _present(value)]
+        if not values:
+            continue
+        if "date" not in columns and all(_is_date_like(value) for value in values):
+            columns["date"] = i
+        elif "amount" not in columns and all(_is_number_like(value) for value in values):
+            columns["amount"] = i
+    return columns
+
+def _description_by_content(rows: Sequence[Sequence[Any]], taken: Set[int]) -> Optional[int]:
+    """
+    Returns the unmapped column with the longest text on average, if any holds text.
+    """
+    width = max((len(row) for row in rows), default=0)
+    best, best_length = None, 0.0
+    for i in range(width):
+        if i in taken:
+            continue
+        values = [_text(value) for value in _column(rows, i)]
+        if not values or all(_is_number_like(value) for value in values if value):
+            continue
+        length = sum(map(len, values)) / len(values)
+        if length > best_length:
+            best, best_length = i, length
+    return best
+
+def _is_date_like(value: Any) -> bool:
+    if isinstance(value, (date, datetime)):
+        return True
+    return isinstance(value, str) and any(_parses_as(value, date_format) for date_format in _date_formats())
+
+def _is_number_like(value: Any) -> bool:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return True
+    return isinstance(value, str) and _NUMBER.fullmatch(value.strip()) is not None
+
+def _is_float(text: str) -> bool:
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+def _column(rows: Sequence[Sequence[Any]], index: int) -> List[Any]:
+    return [row[index] for row in rows if len(row) > index]
+
+def _present(value: Any) -> bool:
+    return value is not None and (not isinstance(value, str) or bool(value.strip()))
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+def _amount_text(value: Any, decimal: str) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    # A number from an Excel cell, written the way the column's text is
+    text = format(float(value), "f")
+    return text.replace(".", ",") if decimal == "," else text
@@ -1,60 +1,286 @@
-from groq import Groq
-from typing import List, Dict
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import TYPE_CHECKING, Any, List, Dict, Optional
 from src.core.config import settings
+from src.core.metrics import ERRORS, LLM_REQUESTS, LLM_REQUEST_SECONDS, LLM_TOKENS
+
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES: List[str] = [
+    'Groceries', 'Utilities', 'Rent', 'Transport', 'Dining Out', 'Entertainment', 'Shopping',
+    'Salary', 'Investments', 'Healthcare', 'Education', 'Travel', 'Uncategorized',
+]
+"""The categories the model may assign to a transaction."""
+
+_CANONICAL_CATEGORIES: Dict[str, str] = {category.lower(): category for category in CATEGORIES}
+
+# Matches one "<id>: <category>" line of the model's response
+_RESPONSE_LINE = re.compile(r"^\s*(\d+)\s*[:.)\-]\s*(.+?)\s*$")
+
+# Rough size of one "<id>: <category>" answer line, in tokens
+_OUTPUT_TOKENS_PER_ITEM = 8
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate for budgeting prompts (about four characters per token).
+    """
+    return len(text) // 4 + 1
+
+def _single_line(description: str) -> str:
+    """
+    Collapses every run of whitespace, including line breaks (which quoted CSV fields may
+    contain), into one space, so a description cannot add '<ID>: ...' lines to the prompt.
+    """
+    return " ".join(description.split())
+
+class _RateLimiter:
+    """
+    Spaces request starts evenly so that at most `requests_per_minute` are issued per minute.
+    """
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
 
 class GroqClient:
     """
     Client for interacting with the Groq API to perform AI inference.
+
+    Requests go through the SDK's async client over one shared HTTP connection pool,
+    so concurrent jobs reuse keep-alive connections instead of paying a TLS handshake
+    per call. The SDK client is created on first use, so the application imports and
+    starts without credentials; a missing API key only fails categorization requests.
     """
     def __init__(self):
         """
-        Initializes the GroqClient, loading the API key from settings
-        and setting the default model.
+        Initializes the GroqClient with the default model. No connection is made and
+        the API key is not checked until the first request.
+        """
+        self.model: str = "llama3-8b-8192" # As decided in research.md
+        self._client: Optional["AsyncGroq"] = None
+        self._owns_client = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._rate_limiter: Optional[_RateLimiter] = None
+
+    @property
+    def client(self) -> Any:
+        """
+        The async SDK client, or the stand-in that replaced it. None until first use.
+        """
+        return self._client
+
+    @client.setter
+    def client(self, client: Any) -> None:
+        # A client supplied from outside (e.g. a stand-in for benchmarks) is used as is, on any event loop
+        self._client = client
+        self._owns_client = False
+
+    def _get_client(self) -> Any:
+        """
+        Returns the SDK client, creating it on first use.
+
+        The concurrency limits and the connection pool belong to the event loop that
+        first used them, so they are recreated when called from another loop (for
+        instance after the application was restarted in the same process).
+
+        Raises:
+            ValueError: If GROQ_API_KEY is not set.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(settings.GROQ_MAX_CONCURRENCY)
+            self._rate_limiter = _RateLimiter(settings.GROQ_REQUESTS_PER_MINUTE)
+            if self._owns_client:
+                self._client = None
+            self._loop = loop
+        if self._client is None:
+            self._client = self._create_client()
+            self._owns_client = True
+        return self._client
+
+    @staticmethod
+    def _create_client() -> "AsyncGroq":
+        """
+        Builds the async SDK client on a pooled HTTP client configured from settings.
         """
         if not settings.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY is not set in environment variables.")
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
-        self.model: str = "llama3-8b-8192" # As decided in research.md
+        # Imported here so the SDK's import cost is only paid when the model is actually used
+        import httpx
+        from groq import AsyncGroq
+
+        timeout = httpx.Timeout(settings.GROQ_REQUEST_TIMEOUT, connect=settings.GROQ_CONNECT_TIMEOUT)
+        http_client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GROQ_KEEPALIVE_EXPIRY,
+            ),
+        )
+        return AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL or None,
+            timeout=timeout,
+            max_retries=0, # Retries are handled per batch, with backoff, in `_categorize_batch`
+            http_client=http_client,
+        )
 
-    async def categorize_transactions(self, descriptions: List[str]) -> List[str]:
+    async def aclose(self) -> None:
+        """
+        Closes the pooled connections of the SDK client, if one was created on the running event loop.
+        """
+        if not self._owns_client or self._client is None:
+            return
+        client, self._client = self._client, None
+        if self._loop is asyncio.get_running_loop():
+            await client.close()
+
+    async def categorize_transactions(self, descriptions: List[str]) -> List[Optional[str]]:
         """
         Sends transaction descriptions to Groq API for categorization using the Llama 3 8B model.
-        
+
+        Descriptions are split into batches that fit the prompt and output token budgets,
+        and the batches are sent concurrently, bounded by `GROQ_MAX_CONCURRENCY` and
+        `GROQ_REQUESTS_PER_MINUTE`. Each batch retries independently with exponential backoff.
+
         Args:
             descriptions: A list of transaction descriptions (strings) to categorize.
-            
+
         Returns:
-            A list of categories (strings) corresponding to the input descriptions.
-            
+            A list of categories corresponding to the input descriptions. An entry is None
+            if the model did not return a valid category for that description, including
+            when its batch still failed after `GROQ_MAX_RETRIES` retries.
+
         Raises:
-            ValueError: If the API key is not set.
+            ValueError: If GROQ_API_KEY is not set.
+        """
+        if not descriptions:
+            return []
+        client = self._get_client()
+        batches = self._split_batches(descriptions)
+        answers = await asyncio.gather(*(self._categorize_batch(client, batch) for batch in batches))
+
+        categories: List[Optional[str]] = [None] * len(descriptions)
+        for answer in answers:
+            for item_id, category in answer.items():
+                categories[item_id] = category
+        return categories
+
+    def _split_batches(self, descriptions: List[str]) -> List[Dict[int, str]]:
+        """
+        Groups descriptions into batches that respect the input and output token budgets.
+
+        Returns:
+            A list of batches, each mapping an item ID (the index in `descriptions`) to its
+            description, collapsed onto a single line.
+        """
+        max_items = max(1, settings.GROQ_MAX_OUTPUT_TOKENS // _OUTPUT_TOKENS_PER_ITEM)
+        batches: List[Dict[int, str]] = []
+        batch: Dict[int, str] = {}
+        batch_tokens = 0
+        for item_id, description in enumerate(descriptions):
+            description = _single_line(description)
+            tokens = estimate_tokens(f"{item_id}: {description}\n")
+            if batch and (batch_tokens + tokens > settings.GROQ_BATCH_INPUT_TOKENS or len(batch) >= max_items):
+                batches.append(batch)
+                batch, batch_tokens = {}, 0
+            batch[item_id] = description
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _categorize_batch(self, client: Any, batch: Dict[int, str]) -> Dict[int, str]:
+        """
+        Categorizes one batch, retrying with exponential backoff and jitter on failure.
+
+        Args:
+            client: The SDK client to send the request with.
+            batch: A mapping of item ID to description.
+
+        Returns:
+            A mapping of item ID to category, for the items the model answered validly.
+            Empty if the batch still fails after `GROQ_MAX_RETRIES` retries, so the other
+            batches of the request keep their answers.
         """
-        # For simplicity, we'll send all descriptions in one prompt.
-        # In a real-world scenario, you might batch these or use a more sophisticated prompt.
         prompt = (
             "Categorize the following financial transaction descriptions into one of these categories: "
-            "['Groceries', 'Utilities', 'Rent', 'Transport', 'Dining Out', 'Entertainment', 'Shopping', 'Salary', 'Investments', 'Healthcare', 'Education', 'Travel', 'Uncategorized']. "
+            f"{CATEGORIES}. "
             "If a description doesn't fit, use 'Uncategorized'. "
-            "Return only a comma-separated list of categories, in the same order as the input descriptions. "
-            "Example: 'Coffee Shop, Supermarket' -> 'Dining Out, Groceries'\n\n"
-            "Descriptions:\n" + "\n".join(descriptions)
+            "Each description is prefixed with its ID. Return exactly one line per description, "
+            "in the form '<ID>: <category>', and nothing else. "
+            "Example: '1: Coffee Shop' and '2: Supermarket' -> '1: Dining Out' and '2: Groceries'\n\n"
+            "Descriptions:\n" + "\n".join(f"{item_id}: {description}" for item_id, description in batch.items())
         )
 
-        chat_completion = await self.client.chat.completions.create( # Await the API call
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model=self.model,
-            temperature=0.0, # Keep it deterministic for categorization
-            max_tokens=1024,
-        )
-        
-        response_content: str = chat_completion.choices[0].message.content
-        # Assuming the model returns a comma-separated list
-        categories: List[str] = [cat.strip() for cat in response_content.split(',')]
-        return categories
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    await self._rate_limiter.acquire()
+                    started = time.perf_counter()
+                    chat_completion = await client.chat.completions.create(
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": prompt,
+                            }
+                        ],
+                        model=self.model,
+                        temperature=0.0, # Keep it deterministic for categorization
+                        max_tokens=settings.GROQ_MAX_OUTPUT_TOKENS,
+                    )
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started)
+                content = chat_completion.choices[0].message.content
+                LLM_REQUESTS.inc(outcome="success")
+                # Prefer the usage reported by the API; estimate it when missing
+                usage = getattr(chat_completion, "usage", None)
+                LLM_TOKENS.inc(getattr(usage, "prompt_tokens", None) or estimate_tokens(prompt), kind="prompt")
+                LLM_TOKENS.inc(getattr(usage, "completion_tokens", None) or estimate_tokens(content), kind="completion")
+                return self._parse_response(content, batch)
+            except Exception as e:
+                LLM_REQUESTS.inc(outcome="error")
+                ERRORS.inc(stage="llm")
+                attempt += 1
+                if attempt > settings.GROQ_MAX_RETRIES:
+                    logger.error(f"Categorization batch of {len(batch)} items failed after {attempt} attempts: {e}. Giving up on it.")
+                    return {}
+                delay = settings.GROQ_RETRY_BASE_DELAY * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                logger.warning(f"Categorization batch of {len(batch)} items failed (attempt {attempt}): {e}. Retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _parse_response(response_content: str, batch: Dict[int, str]) -> Dict[int, str]:
+        """
+        Parses '<ID>: <category>' lines, ignoring unknown IDs and invalid categories.
+        """
+        answers: Dict[int, str] = {}
+        for line in response_content.splitlines():
+            match = _RESPONSE_LINE.match(line)
+            if not match:
+                continue
+            item_id = int(match.group(1))
+            category = _CANONICAL_CATEGORIES.get(match.group(2).strip("'\"").lower())
+            if item_id in batch and category is not None:
+                answers[item_id] = category
+        return answers
 
 groq_client = GroqClient()
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from uuid import UUID
+from src.core.config import settings
+from src.core.metrics import INDEX_CACHE_BYTES
+from src.core.storage import job_store, run_store
+from src.models.batch import TransactionBatch
+from src.models.index import TransactionIndex
+
+StoredIndex = Tuple[TransactionBatch, TransactionIndex]
+
+class IndexCache:
+    """
+    In-process LRU of deserialized transaction batches and their query indexes,
+    bounded by an approximate byte budget.
+
+    With a persistent job store, reading a job's index means decompressing the
+    transactions and decoding the index arrays, which costs O(job size). Filtered
+    and paginated queries are answered from the cached objects instead, so a page
+    costs about its own size. The in-memory store already returns live objects, so
+    with it the cache is bypassed.
+
+    Like `ResultCache`, entries are tagged with the job's `results_version`, so an
+    append in any worker process makes the entries cached before it stale.
+    """
+    def __init__(self, max_bytes: int):
+        """
+        Initializes the cache.
+
+        Args:
+            max_bytes: Approximate memory budget for cached batches and indexes.
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[UUID, Tuple[int, StoredIndex, int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[UUID, int], "asyncio.Task[Optional[StoredIndex]]"] = {}
+        self.hits = 0
+        """Queries answered from a cached index."""
+        self.misses = 0
+        """Queries that required loading a job's index from the store."""
+
+    async def get(self, job_id: UUID, version: int,
+                  load_index: Callable[[], Optional[StoredIndex]]) -> Optional[StoredIndex]:
+        """
+        Returns a job's transactions and index, loading them on a miss. Concurrent
+        misses for the same job share one load.
+
+        Args:
+            job_id: The ID of the job.
+            version: The job's current `results_version`; entries of other versions are stale.
+            load_index: Returns the job's transactions and index from the job store, or None.
+
+        Returns:
+            The transactions and their index, or None if the job has no results.
+        """
+        if not job_store.persistent:
+            return load_index()
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(job_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        key = (job_id, version)
+        pending = self._pending.get(key)
+        if pending is None:
+            # The load runs in its own task, so a cancelled request never strands the other waiters
+            pending = asyncio.create_task(self._load(job_id, version, load_index))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, job_id: UUID, version: int,
+                    load_index: Callable[[], Optional[StoredIndex]]) -> Optional[StoredIndex]:
+        """
+        Loads a job's transactions and index in a worker thread and caches them.
+        """
+        stored = await run_store(load_index)
+        if stored is not None:
+            self._store(job_id, version, stored)
+        return stored
+
+    def invalidate(self, job_id: UUID) -> None:
+        """
+        Drops a job's cached index, for instance after its results change.
+        """
+        with self._lock:
+            entry = self._entries.pop(job_id, None)
+            if entry is not None:
+                self._size -= entry[2]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit/miss counters and the current footprint.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "jobs": len(self._entries), "bytes": self._size}
+
+    def _store(self, job_id: UUID, version: int, stored: StoredIndex) -> None:
+        size = stored[0].nbytes + stored[1].nbytes
+        if size > self.max_bytes:
+            return # Too large to cache; loaded from the store on every query instead
+        with self._lock:
+            previous = self._entries.get(job_id)
+            if previous is not None:
+                if previous[0] > version:
+                    return # A load that started before an append finished after it
+                del self._entries[job_id]
+                self._size -= previous[2]
+            self._entries[job_id] = (version, stored, size)
+            self._size += size
+            # Evict least recently used jobs; the one just stored fits on its own
+            while self._size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+index_cache = IndexCache(settings.INDEX_CACHE_MAX_BYTES)
+INDEX_CACHE_BYTES.set_function(lambda: index_cache.stats()["bytes"])
@@ -1,35 +1,118 @@
-from typing import List
+import asyncio
+import codecs
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import weakref
+import zipfile
+from collections import deque
+from typing import Any, AsyncIterator, BinaryIO, Deque, Dict, List, Optional, Tuple
 from fastapi import UploadFile
-from src.models.schemas import AnalysisJob, JobStatus, Transaction
-from src.core.storage import db, results_db
-from src.services.parser import parse_csv, parse_excel, FileParsingError
+from src.models.schemas import AnalysisJob, JobStatus
+from src.models.batch import TransactionBatch
+from src.core.config import settings
+from src.core.storage import job_store, run_store
+from src.core.executor import get_process_pool, run_cpu_bound
+from src.core.metrics import JOB_STAGE_SECONDS, JOB_SECONDS, JOBS, ROWS_PROCESSED, DUPLICATE_ROWS, ERRORS
+from src.services.parser import CsvStreamParser, iter_excel_batches, FileParsingError
+from src.services.formats import ColumnLayout
+from src.services.columnar_parser import COLUMNAR_EXTENSIONS, columnar_available, iter_columnar_batches
+from src.services.workers import parse_csv_block, parse_excel_file
 from src.services.analysis import analysis_service
+from src.services.result_cache import result_cache
+from src.services.index_cache import index_cache
+from src.services.events import JobProgress, job_events
 from datetime import datetime
 from uuid import UUID # Added for type hinting
 
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS: Tuple[str, ...] = ('.csv', '.xls', '.xlsx') + (COLUMNAR_EXTENSIONS if columnar_available() else ())
+"""File extensions accepted for upload; Parquet and Arrow files need the optional pyarrow package."""
+
+UNSUPPORTED_FILE_TYPE_MESSAGE = f"Unsupported file type. Supported extensions: {', '.join(SUPPORTED_EXTENSIONS)}."
+
+SHUTDOWN_MESSAGE = "The server was shutting down before the job could run. Please upload the file again."
+"""Error message of queued jobs dropped on shutdown (see `IngestionService.discard_queued`)."""
+
+ARCHIVE_EXTENSIONS: Tuple[str, ...] = ('.zip',)
+"""File extensions of archives accepted by batch uploads; their supported members are analyzed."""
+
+def has_extension(filename: Optional[str], extensions: Tuple[str, ...]) -> bool:
+    """
+    Checks whether a file name ends with one of the given (lowercase) extensions, ignoring case.
+    """
+    return bool(filename) and filename.lower().endswith(extensions)
+
+class BatchEntry:
+    """
+    One file of a batch upload: a spooled upload, or a member of a spooled ZIP archive.
+    """
+    __slots__ = ("filename", "path", "member", "size", "job_id")
+
+    def __init__(self, filename: str, path: str, size: int, member: Optional[str] = None):
+        """
+        Initializes the entry.
+
+        Args:
+            filename: The name of the file, or of the archive member.
+            path: The spooled file: the upload itself, or the archive holding it.
+            size: The (uncompressed) size of the file in bytes.
+            member: The name of the member within the archive at `path`, if any.
+        """
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.member = member
+        self.job_id: Optional[UUID] = None
+
+    def open(self) -> BinaryIO:
+        """
+        Opens the file for reading. Archive members are decompressed as they are read.
+        """
+        if self.member is None:
+            return open(self.path, "rb")
+        archive = zipfile.ZipFile(self.path)
+        try:
+            member = archive.open(self.member)
+        except Exception:
+            archive.close()
+            raise
+        # The member keeps its own handle on the archive file, so the ZipFile object can go
+        archive.close()
+        return member
+
 class IngestionService:
     """
     Service responsible for handling file uploads, parsing, and orchestrating analysis jobs.
     """
+    def __init__(self):
+        # Serializes appends to the same job; entries disappear once no task holds them
+        self._job_locks: "weakref.WeakValueDictionary[UUID, asyncio.Lock]" = weakref.WeakValueDictionary()
+
     def create_analysis_job(self) -> AnalysisJob:
         """
-        Creates a new analysis job and stores it in the in-memory database.
+        Creates a new analysis job and stores it in the job store.
         
         Returns:
             The newly created AnalysisJob object.
         """
         job = AnalysisJob()
-        db[job.job_id] = job
+        self._save_job(job)
         return job
 
-    async def process_file(self, job_id: str, file: UploadFile) -> AnalysisJob:
+    async def process_file(self, job_id: str, file: UploadFile, sheet_name: Optional[str] = None) -> AnalysisJob:
         """
         Processes an uploaded file, parses its content, triggers analysis,
         and updates the job status.
         
         Args:
             job_id: The ID of the analysis job.
-            file: The uploaded file (CSV or Excel).
+            file: The uploaded file (CSV, Excel, Parquet or Arrow IPC).
+            sheet_name: For Excel files, the worksheet to read. Defaults to the active sheet.
             
         Returns:
             The updated AnalysisJob object.
@@ -39,43 +122,579 @@ class IngestionService:
             FileParsingError: If the file type is unsupported or parsing fails.
             Exception: For any other unexpected errors during processing.
         """
-        job = db.get(UUID(job_id)) # Convert job_id to UUID
+        job, _ = await self._analyze_upload(job_id, file, sheet_name)
+        return job
+
+    async def _analyze_upload(self, job_id: str, file: UploadFile,
+                              sheet_name: Optional[str] = None) -> Tuple[AnalysisJob, Dict[str, Any]]:
+        """
+        Does the work of `process_file`, and also returns the stored analysis results.
+        """
+        job = await run_store(job_store.get_job, UUID(job_id)) # Convert job_id to UUID
         if not job:
             raise ValueError(f"Job with ID {job_id} not found.")
 
         job.status = JobStatus.IN_PROGRESS
-        db[job.job_id] = job # Update job status in DB
+        self._save_job(job) # Update job status in DB
 
+        started = time.perf_counter()
+        progress = JobProgress(job.job_id, file.size)
         try:
-            file_content = await file.read()
-            transactions: List[Transaction] = []
-
-            if file.filename.endswith('.csv'):
-                transactions = parse_csv(file_content.decode('utf-8'))
-            elif file.filename.endswith('.xls') or file.filename.endswith('.xlsx'):
-                transactions = parse_excel(file_content)
-            else:
-                raise FileParsingError("Unsupported file type. Only CSV and Excel are supported.")
-            
-            # Trigger analysis service
-            analysis_results = await analysis_service.analyze_transactions(transactions) # Pass Transaction objects
+            batches = self._iter_batches(file, sheet_name, progress)
+
+            # Trigger analysis service; batches are categorized while the file is still being read
+            analysis_results = await analysis_service.analyze_transaction_stream(batches, progress)
             
             # Store parsed transactions and analysis results
-            results_db[job.job_id] = analysis_results
+            progress.enter_stage("storing")
+            job.results_version += 1
+            with JOB_STAGE_SECONDS.time(stage="store"):
+                await run_store(job_store.save_results, job.job_id, analysis_results)
+            await self._prime_result_cache(job, analysis_results)
 
             job.status = JobStatus.COMPLETED
-            db[job.job_id] = job # Update job status in DB
-            return job
+            self._save_job(job) # Update job status in DB
+            ROWS_PROCESSED.inc(len(analysis_results["categorized_transactions"]), kind="upload")
+            self._record_job("upload", job.status, started)
+            return job, analysis_results
 
         except FileParsingError as e:
             job.status = JobStatus.FAILED
             job.error_message = str(e)
-            db[job.job_id] = job
+            self._save_job(job)
+            self._record_job("upload", job.status, started, error_stage="parse")
             raise
         except Exception as e:
             job.status = JobStatus.FAILED
             job.error_message = f"An unexpected error occurred during file processing: {e}"
-            db[job.job_id] = job
+            self._save_job(job)
+            self._record_job("upload", job.status, started, error_stage="job")
+            raise
+
+    async def append_file(self, job_id: str, file: UploadFile, sheet_name: Optional[str] = None) -> AnalysisJob:
+        """
+        Appends the transactions of an uploaded file to a completed job.
+
+        Rows already in the job are skipped, and the job's results are updated
+        incrementally (see `AnalysisService.append_transaction_stream`). While the
+        append runs the job is IN_PROGRESS; if it fails, the job returns to COMPLETED
+        with its previous results and the failure in `error_message`.
+
+        Args:
+            job_id: The ID of the analysis job to append to.
+            file: The uploaded file (CSV, Excel, Parquet or Arrow IPC).
+            sheet_name: For Excel files, the worksheet to read. Defaults to the active sheet.
+
+        Returns:
+            The updated AnalysisJob object.
+
+        Raises:
+            ValueError: If the job is not found or has no completed results.
+            FileParsingError: If the file type is unsupported or parsing fails.
+            Exception: For any other unexpected errors during processing.
+        """
+        job_uuid = UUID(job_id)
+        lock = self._job_locks.setdefault(job_uuid, asyncio.Lock())
+        async with lock:
+            job = await run_store(job_store.get_job, job_uuid)
+            results = await run_store(job_store.get_results, job_uuid) if job else None
+            if not job or job.status != JobStatus.COMPLETED or results is None:
+                raise ValueError(f"Job with ID {job_id} has no completed analysis to append to.")
+
+            job.status = JobStatus.IN_PROGRESS
+            job.error_message = None
+            self._save_job(job)
+
+            started = time.perf_counter()
+            progress = JobProgress(job.job_id, file.size)
+            try:
+                batches = self._iter_batches(file, sheet_name, progress)
+                updated_results, duplicates = await analysis_service.append_transaction_stream(results, batches, progress)
+                if updated_results is not results:
+                    progress.enter_stage("storing")
+                    job.results_version += 1
+                    with JOB_STAGE_SECONDS.time(stage="store"):
+                        await run_store(job_store.save_results, job.job_id, updated_results)
+                    # Not re-primed: serializing every transaction would make each append cost
+                    # O(history); the next unfiltered read serializes the bodies once instead.
+                    # Other worker processes notice the new results_version on their next read.
+                    result_cache.invalidate(job.job_id)
+                    index_cache.invalidate(job.job_id)
+
+                job.status = JobStatus.COMPLETED
+                job.duplicates_skipped = duplicates
+                self._save_job(job)
+                ROWS_PROCESSED.inc(len(updated_results["categorized_transactions"]) - len(results["categorized_transactions"]), kind="append")
+                DUPLICATE_ROWS.inc(duplicates)
+                self._record_job("append", job.status, started)
+                return job
+
+            except Exception as e:
+                # The previous results are untouched, so the job stays usable
+                job.status = JobStatus.COMPLETED
+                if isinstance(e, FileParsingError):
+                    job.error_message = f"Could not append file: {e}"
+                else:
+                    job.error_message = f"An unexpected error occurred while appending the file: {e}"
+                self._save_job(job)
+                self._record_job("append", JobStatus.FAILED, started,
+                                 error_stage="parse" if isinstance(e, FileParsingError) else "job")
+                raise
+
+    def create_batch_job(self, entries: List[BatchEntry]) -> AnalysisJob:
+        """
+        Creates the parent job of a batch upload and one child job per entry, and
+        assigns each entry its child job.
+
+        Returns:
+            The parent job, with the IDs of its children.
+        """
+        parent = AnalysisJob()
+        children = [AnalysisJob(parent_job_id=parent.job_id, filename=entry.filename) for entry in entries]
+        for entry, child in zip(entries, children):
+            entry.job_id = child.job_id
+            self._save_job(child)
+        parent.child_job_ids = [child.job_id for child in children]
+        self._save_job(parent)
+        return parent
+
+    async def spool_batch(self, files: List[UploadFile]) -> Tuple[List[BatchEntry], List[str]]:
+        """
+        Spools the files of a batch upload and lists the entries to analyze. ZIP archives
+        are spooled whole and contribute their members with a supported extension, which
+        are only decompressed later, while they are parsed.
+
+        Args:
+            files: The uploaded files and archives.
+
+        Returns:
+            The entries, in upload (and archive) order, and the spooled paths, which the
+            caller must remove once the entries have been processed.
+
+        Raises:
+            FileParsingError: If an archive cannot be read, holds no supported files, or the
+                batch has more than `BATCH_MAX_FILES` entries.
+        """
+        entries: List[BatchEntry] = []
+        paths: List[str] = []
+        try:
+            for file in files:
+                path, size, _ = await self.spool_upload(file)
+                paths.append(path)
+                if not has_extension(file.filename, ARCHIVE_EXTENSIONS):
+                    entries.append(BatchEntry(file.filename, path, size))
+                    continue
+                members = await asyncio.to_thread(self._list_archive, path)
+                if not members:
+                    raise FileParsingError(f"Archive '{file.filename}' contains no supported files.")
+                entries.extend(BatchEntry(name, path, member_size, member=name) for name, member_size in members)
+                if len(entries) > settings.BATCH_MAX_FILES:
+                    break
+            if len(entries) > settings.BATCH_MAX_FILES:
+                raise FileParsingError(f"A batch may contain at most {settings.BATCH_MAX_FILES} files.")
+        except Exception:
+            for path in paths:
+                os.remove(path)
             raise
+        return entries, paths
+
+    @staticmethod
+    def _list_archive(path: str) -> List[Tuple[str, int]]:
+        """
+        Returns the name and uncompressed size of every supported file in a ZIP archive.
+
+        Raises:
+            FileParsingError: If the archive cannot be read.
+        """
+        try:
+            with zipfile.ZipFile(path) as archive:
+                return [
+                    (info.filename, info.file_size) for info in archive.infolist()
+                    if not info.is_dir()
+                    and has_extension(info.filename, SUPPORTED_EXTENSIONS)
+                    # Skip metadata folders and hidden files that archivers add
+                    and not any(part.startswith(("__MACOSX", ".")) for part in info.filename.split("/"))
+                ]
+        except (zipfile.BadZipFile, OSError) as e:
+            raise FileParsingError(f"Unable to open ZIP archive: {e}")
+
+    async def process_batch(self, job_id: str, entries: List[BatchEntry], paths: List[str]) -> AnalysisJob:
+        """
+        Processes a batch upload created with `create_batch_job`, then removes its spooled files.
+
+        Each entry is processed as its own child job, and up to `BATCH_MAX_PARALLEL_FILES`
+        run at once, so their parsing spreads across the process pool and the batch takes
+        about as long as its largest file. Categorization is shared across the files: the
+        categorizer answers repeated merchants from its cache, and concurrent requests for
+        the same merchant wait for a single model call. The parent job then analyzes the
+        merged, already categorized transactions of every child that succeeded; it fails
+        only if none did, and otherwise reports the failed files in `error_message`.
+
+        Args:
+            job_id: The ID of the parent job.
+            entries: The batch's entries, with their child jobs assigned.
+            paths: The spooled files to remove afterwards.
+
+        Returns:
+            The updated parent job.
+
+        Raises:
+            ValueError: If the parent job is not found.
+        """
+        try:
+            parent = await run_store(job_store.get_job, UUID(job_id))
+            if not parent:
+                raise ValueError(f"Job with ID {job_id} not found.")
+            parent.status = JobStatus.IN_PROGRESS
+            self._save_job(parent)
+            started = time.perf_counter()
+
+            semaphore = asyncio.Semaphore(max(1, settings.BATCH_MAX_PARALLEL_FILES))
+            finished = 0
+
+            async def run_child(entry: BatchEntry) -> Optional[Dict[str, Any]]:
+                nonlocal finished
+                async with semaphore:
+                    try:
+                        source = await asyncio.to_thread(entry.open)
+                        with source:
+                            upload = UploadFile(source, filename=entry.filename, size=entry.size)
+                            _, results = await self._analyze_upload(str(entry.job_id), upload)
+                        return results
+                    except Exception as e:
+                        # The child job records the failure; the rest of the batch goes on
+                        logger.warning(f"File '{entry.filename}' of batch job {job_id} failed: {e}")
+                        return None
+                    finally:
+                        finished += 1
+                        job_events.publish(parent.job_id, "progress", {
+                            "job_id": str(parent.job_id),
+                            "stage": "files",
+                            "files_finished": finished,
+                            "files_total": len(entries),
+                            "percent": round(90.0 * finished / len(entries), 1),
+                        })
+
+            child_results = [results for results in await asyncio.gather(*(run_child(entry) for entry in entries)) if results is not None]
+            failed = len(entries) - len(child_results)
+            try:
+                if not child_results:
+                    raise FileParsingError(f"None of the {len(entries)} files could be processed.")
+                combined = TransactionBatch.concat(results["categorized_transactions"] for results in child_results)
+                analysis_results = await analysis_service.analyze_categorized(combined)
+                parent.results_version += 1
+                with JOB_STAGE_SECONDS.time(stage="store"):
+                    await run_store(job_store.save_results, parent.job_id, analysis_results)
+                await self._prime_result_cache(parent, analysis_results)
+
+                parent.status = JobStatus.COMPLETED
+                parent.error_message = f"{failed} of {len(entries)} files could not be processed." if failed else None
+                self._save_job(parent)
+                self._record_job("batch", parent.status, started)
+                return parent
+            except Exception as e:
+                parent.status = JobStatus.FAILED
+                parent.error_message = str(e) if isinstance(e, FileParsingError) else f"An unexpected error occurred while merging the batch: {e}"
+                self._save_job(parent)
+                self._record_job("batch", parent.status, started, error_stage="parse" if isinstance(e, FileParsingError) else "job")
+                raise
+        finally:
+            for path in paths:
+                os.remove(path)
+
+    async def spool_upload(self, file: UploadFile) -> Tuple[str, int, str]:
+        """
+        Copies an upload to a temporary file in chunks, so it outlives the request
+        while the job waits in the scheduler queue. The content is hashed on the way,
+        so repeated uploads can be recognized without reading the file again.
+
+        Args:
+            file: The uploaded file.
+
+        Returns:
+            The path of the temporary file, which the caller must remove, its size in
+            bytes, and the hex SHA-256 of its content.
+        """
+        suffix = os.path.splitext(file.filename or "")[1]
+        digest = hashlib.sha256()
+
+        def write(chunk: bytes) -> None:
+            spool.write(chunk)
+            digest.update(chunk)
+
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as spool:
+            size = 0
+            async for chunk in self._iter_chunks(file):
+                await asyncio.to_thread(write, chunk)
+                size += len(chunk)
+        return spool.name, size, digest.hexdigest()
+
+    async def process_spooled_file(self, job_id: str, path: str, filename: str, sheet_name: Optional[str] = None,
+                                   append: bool = False) -> AnalysisJob:
+        """
+        Processes an upload previously spooled with `spool_upload`, then removes the spooled file.
+
+        Args:
+            job_id: The ID of the analysis job.
+            path: The path of the spooled file.
+            filename: The original name of the uploaded file, used to detect its type.
+            sheet_name: For Excel files, the worksheet to read. Defaults to the active sheet.
+            append: Whether to append the file to the job's existing results (see `append_file`).
+
+        Returns:
+            The updated AnalysisJob object.
+        """
+        try:
+            with open(path, "rb") as spooled:
+                upload = UploadFile(spooled, filename=filename, size=os.path.getsize(path))
+                if append:
+                    return await self.append_file(job_id, upload, sheet_name)
+                return await self.process_file(job_id, upload, sheet_name)
+        finally:
+            os.remove(path)
+
+    async def discard_queued(self, job_id: str, paths: List[str], append: bool = False) -> None:
+        """
+        Cleans up a queued job that will not run because the server is shutting down.
+
+        The job's spooled files are removed and the job, with the child jobs of a batch,
+        is marked FAILED with `SHUTDOWN_MESSAGE`. A job that was waiting for an append
+        keeps its previous results and stays COMPLETED, as after a failed append.
+
+        Args:
+            job_id: The ID of the queued job.
+            paths: The spooled files of the job.
+            append: Whether the job was queued to append a file (see `append_file`).
+        """
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        job = await run_store(job_store.get_job, UUID(job_id))
+        if job is None:
+            return
+        if append:
+            job.error_message = f"Could not append file: {SHUTDOWN_MESSAGE}"
+            self._save_job(job)
+            return
+        jobs = [job]
+        for child_id in job.child_job_ids or ():
+            child = await run_store(job_store.get_job, child_id)
+            if child is not None:
+                jobs.append(child)
+        for dropped in jobs:
+            dropped.status = JobStatus.FAILED
+            dropped.error_message = SHUTDOWN_MESSAGE
+            self._save_job(dropped)
+
+    async def _prime_result_cache(self, job: AnalysisJob, results: Dict[str, Any]) -> None:
+        """
+        Serializes a job's responses once, before clients start polling for them.
+        Failures only cost a later cache miss, so they are logged rather than raised.
+        """
+        try:
+            with JOB_STAGE_SECONDS.time(stage="serialize"):
+                await result_cache.prime(job.job_id, job.results_version, results)
+        except Exception as e:
+            ERRORS.inc(stage="serialize")
+            logger.warning(f"Could not pre-serialize results of job {job.job_id}: {e}")
+
+    @staticmethod
+    def _save_job(job: AnalysisJob) -> None:
+        """
+        Stores a job and publishes its status to subscribers of its events.
+        """
+        job_store.save_job(job)
+        job_events.publish_status(job)
+
+    @staticmethod
+    def _record_job(kind: str, job_status: JobStatus, started: float, error_stage: Optional[str] = None) -> None:
+        """
+        Records a finished job's duration and outcome in the metrics.
+        """
+        JOB_SECONDS.observe(time.perf_counter() - started, kind=kind, status=job_status.value)
+        JOBS.inc(kind=kind, status=job_status.value)
+        if error_stage is not None:
+            ERRORS.inc(stage=error_stage)
+
+    def _iter_batches(self, file: UploadFile, sheet_name: Optional[str] = None,
+                      progress: Optional[JobProgress] = None) -> AsyncIterator[TransactionBatch]:
+        """
+        Selects the streaming parser for an upload from its file extension. With `progress`,
+        the bytes read from CSV uploads are counted.
+
+        Raises:
+            FileParsingError: If the file type is unsupported.
+        """
+        if has_extension(file.filename, ('.csv',)):
+            return self._iter_csv_batches(file, progress)
+        if has_extension(file.filename, ('.xls', '.xlsx')):
+            return self._iter_excel_batches(file, sheet_name)
+        if has_extension(file.filename, COLUMNAR_EXTENSIONS):
+            return self._iter_columnar_batches(file)
+        raise FileParsingError(UNSUPPORTED_FILE_TYPE_MESSAGE)
+
+    async def _iter_chunks(self, file: UploadFile, progress: Optional[JobProgress] = None) -> AsyncIterator[bytes]:
+        """
+        Reads an uploaded file in fixed-size chunks.
+
+        Args:
+            file: The uploaded file.
+            progress: If given, the bytes read are recorded in it.
+
+        Yields:
+            Successive chunks of at most `INGEST_CHUNK_SIZE` bytes.
+        """
+        while True:
+            with JOB_STAGE_SECONDS.time(stage="read"):
+                chunk = await file.read(settings.INGEST_CHUNK_SIZE)
+            if not chunk:
+                break
+            if progress is not None:
+                progress.read(len(chunk))
+            yield chunk
+
+    async def _iter_csv_batches(self, file: UploadFile, progress: Optional[JobProgress] = None) -> AsyncIterator[TransactionBatch]:
+        """
+        Streams a CSV upload through an incremental decoder and record splitter, so
+        that only a few chunks of raw data are held in memory at a time. Each block of
+        complete records is parsed in the process pool; up to `PROCESS_POOL_WORKERS`
+        blocks are parsed in parallel and their batches are yielded in file order.
+
+        Args:
+            file: The uploaded CSV file.
+            progress: If given, the bytes read are recorded in it.
+
+        Yields:
+            Batches of at most `INGEST_BATCH_SIZE` parsed transactions.
+
+        Raises:
+            FileParsingError: If required columns are missing or data conversion fails.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        parser = CsvStreamParser(batch_size=settings.INGEST_BATCH_SIZE)
+        max_pending = max(1, settings.PROCESS_POOL_WORKERS)
+        pending: Deque[asyncio.Future] = deque()
+
+        async def parse(block: str, layout: Optional[ColumnLayout]) -> List[bytes]:
+            with JOB_STAGE_SECONDS.time(stage="parse"):
+                return await run_cpu_bound(parse_csv_block, block, layout, settings.INGEST_BATCH_SIZE)
+
+        def submit(block: str) -> None:
+            if block:
+                pending.append(asyncio.ensure_future(parse(block, parser.layout)))
+
+        def split_records(chunk: bytes, final: bool = False) -> str:
+            with JOB_STAGE_SECONDS.time(stage="decode"):
+                records = parser.feed_records(decoder.decode(chunk, final=final))
+                return records + parser.flush_records() if final else records
+
+        try:
+            async for chunk in self._iter_chunks(file, progress):
+                submit(split_records(chunk))
+                while pending and (len(pending) >= max_pending or pending[0].done()):
+                    for blob in await pending.popleft():
+                        yield TransactionBatch.from_bytes(blob)
+            submit(split_records(b'', final=True))
+            while pending:
+                for blob in await pending.popleft():
+                    yield TransactionBatch.from_bytes(blob)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def _iter_excel_batches(self, file: UploadFile, sheet_name: Optional[str] = None) -> AsyncIterator[TransactionBatch]:
+        """
+        Parses an Excel upload in read-only mode and yields its transactions in batches.
+
+        With a process pool, the workbook is parsed in a worker process from a file on
+        disk (the upload is spooled to a temporary file first if it is still in memory).
+        Without one, rows are streamed from the upload's spooled file in a worker thread
+        so the event loop stays responsive.
+
+        Args:
+            file: The uploaded Excel file.
+            sheet_name: The worksheet to read. Defaults to the active sheet.
+
+        Yields:
+            Batches of at most `INGEST_BATCH_SIZE` parsed transactions.
+
+        Raises:
+            FileParsingError: If the sheet or required columns are missing, or data conversion fails.
+        """
+        await file.seek(0)
+        if get_process_pool() is not None:
+            path, is_temporary = await asyncio.to_thread(self._ensure_on_disk, file.file)
+            try:
+                with JOB_STAGE_SECONDS.time(stage="parse"):
+                    blobs = await run_cpu_bound(parse_excel_file, path, sheet_name, settings.INGEST_BATCH_SIZE)
+            finally:
+                if is_temporary:
+                    os.remove(path)
+            for blob in blobs:
+                yield TransactionBatch.from_bytes(blob)
+            return
+
+        batches = iter_excel_batches(file.file, sheet_name=sheet_name, batch_size=settings.INGEST_BATCH_SIZE)
+        try:
+            while True:
+                with JOB_STAGE_SECONDS.time(stage="parse"):
+                    batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            batches.close()
+
+    async def _iter_columnar_batches(self, file: UploadFile) -> AsyncIterator[TransactionBatch]:
+        """
+        Reads a Parquet or Arrow IPC upload memory-mapped from disk (the upload is spooled
+        to a temporary file first if it is still in memory) and yields its transactions.
+
+        Columns are decoded by Arrow's native kernels, which release the GIL, so batches
+        are read in a worker thread rather than the process pool: shipping them between
+        processes would only add copies.
+
+        Args:
+            file: The uploaded Parquet or Arrow IPC file.
+
+        Yields:
+            Batches of at most `INGEST_BATCH_SIZE` transactions.
+
+        Raises:
+            FileParsingError: If pyarrow is missing, required columns are missing or data conversion fails.
+        """
+        await file.seek(0)
+        path, is_temporary = await asyncio.to_thread(self._ensure_on_disk, file.file, os.path.splitext(file.filename)[1])
+        batches = iter_columnar_batches(path, batch_size=settings.INGEST_BATCH_SIZE)
+        try:
+            while True:
+                with JOB_STAGE_SECONDS.time(stage="parse"):
+                    batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            batches.close()
+            if is_temporary:
+                os.remove(path)
+
+    @staticmethod
+    def _ensure_on_disk(source: BinaryIO, suffix: str = ".xlsx") -> Tuple[str, bool]:
+        """
+        Returns a path to the upload's content on disk, copying it to a temporary file
+        (named with `suffix`) in chunks if it only exists in memory.
+
+        Returns:
+            The path, and whether it is a temporary copy the caller must remove.
+        """
+        name = getattr(source, "name", None)
+        # Archive members are named after their (relative) path inside the archive, not on disk
+        if isinstance(name, str) and os.path.isabs(name) and os.path.isfile(name):
+            return name, False
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as copy:
+            shutil.copyfileobj(source, copy, settings.INGEST_CHUNK_SIZE)
+        return copy.name, True
 
 ingestion_service = IngestionService()
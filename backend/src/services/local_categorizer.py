@@ -0,0 +1,292 @@
+import math
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.categorization_cache import normalize_description
+
+# Merchant keywords per category, with the confidence a match carries on its own.
+# Keywords are normalized like merchant keys (see `normalize_description`, e.g. "T-MOBILE"
+# becomes "T MOBILE") and matched on word boundaries; when keywords overlap, the longest
+# one wins ("UBER EATS" over "UBER"). Generic single words (RENT, CAFE, HOTEL, ...) also
+# occur in unrelated merchant names, as in "ENTERPRISE RENT-A-CAR", so they stay below the
+# default LOCAL_CATEGORIZER_THRESHOLD of 0.8: on their own they never bypass the model.
+KEYWORD_RULES: Dict[str, Dict[str, float]] = {
+    'Rent': {'RENT': 0.75, 'RENT PAYMENT': 0.98, 'LEASE': 0.75, 'PROPERTY MGMT': 0.9, 'PROPERTY MANAGEMENT': 0.9, 'APARTMENTS': 0.75},
+    'Salary': {'PAYROLL': 0.98, 'SALARY': 0.98, 'DIRECT DEP': 0.9, 'DIRECT DEPOSIT': 0.9, 'WAGES': 0.9},
+    'Transport': {'SHELL': 0.9, 'SHELL OIL': 0.98, 'CHEVRON': 0.95, 'EXXON': 0.95, 'EXXONMOBIL': 0.95, 'MOBIL': 0.85, 'UBER': 0.9, 'UBER TRIP': 0.98,
+                  'LYFT': 0.95, 'METRO': 0.7, 'METRO TRANSIT': 0.9, 'TRANSIT': 0.75, 'PARKING': 0.75, 'TOLL': 0.75, 'AMTRAK': 0.85, 'FUEL': 0.75,
+                  'GAS STATION': 0.9},
+    'Groceries': {'WHOLE FOODS': 0.95, 'TRADER JOE': 0.95, 'TRADER JOES': 0.95, 'KROGER': 0.95, 'SAFEWAY': 0.95, 'ALDI': 0.95, 'PUBLIX': 0.95,
+                  'WEGMANS': 0.95, 'SUPERMARKET': 0.75, 'GROCERY': 0.75, 'GROCERIES': 0.75, 'MARKET': 0.6},
+    'Dining Out': {'STARBUCKS': 0.95, 'MCDONALDS': 0.95, "MCDONALD'S": 0.95, 'CHIPOTLE': 0.95, 'RESTAURANT': 0.75, 'CAFE': 0.75, 'COFFEE': 0.75,
+                   'PIZZA': 0.75, 'DOORDASH': 0.95, 'GRUBHUB': 0.95, 'UBER EATS': 0.98, 'BAR & GRILL': 0.9, 'DINER': 0.75, 'BURGER': 0.75},
+    'Utilities': {'ELECTRIC': 0.75, 'ELECTRICITY': 0.75, 'PG&E': 0.95, 'WATER': 0.7, 'WATER UTILITY': 0.9, 'COMCAST': 0.9, 'XFINITY': 0.9,
+                  'VERIZON': 0.85, 'AT&T': 0.85, 'T-MOBILE': 0.85, 'UTILITY': 0.75, 'UTILITIES': 0.75, 'INTERNET': 0.75},
+    'Entertainment': {'NETFLIX': 0.98, 'NETFLIX.COM': 0.98, 'SPOTIFY': 0.98, 'HULU': 0.98, 'DISNEY PLUS': 0.95, 'CINEMA': 0.75, 'THEATRE': 0.75,
+                      'THEATER': 0.75, 'STEAM': 0.75, 'STEAM GAMES': 0.95, 'PLAYSTATION': 0.9, 'TICKETMASTER': 0.9},
+    'Shopping': {'AMAZON': 0.9, 'AMZN': 0.9, 'AMAZON MKTPLACE': 0.95, 'TARGET': 0.85, 'WALMART': 0.85, 'BEST BUY': 0.9, 'EBAY': 0.9, 'ETSY': 0.9,
+                 'IKEA': 0.9, 'HOME DEPOT': 0.85},
+    'Investments': {'VANGUARD': 0.95, 'FIDELITY': 0.9, 'SCHWAB': 0.9, 'ROBINHOOD': 0.95, 'COINBASE': 0.95, 'BROKERAGE': 0.75, 'DIVIDEND': 0.75},
+    'Healthcare': {'PHARMACY': 0.75, 'CVS': 0.85, 'CVS PHARMACY': 0.95, 'WALGREENS': 0.85, 'HOSPITAL': 0.75, 'CLINIC': 0.75, 'DENTAL': 0.75,
+                   'DENTIST': 0.75, 'MEDICAL': 0.75, 'DOCTOR': 0.75},
+    'Education': {'TUITION': 0.98, 'UNIVERSITY': 0.75, 'COLLEGE': 0.75, 'COURSERA': 0.95, 'UDEMY': 0.95, 'SCHOOL': 0.7, 'BOOKSTORE': 0.7},
+    'Travel': {'AIRLINES': 0.75, 'AIRLINE': 0.75, 'DELTA AIR': 0.95, 'UNITED AIRLINES': 0.98, 'HOTEL': 0.75, 'MARRIOTT': 0.95, 'HILTON': 0.95,
+               'AIRBNB': 0.95, 'EXPEDIA': 0.95, 'BOOKING.COM': 0.95, 'RENT-A-CAR': 0.95},
+}
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword set, matching every keyword
+    in a single pass over the text regardless of how many keywords there are.
+    """
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Compiles the automaton.
+
+        Args:
+            keywords: The keywords to match.
+        """
+        self.keywords: List[str] = list(dict.fromkeys(keywords))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        # Breadth-first construction of the failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Finds every keyword occurrence that starts and ends on a word boundary.
+
+        Args:
+            text: The text to search.
+
+        Returns:
+            A list of (start, end, keyword) tuples.
+        """
+        matches: List[Tuple[int, int, str]] = []
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for index in self._output[state]:
+                keyword = self.keywords[index]
+                start, end = position - len(keyword) + 1, position + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    matches.append((start, end, keyword))
+        return matches
+
+
+class TfidfNearestNeighbors:
+    """
+    Character-trigram TF-IDF nearest-neighbour classifier over labelled merchant keys.
+
+    Vectors are L2-normalized and stored as an inverted index from trigram to
+    (example, weight) postings, so a query only touches the examples that share
+    at least one trigram with it.
+    """
+    def __init__(self, neighbors: int = 3):
+        """
+        Initializes an empty model.
+
+        Args:
+            neighbors: Number of nearest examples that vote on a prediction.
+        """
+        self.neighbors = neighbors
+        self.labels: List[str] = []
+        self._label_codes = np.empty(0, dtype=np.int32)
+        self._idf: Dict[str, float] = {}
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._label_codes)
+
+    @staticmethod
+    def _trigrams(text: str) -> Dict[str, int]:
+        padded = f"  {text} "
+        counts: Dict[str, int] = {}
+        for i in range(len(padded) - 2):
+            gram = padded[i:i + 3]
+            counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> None:
+        """
+        Builds the index from (merchant key, category) examples, replacing any previous index.
+
+        Args:
+            examples: Labelled merchant keys.
+        """
+        label_table: Dict[str, int] = {}
+        documents: List[Dict[str, int]] = []
+        label_codes: List[int] = []
+        for key, category in examples:
+            documents.append(self._trigrams(key))
+            label_codes.append(label_table.setdefault(category, len(label_table)))
+
+        document_frequency: Dict[str, int] = {}
+        for counts in documents:
+            for gram in counts:
+                document_frequency[gram] = document_frequency.get(gram, 0) + 1
+        total = len(documents)
+        self._idf = {gram: math.log((1 + total) / (1 + df)) + 1.0 for gram, df in document_frequency.items()}
+
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for doc_id, counts in enumerate(documents):
+            weights = {gram: count * self._idf[gram] for gram, count in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for gram, weight in weights.items():
+                doc_ids, values = postings.setdefault(gram, ([], []))
+                doc_ids.append(doc_id)
+                values.append(weight / norm)
+
+        self.labels = list(label_table)
+        self._label_codes = np.array(label_codes, dtype=np.int32)
+        self._postings = {
+            gram: (np.array(doc_ids, dtype=np.int32), np.array(values, dtype=np.float32))
+            for gram, (doc_ids, values) in postings.items()
+        }
+
+    def predict(self, key: str) -> Tuple[Optional[str], float]:
+        """
+        Predicts the category of a merchant key from its nearest labelled examples.
+
+        Args:
+            key: The normalized merchant key.
+
+        Returns:
+            The predicted category and a confidence in [0, 1] (the similarity-weighted
+            share of the winning label, scaled by the best cosine similarity), or
+            (None, 0.0) if nothing in the index is similar.
+        """
+        if not len(self):
+            return None, 0.0
+        # Trigrams never seen in training still count towards the query's norm, at the maximum IDF
+        unseen_idf = math.log(1 + len(self)) + 1.0
+        weights = {gram: count * self._idf.get(gram, unseen_idf) for gram, count in self._trigrams(key).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        weights = {gram: weight for gram, weight in weights.items() if gram in self._postings}
+        if not weights:
+            return None, 0.0
+        scores = np.zeros(len(self), dtype=np.float32)
+        for gram, weight in weights.items():
+            doc_ids, values = self._postings[gram]
+            scores[doc_ids] += values * (weight / norm)
+
+        top = np.argsort(scores)[-self.neighbors:]
+        top = top[scores[top] > 0]
+        if not len(top):
+            return None, 0.0
+        votes = np.bincount(self._label_codes[top], weights=scores[top], minlength=len(self.labels))
+        best = int(votes.argmax())
+        confidence = float(scores[top].max()) * float(votes[best] / votes.sum())
+        return self.labels[best], min(confidence, 1.0)
+
+
+class LocalCategorizer:
+    """
+    Offline categorizer that answers obvious merchants without a network round-trip.
+
+    A keyword automaton handles well-known merchants and description patterns; an
+    optional TF-IDF nearest-neighbour model, trained on past model-labelled merchants,
+    handles the rest. Each prediction carries a confidence, and callers escalate
+    anything below their threshold to the LLM.
+    """
+    def __init__(self, rules: Dict[str, Dict[str, float]] = KEYWORD_RULES, use_tfidf: bool = True):
+        """
+        Initializes the categorizer.
+
+        Args:
+            rules: Keyword weights per category.
+            use_tfidf: Whether to consult the nearest-neighbour model when no keyword matches.
+        """
+        # Keywords are normalized like the keys they are matched against; when two collapse
+        # into one, the stronger rule is kept
+        self._keyword_rules: Dict[str, Tuple[str, float]] = {}
+        for category, keywords in rules.items():
+            for keyword, weight in keywords.items():
+                normalized = normalize_description(keyword)
+                if weight > self._keyword_rules.get(normalized, ("", -1.0))[1]:
+                    self._keyword_rules[normalized] = (category, weight)
+        self.matcher = KeywordMatcher(self._keyword_rules)
+        self.model: Optional[TfidfNearestNeighbors] = TfidfNearestNeighbors() if use_tfidf else None
+
+    def train(self, examples: Iterable[Tuple[str, str]]) -> None:
+        """
+        (Re)trains the nearest-neighbour model from model-labelled merchant keys.
+
+        Args:
+            examples: (normalized merchant key, category) pairs.
+        """
+        if self.model is not None:
+            # Fit a fresh model and swap it in, so training can run in a worker thread
+            model = TfidfNearestNeighbors(self.model.neighbors)
+            model.fit(examples)
+            self.model = model
+
+    def predict(self, key: str) -> Tuple[Optional[str], float]:
+        """
+        Categorizes one normalized merchant key.
+
+        Args:
+            key: The normalized merchant key.
+
+        Returns:
+            The predicted category (or None) and its confidence in [0, 1].
+        """
+        category, confidence = self._match_keywords(key)
+        if category is None and self.model is not None:
+            category, confidence = self.model.predict(key)
+        return category, confidence
+
+    def _match_keywords(self, key: str) -> Tuple[Optional[str], float]:
+        """
+        Scores categories by their strongest keyword match. Conflicting categories
+        reduce the confidence in proportion to the runner-up's score.
+        """
+        matches = self.matcher.find(key)
+        if not matches:
+            return None, 0.0
+
+        # Drop matches contained in a longer match, e.g. "UBER" inside "UBER EATS"
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        kept: List[Tuple[int, int, str]] = []
+        for start, end, keyword in matches:
+            if not any(s <= start and end <= e for s, e, _ in kept):
+                kept.append((start, end, keyword))
+
+        scores: Dict[str, float] = {}
+        for _, _, keyword in kept:
+            category, weight = self._keyword_rules[keyword]
+            scores[category] = max(scores.get(category, 0.0), weight)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_category, best = ranked[0]
+        if len(ranked) > 1:
+            best *= best / (best + ranked[1][1])
+        return best_category, best
@@ -1,101 +1,290 @@
 import csv
+import sys
 from io import StringIO, BytesIO # Added BytesIO
-from typing import List, Dict, Any
-from datetime import datetime, date
+from itertools import chain, islice
+from typing import List, Optional, Tuple, Iterator, Union, BinaryIO
+from zipfile import BadZipFile
 from openpyxl import load_workbook
-from src.models.schemas import Transaction
+from openpyxl.utils.exceptions import InvalidFileException
+from src.models.batch import TransactionBatch
+from src.services.formats import (SAMPLE_ROWS, ColumnLayout, infer_csv_layout, infer_layout, iter_layout_batches,
+                                  settle_date_order)
 
 class FileParsingError(Exception):
     """Custom exception for file parsing errors."""
     pass
 
-def parse_csv(file_content: str) -> List[Transaction]:
+class CsvStreamParser:
     """
-    Parses CSV content into a list of Transaction objects.
-    Assumes CSV has headers and columns like 'Date', 'Description', 'Amount'.
+    Incremental CSV parser that accepts text in arbitrary chunks and emits
+    transactions in TransactionBatch objects of at most `batch_size` rows.
+    The file's layout (header, delimiter, columns, date and number formats) is
+    inferred from its first records (see `src.services.formats`).
+
+    Only complete records are handed to the csv module: a record is complete once
+    its line ending is reached with an even number of quote characters, so quoted
+    fields spanning chunk boundaries or containing newlines are handled correctly.
+
+    The splitting (`feed_records`/`flush_records`) is separate from the parsing
+    (`parse_csv_records`) so that blocks of complete records can be parsed elsewhere,
+    e.g. in a worker process. The layout is final before any data record is returned:
+    if the sampled dates fit both the day-first and the month-first order, records
+    are held back until a later date settles it (see `settle_date_order`).
+    """
+    def __init__(self, batch_size: int = 1000):
+        """
+        Initializes the parser.
+
+        Args:
+            batch_size: The maximum number of transactions per emitted batch.
+        """
+        self.batch_size = batch_size
+        self.layout: Optional[ColumnLayout] = None
+        """The file's layout, once its first records have been read."""
+        self._pending: str = ""
+        self._head: str = ""
+        self._held: str = ""
+
+    def feed(self, text: str) -> List[TransactionBatch]:
+        """
+        Feeds a chunk of decoded CSV text to the parser.
+
+        Args:
+            text: The next chunk of the CSV content.
+
+        Returns:
+            The batches of transactions completed by this chunk (possibly empty).
+
+        Raises:
+            FileParsingError: If required columns are missing or data conversion fails.
+        """
+        return parse_csv_records(self.feed_records(text), self.layout, self.batch_size)
+
+    def close(self) -> List[TransactionBatch]:
+        """
+        Flushes any buffered text as the final batches.
+
+        Returns:
+            The remaining batches of transactions.
+
+        Raises:
+            FileParsingError: If required columns are missing or data conversion fails.
+        """
+        return parse_csv_records(self.flush_records(), self.layout, self.batch_size)
+
+    def feed_records(self, text: str) -> str:
+        """
+        Buffers a chunk of decoded CSV text and returns the complete data records it finishes.
+        The first records are held back until enough have arrived to infer the `layout`;
+        preamble and header records are consumed then.
+
+        Args:
+            text: The next chunk of the CSV content.
+
+        Returns:
+            A block of complete data records (possibly empty).
+
+        Raises:
+            FileParsingError: If required columns are missing or the formats are not recognized.
+        """
+        buffer = self._pending + text
+        cut = self._complete_records_end(buffer)
+        self._pending = buffer[cut:]
+        return self._consume_header(buffer[:cut])
+
+    def flush_records(self) -> str:
+        """
+        Returns whatever text is still buffered, treating it as the final record(s).
+
+        Raises:
+            FileParsingError: If required columns are missing or the formats are not recognized.
+        """
+        block, self._pending = self._pending, ""
+        return self._consume_header(block, final=True)
+
+    @staticmethod
+    def _complete_records_end(buffer: str) -> int:
+        """
+        Returns the offset just past the last complete record in the buffer.
+        """
+        end = buffer.rfind("\n") + 1
+        if end == 0 or buffer.count('"', 0, end) % 2 == 0:
+            return end
+        # An odd number of quotes means the last newline is inside a quoted field;
+        # walk back line by line until the quotes balance.
+        while end > 0:
+            end = buffer.rfind("\n", 0, end - 1) + 1
+            if buffer.count('"', 0, end) % 2 == 0:
+                return end
+        return 0
+
+    @staticmethod
+    def _split_records(text: str, limit: int) -> Tuple[List[str], str]:
+        """
+        Splits up to `limit` records off the start of the text, at line endings outside quotes.
+
+        Returns:
+            The records, and the rest of the text.
+        """
+        records: List[str] = []
+        start = position = quotes = 0
+        end = text.find("\n") + 1
+        while end and len(records) < limit:
+            # A line ending with an odd number of quotes before it is inside a quoted field
+            quotes += text.count('"', position, end)
+            position = end
+            if quotes % 2 == 0:
+                records.append(text[start:end])
+                start = end
+            end = text.find("\n", end) + 1
+        if len(records) < limit and start < len(text):
+            records.append(text[start:])
+            start = len(text)
+        return records, text[start:]
+
+    def _consume_header(self, block: str, final: bool = False) -> str:
+        """
+        Holds back the first records until the layout can be inferred from them, then
+        returns the data records among them (without preamble and header).
+        """
+        if self.layout is not None:
+            return self._settle_date_order(block, final)
+        self._head += block
+        # Preamble and header are searched within SAMPLE_ROWS records, followed by as many sampled rows
+        if not final and self._head.count("\n") < 2 * SAMPLE_ROWS:
+            return ""
+
+        head, self._head = self._head, ""
+        if not head.strip():
+            return ""
+        records, rest = self._split_records(head, 2 * SAMPLE_ROWS)
+        try:
+            self.layout, skip = infer_csv_layout(records)
+        except ValueError as e:
+            raise FileParsingError(str(e))
+        return self._settle_date_order("".join(records[skip:]) + rest, final)
+
+    def _settle_date_order(self, block: str, final: bool = False) -> str:
+        """
+        Holds back data records while the layout's day/month order is open, then returns
+        every held record. At the end of the file, the preferred order is kept.
+        """
+        layout = self.layout
+        if layout.alternate_date_format is None:
+            return block
+        self._held += block
+        try:
+            rows = csv.reader(StringIO(block), delimiter=layout.delimiter)
+            settle_date_order(layout, (row[layout.date] for row in rows if len(row) > layout.date))
+        except csv.Error:
+            layout.alternate_date_format = None # Parsing the records reports the error
+        if final:
+            layout.alternate_date_format = None
+        if layout.alternate_date_format is not None:
+            return ""
+        held, self._held = self._held, ""
+        return held
+
+def parse_csv_records(text: str, layout: Optional[ColumnLayout], batch_size: int) -> List[TransactionBatch]:
+    """
+    Parses a block of complete CSV data records (without the header) into batches of transactions.
+
+    Args:
+        text: The CSV records.
+        layout: The file's layout, as inferred by `CsvStreamParser`.
+        batch_size: The maximum number of transactions per batch.
+
+    Returns:
+        A list of TransactionBatch objects.
+
+    Raises:
+        FileParsingError: If data conversion fails.
+    """
+    if not text or layout is None:
+        return []
+    try:
+        return list(iter_layout_batches(csv.reader(StringIO(text), delimiter=layout.delimiter), layout, batch_size, "CSV"))
+    except (ValueError, csv.Error) as e:
+        raise FileParsingError(str(e))
+
+def parse_csv(file_content: str) -> TransactionBatch:
+    """
+    Parses CSV content into a TransactionBatch.
+    The header, delimiter, columns and formats are inferred (see `src.services.formats`).
     
     Args:
         file_content: The content of the CSV file as a string.
         
     Returns:
-        A list of Transaction objects.
+        A TransactionBatch holding every parsed transaction.
         
     Raises:
         FileParsingError: If required columns are missing or data conversion fails.
     """
-    transactions: List[Transaction] = []
-    f = StringIO(file_content)
-    reader = csv.DictReader(f)
+    parser = CsvStreamParser(batch_size=sys.maxsize)
+    return TransactionBatch.concat(parser.feed(file_content) + parser.close())
+
+def iter_excel_batches(source: Union[bytes, BinaryIO], sheet_name: Optional[str] = None,
+                       batch_size: int = 1000) -> Iterator[TransactionBatch]:
+    """
+    Streams the rows of an Excel workbook and yields its transactions in batches.
+    The workbook is opened in read-only mode, so rows are read lazily from the
+    underlying file instead of building every cell in memory. The sheet's layout
+    is inferred from its first rows (see `src.services.formats`), and cells are
+    converted a column at a time.
+
+    Args:
+        source: The Excel content as bytes, or a seekable binary file object.
+        sheet_name: The worksheet to read. Defaults to the active sheet.
+        batch_size: The number of transactions per yielded batch.
+
+    Yields:
+        TransactionBatch objects of at most `batch_size` transactions.
+
+    Raises:
+        FileParsingError: If the sheet is missing, required columns are missing or data conversion fails.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+
+    try:
+        workbook = load_workbook(filename=source, read_only=True, data_only=True)
+    except (InvalidFileException, BadZipFile, KeyError) as e:
+        raise FileParsingError(f"Unable to open Excel file: {e}")
+
+    try:
+        if sheet_name is None:
+            sheet = workbook.active
+        elif sheet_name in workbook.sheetnames:
+            sheet = workbook[sheet_name]
+        else:
+            raise FileParsingError(f"Sheet '{sheet_name}' not found in Excel file. Available sheets: {', '.join(workbook.sheetnames)}.")
 
-    for row in reader:
+        rows = sheet.iter_rows(values_only=True)
+        head = list(islice(rows, 2 * SAMPLE_ROWS))
         try:
-            # Basic mapping, needs to be more robust for varied formats (FR-011)
-            # For now, assume 'Date', 'Description', 'Amount'
-            transaction_date = datetime.strptime(row['Date'], '%Y-%m-%d').date() # Example format
-            description = row['Description']
-            amount = float(row['Amount'])
-            
-            transactions.append(
-                Transaction(
-                    date=transaction_date,
-                    description=description,
-                    amount=amount
-                )
-            )
-        except KeyError as e:
-            raise FileParsingError(f"Missing expected column in CSV: {e}. Ensure 'Date', 'Description', 'Amount' are present.")
+            layout, skip = infer_layout(head, "Excel")
+            # Blank rows, which read-only sheets report for formatted but empty cells, have no date and are skipped
+            yield from iter_layout_batches(chain(head[skip:], rows), layout, batch_size, "Excel")
         except ValueError as e:
-            raise FileParsingError(f"Data type conversion error in CSV: {e}. Check 'Date' and 'Amount' formats.")
-    return transactions
+            raise FileParsingError(str(e))
+    finally:
+        # Read-only workbooks keep the source open until explicitly closed
+        workbook.close()
 
-def parse_excel(file_content: bytes) -> List[Transaction]:
+def parse_excel(file_content: bytes, sheet_name: Optional[str] = None) -> TransactionBatch:
     """
-    Parses Excel content (bytes) into a list of Transaction objects.
-    Assumes first sheet, first row headers, and columns like 'Date', 'Description', 'Amount'.
+    Parses Excel content (bytes) into a TransactionBatch.
+    The header, columns and formats are inferred (see `src.services.formats`).
     
     Args:
         file_content: The content of the Excel file as bytes.
+        sheet_name: The worksheet to read. Defaults to the active sheet.
         
     Returns:
-        A list of Transaction objects.
+        A TransactionBatch holding every parsed transaction.
         
     Raises:
         FileParsingError: If required columns are missing or data conversion fails.
     """
-    transactions: List[Transaction] = []
-    
-    # Load workbook from bytes
-    workbook = load_workbook(filename=BytesIO(file_content)) # Corrected to BytesIO
-    sheet = workbook.active
-    
-    headers = [cell.value for cell in sheet[1]]
-    
-    for row_idx in range(2, sheet.max_row + 1): # Start from second row for data
-        row_data = {}
-        for col_idx, header in enumerate(headers):
-            row_data[header] = sheet.cell(row=row_idx, column=col_idx + 1).value
-        
-        try:
-            # Handle date parsing from Excel, which can be datetime objects
-            if isinstance(row_data['Date'], datetime):
-                transaction_date = row_data['Date'].date()
-            else:
-                transaction_date = datetime.strptime(str(row_data['Date']), '%Y-%m-%d').date()
-            description = str(row_data['Description'])
-            amount = float(row_data['Amount'])
-
-            transactions.append(
-                Transaction(
-                    date=transaction_date,
-                    description=description,
-                    amount=amount
-                )
-            )
-        except KeyError as e:
-            raise FileParsingError(f"Missing expected column in Excel: {e}. Ensure 'Date', 'Description', 'Amount' are present.")
-        except ValueError as e:
-            raise FileParsingError(f"Data type conversion error in Excel: {e}. Check 'Date' and 'Amount' formats.")
-        except AttributeError as e:
-            raise FileParsingError(f"Date format error in Excel: {e}. Ensure 'Date' column contains valid date formats.")
-            
-    return transactions
+    return TransactionBatch.concat(iter_excel_batches(file_content, sheet_name=sheet_name, batch_size=sys.maxsize))
@@ -0,0 +1,112 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from src.core.config import settings
+from src.models.schemas import Insight, Prediction, InsightType
+from src.models.batch import TransactionBatch
+from src.models.aggregates import RunningAggregates
+from src.services.anomaly import detect_anomalies, WEEKDAYS
+from src.services.forecasting import forecast_spending, EXPONENTIAL_SMOOTHING, SEASONAL_NAIVE
+
+def build_report(categorized_transactions: TransactionBatch, aggregates: Optional[RunningAggregates] = None,
+                 previous_anomalies: Sequence[Insight] = ()) -> Tuple[List[Insight], List[Prediction], RunningAggregates]:
+    """
+    Derives spending patterns, anomalies and predictions from categorized transactions.
+    This is the CPU-bound, numeric part of the analysis; it has no I/O and can run in a worker process.
+
+    To update the report of a job with newly appended transactions, pass only the new
+    transactions together with the job's stored aggregates and anomaly insights: totals
+    and predictions come from the updated aggregates (predictions are forecast from their
+    month x category spending matrix), and only the new transactions are checked for
+    anomalies (against the recent history kept in the aggregates), so the cost scales
+    with the new rows.
+
+    Args:
+        categorized_transactions: A TransactionBatch with its categories already assigned.
+        aggregates: Running aggregates of the job's earlier transactions, updated in place.
+            Defaults to a report over `categorized_transactions` alone.
+        previous_anomalies: Anomaly insights already reported for the earlier transactions; they
+            are ranked together with the new ones, and the top `ANOMALY_MAX_INSIGHTS` are kept.
+
+    Returns:
+        A tuple of the generated insights, the predictions, and the updated aggregates.
+    """
+    if aggregates is None:
+        aggregates = RunningAggregates.empty()
+    history = aggregates.recent_expenses()
+    aggregates.update(categorized_transactions, recent_size=settings.ANOMALY_HISTORY_SIZE)
+    if not aggregates.count:
+        return [], [], aggregates
+
+    # 2. Spending Patterns (Simple example: total spent per category)
+    insights: List[Insight] = []
+    for category, total_spent in zip(aggregates.categories, aggregates.totals.tolist()):
+        if total_spent > 0: # Only consider expenses
+            insights.append(
+                Insight(
+                    type=InsightType.SPENDING_PATTERN,
+                    title=f"Spending Pattern: {category}",
+                    description=f"You spent a total of {total_spent:.2f} in '{category}'.",
+                    data={"category": category, "total_spent": total_spent}
+                )
+            )
+
+    # 3. Anomalous Transactions: scored against robust per-category, per-weekday and rolling
+    # baselines; the job's recent history is the baseline context of appended transactions
+    anomaly_insights = list(previous_anomalies)
+    batch = categorized_transactions
+    anomalies = detect_anomalies(batch.amounts, batch.dates.astype(np.int64),
+                                 aggregates.category_codes(batch), history=history)
+    for i, score, robust_z, rolling_z, baseline, day in zip(
+            anomalies.rows.tolist(), anomalies.scores.tolist(), anomalies.robust_z.tolist(),
+            anomalies.rolling_z.tolist(), anomalies.baselines.tolist(), anomalies.weekdays.tolist()):
+        amount = float(batch.amounts[i])
+        category = batch.category_of(i)
+        anomaly_insights.append(
+            Insight(
+                type=InsightType.ANOMALY_DETECTED,
+                title=f"Anomaly Detected: Large Transaction in {category}",
+                description=(f"An unusually large transaction of {amount:.2f} was detected in '{category}' "
+                             f"on {batch.dates[i]}; a typical {WEEKDAYS[day]} amount is around {baseline:.2f}."),
+                data={
+                    "transaction_id": str(batch.transaction_id(i)),
+                    "amount": amount,
+                    "category": category,
+                    "score": round(score, 2),
+                    "robust_z": round(robust_z, 2),
+                    "rolling_z": None if math.isnan(rolling_z) else round(rolling_z, 2),
+                    "baseline": round(baseline, 2),
+                    "day_of_week": WEEKDAYS[day],
+                }
+            )
+        )
+
+    # Earlier and new anomalies compete for the same ANOMALY_MAX_INSIGHTS slots, highest scores first
+    anomaly_insights.sort(key=lambda insight: insight.data.get("score") or 0.0, reverse=True)
+    insights.extend(anomaly_insights[:settings.ANOMALY_MAX_INSIGHTS])
+
+    # 4. Monthly Spending Predictions: per-category time-series forecasts of the months after the history
+    predictions: List[Prediction] = []
+    forecast = forecast_spending(aggregates.month_spending, aggregates.first_month, aggregates.last_day)
+    spenders = np.flatnonzero(aggregates.month_spending.any(axis=0)).tolist() # Categories with expenses
+    for step in range(forecast.horizon):
+        period = forecast.period(step)
+        predictions.append(
+            Prediction(
+                period=period,
+                predicted_amount=round(float(forecast.totals[step]), 2),
+                confidence_score=round(float(forecast.total_confidence[step]), 3)
+            )
+        )
+        for code in spenders:
+            predictions.append(
+                Prediction(
+                    period=period,
+                    predicted_amount=round(float(forecast.amounts[step, code]), 2),
+                    confidence_score=round(float(forecast.confidence[step, code]), 3),
+                    category=aggregates.categories[code],
+                    model=SEASONAL_NAIVE if forecast.seasonal[code] else EXPONENTIAL_SMOOTHING
+                )
+            )
+
+    return insights, predictions, aggregates
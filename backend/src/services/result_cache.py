@@ -0,0 +1,210 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import UUID
+from fastapi import Request, Response, status
+from src.core.config import settings
+from src.core.executor import run_cpu_bound
+from src.core.metrics import RESULT_CACHE_BYTES
+from src.core.serialization import accepted_encodings
+from src.core.storage import run_store
+from src.services.workers import serialize_results_from_bytes
+
+RESULT_NAMES = ("transactions", "insights", "predictions")
+"""The result resources whose serialized bodies are cached."""
+
+# Preferred order when a client accepts several encodings
+_ENCODING_PREFERENCE = ("zstd", "gzip")
+
+class CachedResponse:
+    """
+    A pre-serialized JSON response body, its precompressed variants, and a strong ETag per representation.
+    """
+    __slots__ = ("body", "variants", "digest")
+
+    def __init__(self, body: bytes, variants: Dict[str, bytes], digest: str):
+        """
+        Initializes the response.
+
+        Args:
+            body: The uncompressed JSON body.
+            variants: Compressed bodies by content encoding.
+            digest: The content hash of `body`.
+        """
+        self.body = body
+        self.variants = variants
+        self.digest = digest
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes held by the body and its variants.
+        """
+        return len(self.body) + sum(len(variant) for variant in self.variants.values())
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """
+        Returns the strong ETag of the representation with the given content encoding.
+        """
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def to_response(self, request: Request) -> Response:
+        """
+        Serves the cached bytes: 304 if `If-None-Match` matches, otherwise the best
+        representation allowed by `Accept-Encoding`.
+
+        Args:
+            request: The incoming request.
+
+        Returns:
+            The response to send.
+        """
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        encoding = next((e for e in _ENCODING_PREFERENCE if e in accepted and e in self.variants), None)
+        headers = {"ETag": self.etag(encoding), "Vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            # Every representation has the same content, so any of our validators matches
+            known = {self.etag()} | {self.etag(e) for e in self.variants}
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or tags & known:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(content=self.variants[encoding], media_type="application/json", headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+class ResultCache:
+    """
+    In-process LRU of pre-serialized result responses, bounded by an approximate byte budget.
+
+    Results do not change once a job has completed, so each job's transactions,
+    insights and predictions are serialized once (in the process pool) and the
+    bytes are served directly on every later request. Entries are rebuilt from the
+    job store on a miss, for instance in another worker process or after eviction.
+
+    Entries are tagged with the job's `results_version`, which the job store keeps
+    with the job. When an append changes the results in any worker process, requests
+    carry the new version and stop matching the entries cached before it.
+    """
+    def __init__(self, max_bytes: int):
+        """
+        Initializes the cache.
+
+        Args:
+            max_bytes: Approximate memory budget for cached bodies.
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[UUID, Tuple[int, Dict[str, CachedResponse]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[UUID, int], "asyncio.Task[Optional[Dict[str, CachedResponse]]]"] = {}
+        self.hits = 0
+        """Requests answered from cached bytes."""
+        self.misses = 0
+        """Requests that required serializing a job's results."""
+
+    async def prime(self, job_id: UUID, version: int, results: Dict[str, Any]) -> Dict[str, CachedResponse]:
+        """
+        Serializes a job's results and caches them.
+
+        Args:
+            job_id: The ID of the job.
+            version: The job's `results_version` that `results` belong to.
+            results: The job's results, as stored in the job store.
+
+        Returns:
+            The responses by result name.
+        """
+        serialized = await run_cpu_bound(
+            serialize_results_from_bytes,
+            results["categorized_transactions"].to_bytes(compress=False),
+            [insight.model_dump(mode="json") for insight in results["insights"]],
+            [prediction.model_dump(mode="json") for prediction in results["predictions"]],
+        )
+        responses = {name: CachedResponse(*parts) for name, parts in serialized.items()}
+        self._store(job_id, version, responses)
+        return responses
+
+    async def get(self, job_id: UUID, version: int, name: str,
+                  load_results: Callable[[], Optional[Dict[str, Any]]]) -> Optional[CachedResponse]:
+        """
+        Returns the cached response for one of a job's results, serializing the job's
+        results on a miss. Concurrent misses for the same job share one serialization.
+
+        Args:
+            job_id: The ID of the job.
+            version: The job's current `results_version`; entries of other versions are stale.
+            name: One of `RESULT_NAMES`.
+            load_results: Returns the job's results from the job store, or None.
+
+        Returns:
+            The cached response, or None if the job has no results.
+        """
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(job_id)
+                self.hits += 1
+                return entry[1][name]
+            self.misses += 1
+
+        key = (job_id, version)
+        pending = self._pending.get(key)
+        if pending is None:
+            # The serialization runs in its own task, so a waiting request being
+            # cancelled (a client disconnecting) never strands the other waiters
+            pending = asyncio.create_task(self._load(job_id, version, load_results))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        responses = await asyncio.shield(pending)
+        return responses[name] if responses else None
+
+    async def _load(self, job_id: UUID, version: int,
+                    load_results: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, CachedResponse]]:
+        """
+        Loads a job's results from the store (in a worker thread when the store may block
+        on disk) and serializes them, or returns None if there are none.
+        """
+        results = await run_store(load_results)
+        return await self.prime(job_id, version, results) if results else None
+
+    def invalidate(self, job_id: UUID) -> None:
+        """
+        Drops a job's cached responses, for instance after its results change.
+        """
+        with self._lock:
+            entry = self._entries.pop(job_id, None)
+            if entry is not None:
+                self._size -= sum(response.nbytes for response in entry[1].values())
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit/miss counters and the current footprint.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "jobs": len(self._entries), "bytes": self._size}
+
+    def _store(self, job_id: UUID, version: int, responses: Dict[str, CachedResponse]) -> None:
+        size = sum(response.nbytes for response in responses.values())
+        if size > self.max_bytes:
+            return # Too large to cache; served from freshly serialized bytes instead
+        with self._lock:
+            previous = self._entries.get(job_id)
+            if previous is not None:
+                if previous[0] > version:
+                    return # A serialization that started before an append finished after it
+                del self._entries[job_id]
+                self._size -= sum(response.nbytes for response in previous[1].values())
+            self._entries[job_id] = (version, responses)
+            self._size += size
+            # Evict least recently used jobs; the one just stored fits on its own
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= sum(response.nbytes for response in evicted.values())
+
+result_cache = ResultCache(settings.RESPONSE_CACHE_MAX_BYTES)
+RESULT_CACHE_BYTES.set_function(lambda: result_cache.stats()["bytes"])
@@ -0,0 +1,216 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+from uuid import UUID
+from src.core.config import settings
+from src.core.metrics import QUEUE_DEPTH, JOBS_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Raised when the scheduler cannot accept more jobs."""
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _QueuedJob:
+    """
+    A job waiting in the scheduler queue.
+    """
+    __slots__ = ("job_id", "tenant", "size_class", "sequence", "enqueued_at", "run", "discard")
+
+    def __init__(self, job_id: UUID, tenant: str, size: int, sequence: int, run: Callable[[], Awaitable[None]],
+                 discard: Optional[Callable[[], Awaitable[None]]] = None):
+        self.job_id = job_id
+        self.tenant = tenant
+        # Files within a factor of two of each other share a size class
+        self.size_class = max(0, int(math.log2(max(size, 1) / (64 * 1024))) + 1) if size > 64 * 1024 else 0
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.run = run
+        self.discard = discard
+
+    def priority(self, now: float) -> tuple:
+        """
+        Smaller files go first; waiting jobs age into better classes so large files are not starved.
+        """
+        aged_class = self.size_class - int((now - self.enqueued_at) / settings.SCHEDULER_AGING_SECONDS)
+        return (aged_class, self.sequence)
+
+class JobScheduler:
+    """
+    Bounded, fair scheduler for analysis jobs.
+
+    Jobs are queued per tenant; workers take turns across tenants (round-robin) so
+    one tenant's burst cannot monopolize the workers, and within a tenant smaller
+    files run first. The queue is bounded overall and per tenant; when it is full,
+    `submit` raises QueueFullError with a Retry-After estimate based on recent job
+    durations.
+    """
+    def __init__(self, workers: int, max_queue_size: int, max_queue_per_tenant: int):
+        """
+        Initializes the scheduler. Workers are started on the first submission.
+
+        Args:
+            workers: Number of jobs run concurrently.
+            max_queue_size: Maximum number of queued (not yet running) jobs.
+            max_queue_per_tenant: Maximum number of queued jobs per tenant.
+        """
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.max_queue_per_tenant = max_queue_per_tenant
+        self._queues: "OrderedDict[str, List[_QueuedJob]]" = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._average_duration = 5.0 # Seconds; refined with an exponential moving average
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting to run."""
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        """Number of jobs currently running."""
+        return self._running
+
+    def check_capacity(self, tenant: str) -> None:
+        """
+        Raises if a job for `tenant` would be rejected, so callers can fail fast
+        before doing expensive work such as spooling an upload.
+
+        Raises:
+            QueueFullError: If the queue, or the tenant's share of it, is full.
+        """
+        if self._queued >= self.max_queue_size:
+            raise QueueFullError("The analysis queue is full. Please retry later.", self._retry_after(self._queued))
+        tenant_queued = len(self._queues.get(tenant, ()))
+        if tenant_queued >= self.max_queue_per_tenant:
+            raise QueueFullError("Too many queued analysis jobs for this tenant. Please retry later.", self._retry_after(tenant_queued))
+
+    def submit(self, job_id: UUID, tenant: str, size: int, run: Callable[[], Awaitable[None]],
+               discard: Optional[Callable[[], Awaitable[None]]] = None) -> int:
+        """
+        Queues a job.
+
+        Args:
+            job_id: The ID of the analysis job.
+            tenant: The tenant the job belongs to, for fairness.
+            size: The size of the uploaded file in bytes, for prioritization.
+            run: Coroutine function that processes the job.
+            discard: Coroutine function called instead of `run` if the scheduler is
+                stopped while the job is still queued, to release its resources.
+
+        Returns:
+            The job's position in the queue (0 means it is next to run).
+
+        Raises:
+            QueueFullError: If the queue, or the tenant's share of it, is full.
+        """
+        self.check_capacity(tenant)
+        self._ensure_started()
+        self._queues.setdefault(tenant, []).append(_QueuedJob(job_id, tenant, size, next(self._sequence), run, discard))
+        self._queued += 1
+        self._notify()
+        return self.position(job_id)
+
+    def position(self, job_id: UUID) -> Optional[int]:
+        """
+        Returns the number of jobs that will run before `job_id`, or None if it is not queued.
+        """
+        for position, queued in enumerate(self._dispatch_order()):
+            if queued.job_id == job_id:
+                return position
+        return None
+
+    async def stop(self) -> None:
+        """
+        Stops the workers. Jobs still queued are dropped, after awaiting their `discard` callbacks.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+        dropped = [job for jobs in self._queues.values() for job in jobs]
+        self._queues.clear()
+        self._queued = 0
+        if dropped:
+            logger.warning(f"Dropping {len(dropped)} queued analysis jobs on shutdown.")
+        for job in dropped:
+            if job.discard is None:
+                continue
+            try:
+                await job.discard()
+            except Exception:
+                logger.exception(f"Could not discard queued analysis job {job.job_id}.")
+
+    def _dispatch_order(self) -> List[_QueuedJob]:
+        """
+        Simulates the order in which the currently queued jobs would be dispatched.
+        """
+        now = time.monotonic()
+        queues = [sorted(jobs, key=lambda job: job.priority(now)) for jobs in self._queues.values()]
+        order: List[_QueuedJob] = []
+        for round_ in itertools.zip_longest(*queues):
+            order.extend(job for job in round_ if job is not None)
+        return order
+
+    def _next_job(self) -> _QueuedJob:
+        """
+        Pops the best job of the tenant whose turn it is, and moves that tenant to the back.
+        """
+        tenant, jobs = next(iter(self._queues.items()))
+        now = time.monotonic()
+        job = min(jobs, key=lambda queued: queued.priority(now))
+        jobs.remove(job)
+        del self._queues[tenant]
+        if jobs:
+            self._queues[tenant] = jobs
+        self._queued -= 1
+        return job
+
+    def _ensure_started(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _notify(self) -> None:
+        async def notify() -> None:
+            async with self._wakeup:
+                self._wakeup.notify()
+        asyncio.create_task(notify())
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: self._queued > 0)
+                job = self._next_job()
+            self._running += 1
+            started = time.monotonic()
+            try:
+                await job.run()
+            except Exception:
+                logger.exception(f"Analysis job {job.job_id} failed.")
+            finally:
+                self._running -= 1
+                self._average_duration = 0.8 * self._average_duration + 0.2 * (time.monotonic() - started)
+
+    def _retry_after(self, jobs_ahead: int) -> int:
+        """
+        Estimates the seconds until capacity frees up, from the average job duration.
+        """
+        return max(1, math.ceil(self._average_duration * max(jobs_ahead, 1) / max(self.workers, 1)))
+
+scheduler = JobScheduler(settings.SCHEDULER_WORKERS, settings.SCHEDULER_MAX_QUEUE, settings.SCHEDULER_MAX_QUEUE_PER_TENANT)
+QUEUE_DEPTH.set_function(lambda: scheduler.queued)
+JOBS_IN_FLIGHT.set_function(lambda: scheduler.running)
@@ -0,0 +1,87 @@
+"""
+Entry points for CPU-bound work that runs in the process pool (see `src.core.executor`).
+
+Arguments and results cross the process boundary in compact forms: transaction
+batches as `TransactionBatch.to_bytes` blobs, insights and predictions as plain
+JSON-compatible dictionaries. This module must stay importable without the
+Groq client or any other I/O-bound service.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from src.core.serialization import dumps, compress_variants, content_hash
+from src.models.aggregates import RunningAggregates
+from src.models.batch import TransactionBatch
+from src.models.index import TransactionIndex
+from src.models.rollup import RollupCube
+from src.models.schemas import Insight
+from src.services.formats import ColumnLayout
+from src.services.parser import parse_csv_records, iter_excel_batches
+from src.services.reporting import build_report
+
+def parse_csv_block(text: str, layout: ColumnLayout, batch_size: int) -> List[bytes]:
+    """
+    Parses a block of complete CSV data records.
+
+    Returns:
+        The parsed batches, serialized.
+    """
+    return [batch.to_bytes(compress=False) for batch in parse_csv_records(text, layout, batch_size)]
+
+def parse_excel_file(path: str, sheet_name: Optional[str], batch_size: int) -> List[bytes]:
+    """
+    Parses an Excel workbook from a file on disk.
+
+    Returns:
+        The parsed batches, serialized.
+    """
+    with open(path, "rb") as f:
+        return [batch.to_bytes(compress=False) for batch in iter_excel_batches(f, sheet_name=sheet_name, batch_size=batch_size)]
+
+def build_report_from_bytes(blob: bytes, aggregates_blob: Optional[bytes] = None,
+                            previous_anomalies: Sequence[Dict[str, Any]] = ()) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], bytes]:
+    """
+    Runs the numeric analysis stages on a serialized, categorized batch, optionally on
+    top of a job's stored aggregates and anomalies (see `build_report`).
+
+    Returns:
+        The insights and predictions, as dictionaries, and the serialized updated aggregates.
+    """
+    aggregates = RunningAggregates.from_bytes(aggregates_blob) if aggregates_blob else None
+    insights, predictions, aggregates = build_report(
+        TransactionBatch.from_bytes(blob), aggregates, [Insight.model_validate(item) for item in previous_anomalies]
+    )
+    return [i.model_dump(mode="json") for i in insights], [p.model_dump(mode="json") for p in predictions], aggregates.to_bytes()
+
+def build_index_from_bytes(blob: bytes) -> bytes:
+    """
+    Builds the query indexes of a serialized, categorized batch.
+
+    Returns:
+        The serialized TransactionIndex.
+    """
+    return TransactionIndex.build(TransactionBatch.from_bytes(blob)).to_bytes()
+
+def build_rollup_from_bytes(blob: bytes) -> bytes:
+    """
+    Builds the day x category rollup cube of a serialized, categorized batch.
+
+    Returns:
+        The serialized RollupCube.
+    """
+    return RollupCube.build(TransactionBatch.from_bytes(blob)).to_bytes()
+
+def serialize_results_from_bytes(blob: bytes, insights: List[Dict[str, Any]],
+                                 predictions: List[Dict[str, Any]]) -> Dict[str, Tuple[bytes, Dict[str, bytes], str]]:
+    """
+    Encodes a job's transactions, insights and predictions as JSON response bodies,
+    with their precompressed variants.
+
+    Returns:
+        For each of "transactions", "insights" and "predictions": the body, its
+        compressed variants by content encoding, and its content hash.
+    """
+    bodies = {
+        "transactions": dumps(TransactionBatch.from_bytes(blob).to_records()),
+        "insights": dumps(insights),
+        "predictions": dumps(predictions),
+    }
+    return {name: (body, compress_variants(body), content_hash(body)) for name, body in bodies.items()}
@@ -0,0 +1,52 @@
+"""
+Shared setup of the test suite.
+
+Tests run offline: like the benchmarks, they use a placeholder Groq API key (the
+model is replaced by `benchmarks.stub_llm` where one is needed), a memory-only
+categorization cache and no client-side rate limit. Variables already set in the
+environment are kept.
+
+Run from the `backend` directory:
+    python -m pytest -q
+"""
+import os
+import sys
+from datetime import date, timedelta
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("GROQ_API_KEY", "test-stub")
+os.environ.setdefault("CATEGORY_CACHE_PATH", "")
+os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.batch import TransactionBatch, TransactionBatchBuilder  # noqa: E402
+
+CATEGORIES = ("Groceries", "Dining", "Transport", "Utilities", "Salary")
+"""Categories assigned by `make_batch`."""
+
+
+@pytest.fixture
+def make_batch() -> Callable[..., TransactionBatch]:
+    """
+    Returns a factory of categorized batches with random dates, descriptions and amounts.
+    The same seed gives the same rows.
+    """
+    def factory(rows: int, seed: int = 0, categories: Optional[Sequence[str]] = CATEGORIES,
+                start: date = date(2024, 1, 1), days: int = 120) -> TransactionBatch:
+        rng = np.random.default_rng(seed)
+        builder = TransactionBatchBuilder()
+        offsets = rng.integers(0, days, size=rows)
+        merchants = rng.integers(0, 40, size=rows)
+        # Whole cents, with many repeated amounts so that sorts and ranges have ties
+        amounts = np.round(rng.choice([-2500.0, 4.5, 12.0, 12.0, 30.25, 99.99], size=rows) * rng.integers(1, 4, size=rows), 2)
+        for offset, merchant, amount in zip(offsets.tolist(), merchants.tolist(), amounts.tolist()):
+            builder.append(start + timedelta(days=offset), f"Merchant {merchant:02d} Store", amount)
+        batch = builder.build()
+        if categories is not None:
+            batch.categories = list(categories)
+            batch.category_codes = rng.integers(0, len(categories), size=rows).astype(np.int16)
+        return batch
+    return factory
@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.models.batch import TransactionBatchBuilder
+from src.models.schemas import InsightType
+from src.services.anomaly import detect_anomalies, weekday
+from src.services.reporting import build_report
+
+START = (np.datetime64("2024-01-01", "D") - np.datetime64("1970-01-01", "D")).astype(np.int64)  # A Monday
+
+
+def series(amounts, code: int = 0, start: int = START):
+    """
+    One transaction per day from `start`, all in category `code`.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    return amounts, start + np.arange(len(amounts), dtype=np.int64), np.full(len(amounts), code, dtype=np.int16)
+
+
+def noisy(rng, center: float, rows: int) -> np.ndarray:
+    return np.round(center * rng.uniform(0.8, 1.2, size=rows), 2)
+
+
+def test_outlier_is_flagged_against_its_category_baseline():
+    rng = np.random.default_rng(0)
+    values = noisy(rng, 50.0, 60)
+    values[40] = 600.0
+    anomalies = detect_anomalies(*series(values), min_amount=100)
+    assert anomalies.rows.tolist() == [40]
+    assert anomalies.scores[0] >= 3.5
+    assert 40 < anomalies.baselines[0] < 60
+
+
+def test_baselines_are_per_category():
+    rng = np.random.default_rng(1)
+    dining = series(noisy(rng, 50.0, 60), code=0)
+    rent = series(np.full(6, 1500.0), code=1)
+    amounts, days, codes = (np.concatenate(parts) for parts in zip(dining, rent))
+    # A global mean would flag every rent payment; the category baseline flags none
+    assert len(detect_anomalies(amounts, days, codes, min_samples=4)) == 0
+
+
+def test_income_and_small_amounts_are_never_flagged():
+    rng = np.random.default_rng(2)
+    values = noisy(rng, 5.0, 60)
+    values[10] = 80.0  # Anomalous but below min_amount
+    values[20] = -5000.0  # Income
+    assert len(detect_anomalies(*series(values), min_amount=100)) == 0
+    assert detect_anomalies(*series(values), min_amount=50).rows.tolist() == [10]
+
+
+def test_sensitivity_controls_how_much_is_flagged():
+    rng = np.random.default_rng(3)
+    values = np.round(rng.lognormal(4.5, 0.4, size=500), 2)
+    lenient = detect_anomalies(*series(values), sensitivity=2.0, min_amount=0)
+    strict = detect_anomalies(*series(values), sensitivity=5.0, min_amount=0)
+    assert len(strict) < len(lenient)
+    assert set(strict.rows.tolist()) <= set(lenient.rows.tolist())
+    assert np.all(np.diff(lenient.scores) <= 0)  # Highest scores first
+
+
+def test_weekday_baseline_absorbs_weekly_seasonality():
+    rng = np.random.default_rng(4)
+    days = START + np.arange(140, dtype=np.int64)
+    amounts = np.where(weekday(days) >= 5, noisy(rng, 300.0, 140), noisy(rng, 30.0, 140))
+    codes = np.zeros(140, dtype=np.int16)
+    assert len(detect_anomalies(amounts, days, codes, min_amount=0, window=7)) == 0
+
+
+def test_history_feeds_baselines_but_is_not_flagged():
+    rng = np.random.default_rng(5)
+    history_values = noisy(rng, 50.0, 60)
+    history_values[5] = 900.0
+    history = series(history_values)
+    new = series([52.0, 700.0], start=START + 60)
+    anomalies = detect_anomalies(*new, history=history, min_amount=100)
+    # Rows refer to the new transactions only
+    assert anomalies.rows.tolist() == [1]
+    # Without the history, two transactions are too few for a baseline of their own
+    assert len(detect_anomalies(*new, min_amount=100)) == 0
+
+
+def test_report_emits_scored_anomaly_insights():
+    rng = np.random.default_rng(6)
+    builder = TransactionBatchBuilder()
+    for offset, amount in enumerate(noisy(rng, 40.0, 90).tolist()):
+        builder.append(date(2024, 1, 1) + timedelta(days=offset), "Corner Cafe", amount)
+    builder.append(date(2024, 2, 10), "Corner Cafe", 950.0)
+    batch = builder.build()
+    batch.categories = ["Dining Out"]
+    batch.category_codes = np.zeros(len(batch), dtype=np.int16)
+
+    insights, _, _ = build_report(batch)
+    (anomaly,) = [insight for insight in insights if insight.type == InsightType.ANOMALY_DETECTED]
+    assert anomaly.data["amount"] == 950.0
+    assert anomaly.data["category"] == "Dining Out"
+    assert anomaly.data["day_of_week"] == "Saturday"
+    assert anomaly.data["score"] >= 3.5
+    assert {"robust_z", "rolling_z", "baseline", "transaction_id"} <= set(anomaly.data)
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import date
+from typing import AsyncIterator, List
+
+import numpy as np
+import pytest
+
+from src.models.aggregates import Deduplicator, RunningAggregates, fingerprint_rows
+from src.models.batch import TransactionBatch
+
+
+async def stream(batches: List[TransactionBatch]) -> AsyncIterator[TransactionBatch]:
+    for batch in batches:
+        yield batch
+
+
+def rows(batch: TransactionBatch):
+    """
+    The (date, description, amount) of each row, which is what deduplication compares.
+    """
+    return [(str(day), batch.descriptions[code], amount)
+            for day, code, amount in zip(batch.dates, batch.description_codes, batch.amounts.tolist())]
+
+
+def test_fingerprints_ignore_ids_and_categories(make_batch):
+    batch = make_batch(200, seed=1)
+    copy = make_batch(200, seed=1, categories=None)
+    assert not np.array_equal(batch.ids, copy.ids)
+    np.testing.assert_array_equal(fingerprint_rows(batch), fingerprint_rows(copy))
+
+
+def test_deduplicator_counts_copies(make_batch):
+    stored = make_batch(50, seed=2)
+    twice = TransactionBatch.concat([stored, stored])
+    deduplicator = Deduplicator(np.sort(fingerprint_rows(twice)))
+    # The job holds each row twice, so of three uploaded copies one is new
+    thrice = TransactionBatch.concat([stored, stored, stored])
+    mask = deduplicator.new_rows(thrice)
+    assert int(mask.sum()) == len(stored)
+    assert rows(thrice.take(np.flatnonzero(mask))) == rows(stored)
+
+
+def test_deduplicator_keeps_state_across_batches(make_batch):
+    stored = make_batch(30, seed=3)
+    deduplicator = Deduplicator(np.sort(fingerprint_rows(stored)))
+    assert not deduplicator.new_rows(stored).any()
+    # The same rows again, in a later batch of the same upload, are new copies
+    assert deduplicator.new_rows(stored).all()
+
+
+def test_aggregates_remember_every_appended_row(make_batch):
+    first, second = make_batch(300, seed=4), make_batch(300, seed=5)
+    aggregates = RunningAggregates.empty()
+    aggregates.update(first)
+    aggregates.update(second)
+    restored = RunningAggregates.from_bytes(aggregates.to_bytes())
+    upload = TransactionBatch.concat([second, make_batch(100, seed=6, start=date(2024, 6, 1)), first])
+    mask = restored.deduplicator().new_rows(upload)
+    assert mask.tolist() == [False] * 300 + [True] * 100 + [False] * 300
+
+
+@pytest.fixture
+def analysis_service():
+    from benchmarks import stub_llm
+    from src.services.analysis import analysis_service
+
+    stub_llm.install(latency=0.0)
+    return analysis_service
+
+
+def test_append_skips_rows_the_job_already_has(analysis_service, make_batch):
+    original = make_batch(400, seed=7, categories=None)
+    # Later dates, so that no new row happens to equal an original one
+    new = make_batch(150, seed=8, categories=None, start=date(2024, 6, 1))
+
+    async def run():
+        results = await analysis_service.analyze_transaction_stream(stream([original]))
+        # Overlapping statement: the tail of the original, then new rows, split across batches
+        upload = TransactionBatch.concat([original.take(range(300, 400)), new])
+        appended, duplicates = await analysis_service.append_transaction_stream(
+            results, stream([upload.take(range(0, 120)), upload.take(range(120, 250))]))
+        return results, appended, duplicates
+
+    results, appended, duplicates = asyncio.run(run())
+    assert duplicates == 100
+    combined = appended["categorized_transactions"]
+    assert rows(combined) == rows(original) + rows(new)
+    assert appended["aggregates"].count == len(combined)
+
+    async def append_again():
+        return await analysis_service.append_transaction_stream(appended, stream([new, original]))
+
+    again, duplicates = asyncio.run(append_again())
+    assert duplicates == len(new) + len(original)
+    assert len(again["categorized_transactions"]) == len(combined)
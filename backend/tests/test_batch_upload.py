@@ -0,0 +1,142 @@
+import asyncio
+import io
+import os
+import zipfile
+from typing import List
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from benchmarks import stub_llm
+from src.core.config import settings
+from src.core.storage import job_store
+from src.main import app
+from src.models.schemas import JobStatus
+from src.services import analysis
+from src.services.categorization_cache import CategorizationCache
+from src.services.categorizer import Categorizer
+from src.services.ingestion import SUPPORTED_EXTENSIONS, FileParsingError, has_extension, ingestion_service
+
+
+def statement(*merchants: str, month: int = 1) -> bytes:
+    lines = ["Date,Description,Amount"]
+    lines += [f"2024-{month:02d}-{day:02d},{merchant},{10 + day}.50" for day, merchant in enumerate(merchants, start=1)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def archive(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipped:
+        for name, content in members.items():
+            zipped.writestr(name, content)
+    return buffer.getvalue()
+
+
+def uploads(**files: bytes) -> List[UploadFile]:
+    return [UploadFile(io.BytesIO(content), filename=name.replace("_", "."), size=len(content)) for name, content in files.items()]
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("statement.CSV", True), ("book.xlsx", True), ("archive.zip", False), ("notes.txt", False),
+    ("csv", False), ("", False), (None, False),
+])
+def test_has_extension(filename, expected):
+    assert has_extension(filename, SUPPORTED_EXTENSIONS) is expected
+
+
+def test_archives_contribute_their_supported_members():
+    files = uploads(january_csv=statement("KROGER"), months_zip=archive({
+        "february.csv": statement("SPOTIFY"),
+        "nested/march.csv": statement("UBER"),
+        "readme.txt": b"skip me",
+        "__MACOSX/._february.csv": b"metadata",
+        ".hidden.csv": b"hidden",
+    }))
+    entries, paths = asyncio.run(ingestion_service.spool_batch(files))
+    try:
+        assert [(entry.filename, entry.member is not None) for entry in entries] == \
+               [("january.csv", False), ("february.csv", True), ("nested/march.csv", True)]
+        with entries[2].open() as member:
+            assert member.read() == statement("UBER")
+        assert len(paths) == 2
+    finally:
+        for path in paths:
+            os.remove(path)
+
+
+@pytest.mark.parametrize("files, message", [
+    ({"bad_zip": b"not a zip"}, "Unable to open ZIP archive"),
+    ({"empty_zip": archive({"readme.txt": b"nothing"})}, "contains no supported files"),
+])
+def test_unusable_archives_are_rejected(files, message, monkeypatch):
+    spooled = []
+    spool_upload = ingestion_service.spool_upload
+
+    async def tracking_spool(file):
+        result = await spool_upload(file)
+        spooled.append(result[0])
+        return result
+
+    monkeypatch.setattr(ingestion_service, "spool_upload", tracking_spool)
+    with pytest.raises(FileParsingError, match=message):
+        asyncio.run(ingestion_service.spool_batch(uploads(**files)))
+    assert spooled and not any(os.path.exists(path) for path in spooled)
+
+
+def test_batch_size_is_limited(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_FILES", 2)
+    with pytest.raises(FileParsingError, match="at most 2 files"):
+        asyncio.run(ingestion_service.spool_batch(uploads(a_csv=statement("A"), b_csv=statement("B"), c_csv=statement("C"))))
+
+
+def test_batch_merges_children_and_categorizes_shared_merchants_once(monkeypatch):
+    stub = stub_llm.install(latency=0.01)
+    monkeypatch.setattr(analysis, "categorizer", Categorizer(CategorizationCache(None)))
+    files = uploads(
+        january_csv=statement("KROGER #1", "SPOTIFY", "ACME TOOLS"),
+        rest_zip=archive({"february.csv": statement("KROGER #2", "SPOTIFY", month=2),
+                          "march.csv": statement("SPOTIFY", "UBER TRIP", month=3)}),
+        broken_csv=b"Date,Description,Amount\nnot a date,KROGER,oops\n",
+    )
+
+    async def main():
+        entries, paths = await ingestion_service.spool_batch(files)
+        parent = ingestion_service.create_batch_job(entries)
+        await ingestion_service.process_batch(str(parent.job_id), entries, paths)
+        return parent, paths
+
+    parent, paths = asyncio.run(main())
+    assert not any(os.path.exists(path) for path in paths)
+    stored = job_store.get_job(parent.job_id)
+    assert stored.status == JobStatus.COMPLETED
+    assert stored.error_message == "1 of 4 files could not be processed."
+    children = [job_store.get_job(child_id) for child_id in stored.child_job_ids]
+    assert [child.status for child in children] == [JobStatus.COMPLETED] * 3 + [JobStatus.FAILED]
+    assert [child.filename for child in children] == ["january.csv", "february.csv", "march.csv", "broken.csv"]
+    assert len(job_store.get_results(parent.job_id)["categorized_transactions"]) == 7
+    # KROGER, SPOTIFY, ACME TOOLS and UBER TRIP: each merchant once across the files
+    assert stub.items == 4
+
+
+def test_batch_fails_when_no_file_succeeds():
+    stub_llm.install(latency=0.0)
+    files = uploads(broken_csv=b"Date,Description\n2024-01-01,KROGER\n")
+
+    async def main():
+        entries, paths = await ingestion_service.spool_batch(files)
+        parent = ingestion_service.create_batch_job(entries)
+        with pytest.raises(FileParsingError):
+            await ingestion_service.process_batch(str(parent.job_id), entries, paths)
+        return parent
+
+    parent = asyncio.run(main())
+    assert job_store.get_job(parent.job_id).status == JobStatus.FAILED
+
+
+def test_batch_endpoint_validates_files():
+    with TestClient(app) as client:
+        unsupported = client.post("/upload/batch", files=[("files", ("a.csv", statement("A"))), ("files", ("notes.txt", b"x"))])
+        unreadable = client.post("/upload/batch", files=[("files", ("a.zip", b"not a zip"))])
+    assert unsupported.status_code == 415
+    assert unreadable.status_code == 400
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from benchmarks import stub_llm
+from src.services.categorization_cache import CategorizationCache, normalize_description
+from src.services.categorizer import Categorizer
+
+
+@pytest.mark.parametrize("variants, key", [
+    (["Uber *Trip 1234", "UBER *TRIP 9876", "uber trip"], "UBER TRIP"),
+    (["SQ *COFFEE #0042", "SQ *COFFEE #17"], "SQ COFFEE"),
+    (["AMAZON MKTPLACE PMTS XXXX1234", "Amazon Mktplace Pmts XX99"], "AMAZON MKTPLACE PMTS"),
+    (["POS PURCHASE KROGER STORE 123", "Kroger   #555"], "KROGER"),
+])
+def test_merchant_variants_share_a_key(variants, key):
+    assert {normalize_description(variant) for variant in variants} == {key}
+
+
+def test_description_without_words_keeps_its_text():
+    assert normalize_description("  12345  678 ") == "12345 678"
+
+
+def test_lru_evicts_least_recently_used_entries_over_budget():
+    # Each entry costs len(key) + len(category) + 100 bytes
+    cache = CategorizationCache(None, max_bytes=3 * 110)
+    cache.put_many({"AAAAA": "Rent1", "BBBBB": "Rent2", "CCCCC": "Rent3"})
+    assert cache.get_many(["AAAAA"]) == {"AAAAA": "Rent1"}  # Now the most recently used
+    cache.put_many({"DDDDD": "Rent4"})
+    assert cache.get_many(["AAAAA", "BBBBB", "CCCCC", "DDDDD"]) == {"AAAAA": "Rent1", "CCCCC": "Rent3", "DDDDD": "Rent4"}
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 3 and stats["bytes"] <= 3 * 110
+    assert (stats["memory_hits"], stats["misses"]) == (4, 1)
+
+
+def test_replacing_an_entry_keeps_the_size_consistent():
+    cache = CategorizationCache(None)
+    cache.put_many({"KEY": "Groceries"})
+    cache.put_many({"KEY": "Dining Out"})
+    assert cache.stats()["bytes"] == len("KEY") + len("Dining Out") + 100
+
+
+def test_sqlite_level_survives_restarts(tmp_path):
+    path = str(tmp_path / "categories.sqlite3")
+    first = CategorizationCache(path)
+    assert first.persistent
+    first.put_many({"NETFLIX": "Entertainment", "KROGER": "Groceries"})
+
+    second = CategorizationCache(path, max_bytes=0)  # Nothing stays in memory
+    assert second.get_many(["NETFLIX", "KROGER", "UNKNOWN"]) == {"NETFLIX": "Entertainment", "KROGER": "Groceries"}
+    assert (second.stats()["disk_hits"], second.stats()["misses"]) == (2, 1)
+    assert sorted(second.items()) == [("KROGER", "Groceries"), ("NETFLIX", "Entertainment")]
+
+
+def test_sqlite_hits_are_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "categories.sqlite3")
+    CategorizationCache(path).put_many({"NETFLIX": "Entertainment"})
+    cache = CategorizationCache(path)
+    cache.get_many(["NETFLIX"])
+    cache.get_many(["NETFLIX"])
+    assert (cache.stats()["disk_hits"], cache.stats()["memory_hits"]) == (1, 1)
+
+
+def test_categorizer_sends_each_merchant_to_the_model_once():
+    stub = stub_llm.install(latency=0.0)
+    categorizer = Categorizer(CategorizationCache(None))
+    descriptions = ["NETFLIX.COM 123", "Netflix.com 456", "KROGER #1", "ZZZ UNKNOWN"]
+    first = asyncio.run(categorizer.categorize(descriptions))
+    assert first[0] == first[1]
+    assert stub.items == 3
+
+    assert asyncio.run(categorizer.categorize(descriptions)) == first
+    assert stub.items == 3
+    assert categorizer.stats()["memory_hits"] == 3
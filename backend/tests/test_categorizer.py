@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from benchmarks import stub_llm
+from src.core.config import settings
+from src.services.categorization_cache import CategorizationCache
+from src.services.categorizer import Categorizer
+from src.services.groq_client import groq_client
+from src.services.local_categorizer import LocalCategorizer
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """
+    Removes the API key and any client created by earlier tests.
+    """
+    monkeypatch.setattr(settings, "GROQ_API_KEY", None)
+    monkeypatch.setattr(groq_client, "_client", None)
+    monkeypatch.setattr(groq_client, "_loop", None)
+
+
+def categorizer(threshold: float = 0.8) -> Categorizer:
+    return Categorizer(CategorizationCache(None), local=LocalCategorizer(use_tfidf=False), local_threshold=threshold)
+
+
+def test_confident_local_predictions_skip_the_model(offline):
+    categories = asyncio.run(categorizer().categorize(["STARBUCKS #123", "UBER EATS 42"]))
+    assert categories == ["Dining Out", "Dining Out"]
+
+
+def test_threshold_sends_less_confident_keys_to_the_model(monkeypatch):
+    stub = stub_llm.install(latency=0.0)
+    sent = categorizer(threshold=0.8)
+    asyncio.run(sent.categorize(["CORNER CAFE"]))
+    assert stub.items == 1 and sent.local_hits == 0
+
+    accepted = categorizer(threshold=0.7)
+    assert asyncio.run(accepted.categorize(["OTHER CAFE"])) == ["Dining Out"]
+    assert stub.items == 1 and accepted.local_hits == 1
+
+
+def test_without_api_key_escalated_keys_fall_back(offline):
+    local = categorizer()
+    categories = asyncio.run(local.categorize(["CORNER CAFE", "ZZZ UNKNOWN", "STARBUCKS #9", "CORNER CAFE"]))
+    assert categories == ["Dining Out", "Uncategorized", "Dining Out", "Dining Out"]
+    # Fallbacks are not cached, so the model is asked again once it is available
+    assert local.cache.items() == []
+
+
+def test_failed_batch_falls_back_without_failing_the_request(monkeypatch):
+    class FailingCompletions:
+        async def create(self, **kwargs):
+            raise ConnectionError("network down")
+
+    stub_llm.install(latency=0.0)
+    monkeypatch.setattr(groq_client.client.chat, "completions", FailingCompletions())
+    monkeypatch.setattr(settings, "GROQ_MAX_RETRIES", 1)
+    monkeypatch.setattr(settings, "GROQ_RETRY_BASE_DELAY", 0.0)
+    assert asyncio.run(categorizer().categorize(["CORNER CAFE", "ZZZ UNKNOWN"])) == ["Dining Out", "Uncategorized"]
+
+
+def test_concurrent_requests_share_the_fallback(offline):
+    local = categorizer()
+
+    async def run():
+        return await asyncio.gather(local.categorize(["CORNER CAFE"]), local.categorize(["CORNER CAFE"]))
+
+    assert asyncio.run(run()) == [["Dining Out"], ["Dining Out"]]
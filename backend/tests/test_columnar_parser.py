@@ -0,0 +1,116 @@
+import asyncio
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.feather as feather  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from benchmarks import stub_llm  # noqa: E402
+from src.core.storage import job_store  # noqa: E402
+from src.models.schemas import JobStatus  # noqa: E402
+from src.services.columnar_parser import iter_columnar_batches  # noqa: E402
+from src.services.ingestion import ingestion_service  # noqa: E402
+from src.services.parser import FileParsingError  # noqa: E402
+
+DATES = [date(2024, 1, 1), date(2024, 1, 2), date(2024, 2, 29), date(2024, 3, 5), date(2024, 3, 6)]
+DESCRIPTIONS = ["KROGER #12", "SPOTIFY", "KROGER #12", "UBER TRIP", "SPOTIFY"]
+AMOUNTS = [54.1, 9.99, -1200.0, 23.5, 9.99]
+
+
+def table(**overrides) -> "pa.Table":
+    columns = {"Date": pa.array(DATES, pa.date32()), "Description": pa.array(DESCRIPTIONS),
+               "Amount": pa.array(AMOUNTS), "Memo": pa.array(["ignored"] * len(DATES))}
+    columns.update(overrides)
+    return pa.table(columns)
+
+
+def write(path: str, data: "pa.Table") -> str:
+    if path.endswith(".parquet"):
+        pq.write_table(data, path, row_group_size=2)
+    elif path.endswith(".feather"):
+        feather.write_feather(data, path, compression="uncompressed")
+    elif path.endswith(".ipc"):
+        with pa.ipc.new_stream(path, data.schema) as writer:
+            writer.write_table(data, max_chunksize=2)
+    else:
+        with pa.ipc.new_file(path, data.schema) as writer:
+            writer.write_table(data, max_chunksize=3)
+    return path
+
+
+def read(path: str, batch_size: int = 1000):
+    batches = list(iter_columnar_batches(path, batch_size))
+    dates = [d for batch in batches for d in batch.dates.tolist()]
+    amounts = [a for batch in batches for a in batch.amounts.tolist()]
+    descriptions = [batch.descriptions[code] for batch in batches for code in batch.description_codes]
+    return batches, dates, descriptions, amounts
+
+
+@pytest.mark.parametrize("name", ["statement.parquet", "statement.arrow", "statement.feather", "statement.ipc"])
+def test_formats_round_trip(tmp_path, name):
+    _, dates, descriptions, amounts = read(write(str(tmp_path / name), table()))
+    assert dates == DATES
+    assert descriptions == DESCRIPTIONS
+    assert amounts == AMOUNTS
+
+
+def test_batches_are_split_to_the_batch_size(tmp_path):
+    batches, dates, _, _ = read(write(str(tmp_path / "statement.arrow"), table()), batch_size=2)
+    assert all(len(batch) <= 2 for batch in batches)
+    assert dates == DATES
+
+
+@pytest.mark.parametrize("dates", [
+    pa.array([datetime(d.year, d.month, d.day, 13, 30) for d in DATES], pa.timestamp("us")),
+    pa.array([d.isoformat() for d in DATES]),
+])
+def test_timestamp_and_string_dates(tmp_path, dates):
+    _, read_dates, _, _ = read(write(str(tmp_path / "statement.parquet"), table(Date=dates)))
+    assert read_dates == DATES
+
+
+def test_dictionary_and_missing_descriptions(tmp_path):
+    descriptions = pa.array(["KROGER #12", None, "KROGER #12", "UBER TRIP", None]).dictionary_encode()
+    _, _, read_descriptions, _ = read(write(str(tmp_path / "statement.arrow"), table(Description=descriptions)))
+    assert read_descriptions == ["KROGER #12", "", "KROGER #12", "UBER TRIP", ""]
+
+
+def test_numeric_string_amounts_are_converted(tmp_path):
+    amounts = pa.array([str(amount) for amount in AMOUNTS])
+    _, _, _, read_amounts = read(write(str(tmp_path / "statement.parquet"), table(Amount=amounts)))
+    assert read_amounts == AMOUNTS
+
+
+def test_missing_column_is_reported(tmp_path):
+    path = write(str(tmp_path / "statement.parquet"), table().drop_columns(["Amount"]))
+    with pytest.raises(FileParsingError, match="'Amount'"):
+        read(path)
+
+
+def test_null_amounts_are_rejected(tmp_path):
+    path = write(str(tmp_path / "statement.arrow"), table(Amount=pa.array([1.0, None, 2.0, 3.0, 4.0])))
+    with pytest.raises(FileParsingError, match="'Amount' contains empty values"):
+        read(path)
+
+
+def test_corrupt_file_is_a_parsing_error(tmp_path):
+    path = tmp_path / "statement.parquet"
+    path.write_bytes(b"not a parquet file")
+    with pytest.raises(FileParsingError, match="Unable to read columnar file"):
+        read(str(path))
+
+
+def test_parquet_upload_is_analyzed(tmp_path):
+    stub_llm.install(latency=0.0)
+    path = write(str(tmp_path / "spooled.parquet"), table())
+    job = ingestion_service.create_analysis_job()
+    asyncio.run(ingestion_service.process_spooled_file(str(job.job_id), path, "statement.parquet"))
+    assert not os.path.exists(path)
+    assert job_store.get_job(job.job_id).status == JobStatus.COMPLETED
+    transactions = job_store.get_results(job.job_id)["categorized_transactions"]
+    assert len(transactions) == len(DATES)
+    assert np.isclose(transactions.amounts.sum(), sum(AMOUNTS))
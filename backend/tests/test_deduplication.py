@@ -0,0 +1,85 @@
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from benchmarks import stub_llm
+from src.core.storage import job_store
+from src.main import app
+from src.models.schemas import AnalysisJob, JobStatus
+from src.services.deduplication import UploadRegistry
+
+CSV = b"Date,Description,Amount\n2024-01-02,KROGER #12,54.10\n2024-01-03,SPOTIFY,9.99\n"
+
+
+def stored_job(status: JobStatus = JobStatus.PENDING) -> AnalysisJob:
+    job = AnalysisJob(status=status)
+    job_store.save_job(job)
+    return job
+
+
+def test_content_key_covers_everything_that_affects_the_result():
+    key = UploadRegistry.content_key("acme", "abc", "March.CSV", None)
+    assert key == UploadRegistry.content_key("acme", "abc", "april.csv", "")
+    assert key != UploadRegistry.content_key("other", "abc", "March.CSV", None)
+    assert key != UploadRegistry.content_key("acme", "abc", "March.xlsx", None)
+    assert UploadRegistry.content_key("acme", "abc", "a.xlsx", "Sheet2") != UploadRegistry.content_key("acme", "abc", "a.xlsx", None)
+
+
+def test_queued_running_and_completed_jobs_are_reused():
+    registry = UploadRegistry(10)
+    for status in (JobStatus.PENDING, JobStatus.IN_PROGRESS, JobStatus.COMPLETED):
+        job = stored_job(status)
+        registry.register(job.job_id, ("content", str(job.job_id)))
+        assert registry.lookup(("content", str(job.job_id))).job_id == job.job_id
+
+
+def test_failed_and_missing_jobs_are_dropped():
+    registry = UploadRegistry(10)
+    failed = stored_job(JobStatus.FAILED)
+    registry.register(failed.job_id, ("content", "failed"))
+    registry.register(uuid4(), ("content", "missing"))
+    assert registry.lookup(("content", "failed")) is None
+    assert registry.lookup(("content", "missing")) is None
+    assert len(registry) == 0
+
+
+def test_registry_evicts_least_recently_used_keys():
+    registry = UploadRegistry(2)
+    jobs = [stored_job() for _ in range(3)]
+    registry.register(jobs[0].job_id, ("k", "0"))
+    registry.register(jobs[1].job_id, ("k", "1"))
+    registry.lookup(("k", "0"))
+    registry.register(jobs[2].job_id, ("k", "2"))
+    assert registry.lookup(("k", "1")) is None
+    assert registry.lookup(("k", "0")) is not None and registry.lookup(("k", "2")) is not None
+
+
+def test_forget_content_keeps_idempotency_keys():
+    registry = UploadRegistry(10)
+    job = stored_job()
+    content, idempotency = ("content", "x"), UploadRegistry.idempotency_key("acme", "retry-1")
+    registry.register(job.job_id, content, idempotency, None)
+    registry.forget_content(job.job_id)
+    assert registry.lookup(content) is None
+    assert registry.lookup(idempotency).job_id == job.job_id
+
+
+def test_repeated_uploads_attach_to_the_first_job():
+    stub_llm.install(latency=0.0)
+    tenant = {"X-Tenant-ID": f"tenant-{uuid4()}"}
+    with TestClient(app) as client:
+        first = client.post("/upload", files={"file": ("march.csv", CSV)}, headers=tenant).json()
+        same_content = client.post("/upload", files={"file": ("copy.csv", CSV)}, headers=tenant).json()
+        other_tenant = client.post("/upload", files={"file": ("march.csv", CSV)}, headers={"X-Tenant-ID": f"tenant-{uuid4()}"}).json()
+    assert not first["reused"]
+    assert same_content["reused"] and same_content["job_id"] == first["job_id"]
+    assert not other_tenant["reused"] and other_tenant["job_id"] != first["job_id"]
+
+
+def test_idempotency_key_returns_the_first_job_without_reading_the_file():
+    stub_llm.install(latency=0.0)
+    headers = {"X-Tenant-ID": f"tenant-{uuid4()}", "Idempotency-Key": "upload-1"}
+    with TestClient(app) as client:
+        first = client.post("/upload", files={"file": ("march.csv", CSV)}, headers=headers).json()
+        retry = client.post("/upload", files={"file": ("other.csv", b"different content")}, headers=headers).json()
+    assert retry["reused"] and retry["job_id"] == first["job_id"]
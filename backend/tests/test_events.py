@@ -0,0 +1,145 @@
+import asyncio
+from uuid import uuid4
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.core.storage import job_store
+from src.main import app
+from src.models.schemas import AnalysisJob, JobStatus
+from src.services.events import JobEventBus, JobProgress, job_events, watch_job
+
+
+def stored_job(status: JobStatus) -> AnalysisJob:
+    job = AnalysisJob(status=status)
+    job_store.save_job(job)
+    return job
+
+
+def test_bus_delivers_to_subscribers_and_drops_the_oldest_when_full():
+    async def main() -> None:
+        bus = JobEventBus()
+        job_id = uuid4()
+        queue = bus.subscribe(job_id)
+        for i in range(100):
+            bus.publish(job_id, "progress", {"n": i})
+        assert queue.qsize() == 64
+        assert queue.get_nowait() == ("progress", {"n": 36})
+        assert bus.subscriber_count() == 1
+        bus.unsubscribe(job_id, queue)
+        assert bus.subscriber_count() == 0
+
+    asyncio.run(main())
+
+
+def test_latest_progress_is_kept_until_the_job_finishes():
+    bus = JobEventBus()
+    job = AnalysisJob(status=JobStatus.IN_PROGRESS)
+    bus.publish(job.job_id, "progress", {"percent": 40.0})
+    assert bus.latest_progress(job.job_id) == {"percent": 40.0}
+    job.status = JobStatus.COMPLETED
+    bus.publish_status(job)
+    assert bus.latest_progress(job.job_id) is None
+
+
+def test_progress_percent_and_throttling():
+    bus = JobEventBus()
+    progress = JobProgress(uuid4(), bytes_total=1000, bus=bus)
+
+    async def main() -> None:
+        queue = bus.subscribe(progress.job_id)
+        progress.read(500)
+        progress.parsed(100)
+        progress.categorized(50)
+        assert progress.percent == pytest.approx(90.0 * 0.5 * 0.5)
+        # Published within the throttling interval of the previous event
+        assert queue.qsize() == 1
+        progress.finish_parsing()
+        progress.categorized(50)
+        assert progress.percent == 90.0
+        progress.enter_stage("storing")
+        assert progress.percent == 95.0
+        assert queue.qsize() == 3
+        assert bus.latest_progress(progress.job_id)["stage"] == "storing"
+
+    asyncio.run(main())
+
+
+def collect(job_id, heartbeat: float = 5.0, during=None):
+    async def main():
+        events = []
+        if during is not None:
+            asyncio.get_running_loop().call_later(0.05, during)
+        async for event in watch_job(job_id, heartbeat):
+            events.append(event)
+        return events
+    return asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_finished_job_yields_its_status_and_ends():
+    job = stored_job(JobStatus.COMPLETED)
+    assert collect(job.job_id) == [("status", {"job_id": str(job.job_id), "status": "COMPLETED", "error_message": None,
+                                               "duplicates_skipped": None, "queue_position": None})]
+
+
+def test_unknown_job_yields_nothing():
+    assert collect(uuid4()) == []
+
+
+def test_running_job_is_followed_until_it_completes():
+    job = stored_job(JobStatus.IN_PROGRESS)
+
+    def finish() -> None:
+        job_events.publish(job.job_id, "progress", {"percent": 50.0})
+        job.status = JobStatus.COMPLETED
+        job_store.save_job(job)
+        job_events.publish_status(job)
+
+    events = collect(job.job_id, during=finish)
+    assert [(event_type, data.get("status") or data.get("percent")) for event_type, data in events] == \
+           [("status", "IN_PROGRESS"), ("progress", 50.0), ("status", "COMPLETED")]
+
+
+def test_heartbeat_reports_changes_made_without_events():
+    job = stored_job(JobStatus.PENDING)
+
+    def fail_elsewhere() -> None:
+        # As if another server process had failed the job
+        job.status = JobStatus.FAILED
+        job.error_message = "boom"
+        job_store.save_job(job)
+
+    events = collect(job.job_id, heartbeat=0.2, during=fail_elsewhere)
+    assert events[0][1]["status"] == "PENDING"
+    assert events[-1] == ("status", {**events[0][1], "status": "FAILED", "error_message": "boom"})
+
+
+def test_sse_endpoint_streams_the_status():
+    job = stored_job(JobStatus.COMPLETED)
+    with TestClient(app) as client:
+        response = client.get(f"/analysis/{job.job_id}/events")
+        missing = client.get(f"/analysis/{uuid4()}/events")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = response.text.strip().split("\n\n")
+    assert blocks[0] == "retry: 1000"
+    lines = blocks[1].split("\n")
+    assert lines[:2] == ["id: 1", "event: status"]
+    assert orjson.loads(lines[2][len("data: "):])["status"] == "COMPLETED"
+    assert missing.status_code == 404
+
+
+def test_websocket_sends_events_and_closes():
+    job = stored_job(JobStatus.FAILED)
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/analysis/{job.job_id}/ws") as websocket:
+            message = websocket.receive_json()
+            with pytest.raises(WebSocketDisconnect):
+                websocket.receive_json()
+        with client.websocket_connect(f"/analysis/{uuid4()}/ws") as websocket:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+    assert message == {"event": "status", "data": {"job_id": str(job.job_id), "status": "FAILED", "error_message": None,
+                                                   "duplicates_skipped": None, "queue_position": None}}
+    assert closed.value.code == 4404
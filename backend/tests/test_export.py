@@ -0,0 +1,110 @@
+import csv
+import gzip
+import io
+import zlib
+from datetime import date
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from src.core.serialization import accepted_encodings, gzip_stream
+from src.core.storage import job_store
+from src.main import app
+from src.models.aggregates import RunningAggregates
+from src.models.batch import TransactionBatchBuilder
+from src.models.index import TransactionIndex
+from src.models.rollup import RollupCube
+from src.models.schemas import AnalysisJob, JobStatus
+from src.services.export import iter_export
+
+
+@pytest.fixture
+def batch(make_batch):
+    return make_batch(23, seed=4)
+
+
+def records(batch):
+    return orjson.loads(orjson.dumps(batch.to_records(range(len(batch)))))
+
+
+def test_ndjson_has_one_transaction_per_line(batch):
+    lines = b"".join(iter_export(batch, "ndjson", chunk_rows=5)).splitlines()
+    assert [orjson.loads(line) for line in lines] == records(batch)
+
+
+def test_chunks_hold_at_most_chunk_rows_transactions(batch):
+    chunks = list(iter_export(batch, "ndjson", chunk_rows=5))
+    assert [chunk.count(b"\n") for chunk in chunks] == [5, 5, 5, 5, 3]
+    assert b"".join(chunks) == b"".join(iter_export(batch, "ndjson", chunk_rows=1000))
+
+
+def test_export_is_lazy(batch):
+    chunks = iter_export(batch, "csv", chunk_rows=5)
+    assert next(chunks) == b"id,date,description,amount,currency,category\n"
+    assert next(chunks).count(b"\n") == 5
+
+
+def test_csv_round_trips_awkward_descriptions():
+    builder = TransactionBatchBuilder()
+    for description in ['ACME, "THE" STORE', "multi\nline", "plain"]:
+        builder.append(date(2024, 1, 1), description, -12.5)
+    awkward = builder.build()
+    rows = list(csv.DictReader(io.StringIO(b"".join(iter_export(awkward, "csv", chunk_rows=2)).decode("utf-8"))))
+    assert [row["description"] for row in rows] == ['ACME, "THE" STORE', "multi\nline", "plain"]
+    assert [float(row["amount"]) for row in rows] == [-12.5] * 3
+    assert {row["category"] for row in rows} == {"Uncategorized"}
+
+
+def test_unsupported_format_is_rejected(batch):
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        list(iter_export(batch, "xml"))
+
+
+def test_gzip_stream_is_decodable_as_it_arrives():
+    chunks = [b"first chunk\n", b"", b"second chunk\n"]
+    compressed = list(gzip_stream(iter(chunks)))
+    # Everything sent so far decodes before the stream ends
+    assert zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(compressed[0]) == b"first chunk\n"
+    assert gzip.decompress(b"".join(compressed)) == b"".join(chunks)
+
+
+def test_accepted_encodings_skip_refused_codings():
+    assert accepted_encodings("br;q=1.0, gzip;q=0, deflate") == {"br", "deflate"}
+    assert accepted_encodings(None) == set()
+
+
+@pytest.fixture
+def completed_job(batch) -> AnalysisJob:
+    job = AnalysisJob(status=JobStatus.COMPLETED)
+    aggregates = RunningAggregates.empty()
+    aggregates.update(batch)
+    job_store.save_results(job.job_id, {
+        "categorized_transactions": batch, "transaction_index": TransactionIndex.build(batch),
+        "rollup": RollupCube.build(batch), "aggregates": aggregates, "insights": [], "predictions": [],
+    })
+    job_store.save_job(job)
+    return job
+
+
+def test_export_endpoint_streams_both_formats(completed_job, batch):
+    with TestClient(app) as client:
+        ndjson = client.get(f"/analysis/{completed_job.job_id}/export", headers={"Accept-Encoding": "identity"})
+        compressed = client.get(f"/analysis/{completed_job.job_id}/export?format=csv", headers={"Accept-Encoding": "gzip"})
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert "content-encoding" not in ndjson.headers
+    assert ndjson.headers["content-disposition"] == f'attachment; filename="{completed_job.job_id}.ndjson"'
+    assert [orjson.loads(line) for line in ndjson.content.splitlines()] == records(batch)
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["content-type"].startswith("text/csv")
+    # The client has already decompressed the body
+    assert compressed.content == b"".join(iter_export(batch, "csv"))
+
+
+def test_export_endpoint_errors(completed_job):
+    pending = AnalysisJob()
+    job_store.save_job(pending)
+    with TestClient(app) as client:
+        assert client.get(f"/analysis/{pending.job_id}/export").status_code == 409
+        assert client.get(f"/analysis/{AnalysisJob().job_id}/export").status_code == 404
+        assert client.get(f"/analysis/{completed_job.job_id}/export?format=xml").status_code == 422
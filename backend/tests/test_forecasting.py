@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from src.models.batch import TransactionBatchBuilder
+from src.services.forecasting import EXPONENTIAL_SMOOTHING, SEASONAL_NAIVE, forecast_spending
+from src.services.reporting import build_report
+
+JAN_2022 = (2022 - 1970) * 12
+
+
+def day_number(day: date) -> int:
+    return (day - date(1970, 1, 1)).days
+
+
+def test_steady_spending_is_forecast_with_high_confidence():
+    history = np.tile([[500.0, 40.0]], (12, 1))
+    forecast = forecast_spending(history, JAN_2022, horizon=3)
+    assert forecast.period(0) == "2023-01"
+    np.testing.assert_allclose(forecast.amounts, [[500.0, 40.0]] * 3)
+    np.testing.assert_allclose(forecast.totals, [540.0] * 3)
+    assert np.all(forecast.confidence == 0.95)
+    assert not forecast.seasonal.any()
+
+
+def test_confidence_reflects_residuals_and_horizon():
+    rng = np.random.default_rng(0)
+    steady = 200.0 + rng.normal(0, 5, size=18)
+    volatile = 200.0 + rng.normal(0, 120, size=18)
+    forecast = forecast_spending(np.column_stack([steady, np.maximum(volatile, 0)]), JAN_2022, horizon=4)
+    assert np.all(forecast.confidence[:, 0] > forecast.confidence[:, 1])
+    assert np.all(np.diff(forecast.confidence, axis=0) <= 0)
+    assert np.all((forecast.total_confidence > 0) & (forecast.total_confidence <= 0.95))
+
+
+def test_seasonal_categories_repeat_last_year():
+    rng = np.random.default_rng(1)
+    year = np.array([100.0] * 11 + [900.0])  # A December spike
+    history = np.column_stack([np.tile(year, 3) + rng.normal(0, 5, size=36), np.full(36, 80.0)])
+    forecast = forecast_spending(history, JAN_2022, horizon=12)
+    assert forecast.seasonal.tolist() == [True, False]
+    assert forecast.period(11) == "2025-12"
+    np.testing.assert_allclose(forecast.amounts[:, 0], history[24:, 0])
+
+
+def test_incomplete_last_month_is_prorated():
+    history = np.array([[300.0], [300.0], [120.0]])  # March 2022 so far
+    last_day = day_number(date(2022, 3, 10))
+    forecast = forecast_spending(history, JAN_2022, last_day=last_day, horizon=2)
+    assert forecast.period(0) == "2022-03"
+    assert forecast.amounts[0, 0] == pytest.approx(120.0 + 300.0 * 21 / 31)
+    assert forecast.amounts[1, 0] == pytest.approx(300.0)
+
+
+def test_complete_last_month_is_fitted():
+    history = np.array([[300.0], [300.0], [300.0]])
+    forecast = forecast_spending(history, JAN_2022, last_day=day_number(date(2022, 3, 31)), horizon=1)
+    assert forecast.period(0) == "2022-04"
+    assert forecast.amounts[0, 0] == pytest.approx(300.0)
+
+
+def test_report_predicts_every_spending_category():
+    builder = TransactionBatchBuilder()
+    for month in range(1, 7):
+        builder.append(date(2024, month, 1), "RENT PAYMENT", 1500.0)
+        builder.append(date(2024, month, 28), "PAYROLL", -4000.0)
+        for day in range(1, 28, 3):
+            builder.append(date(2024, month, day), "KROGER", 60.0 + day)
+    builder.append(date(2024, 6, 30) + timedelta(days=1), "KROGER", 50.0)  # July has started
+    batch = builder.build()
+    batch.categories = ["Rent", "Salary", "Groceries"]
+    batch.category_codes = np.array([{"RENT PAYMENT": 0, "PAYROLL": 1, "KROGER": 2}[batch.descriptions[code]]
+                                     for code in batch.description_codes], dtype=np.int16)
+
+    _, predictions, _ = build_report(batch)
+    periods = sorted({prediction.period for prediction in predictions})
+    assert periods[0] == "2024-07"
+    july = {prediction.category: prediction for prediction in predictions if prediction.period == "2024-07"}
+    assert set(july) == {None, "Rent", "Groceries"}  # Income is not forecast
+    assert july["Rent"].model in (EXPONENTIAL_SMOOTHING, SEASONAL_NAIVE)
+    assert july["Groceries"].predicted_amount > 50.0
+    assert july[None].predicted_amount == pytest.approx(july["Rent"].predicted_amount + july["Groceries"].predicted_amount, abs=0.02)
+    assert all(0.0 < prediction.confidence_score <= 0.95 for prediction in predictions)
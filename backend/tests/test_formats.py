@@ -0,0 +1,156 @@
+import asyncio
+import csv
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from typing import Tuple
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import bank_csv_bytes, generate_transactions
+from src.models.batch import TransactionBatch
+from fastapi import UploadFile
+
+from src.core import executor
+from src.core.config import settings
+from src.services.formats import ColumnLayout, infer_csv_layout, iter_layout_batches
+from src.services.ingestion import ingestion_service
+from src.services.parser import parse_csv
+
+
+def parse(text: str, batch_size: int = 1000) -> Tuple[ColumnLayout, int, TransactionBatch]:
+    """
+    Infers the layout of a CSV text from its first records, then converts every data row.
+    """
+    records = text.splitlines(keepends=True)
+    layout, skip = infer_csv_layout(records[:50])
+    rows = csv.reader(StringIO("".join(records[skip:])), delimiter=layout.delimiter)
+    return layout, skip, TransactionBatch.concat(iter_layout_batches(rows, layout, batch_size, "CSV"))
+
+
+def dates(batch: TransactionBatch):
+    return [str(day) for day in batch.dates]
+
+
+def descriptions(batch: TransactionBatch):
+    return [batch.descriptions[code] for code in batch.description_codes]
+
+
+def test_plain_iso_statement():
+    layout, skip, batch = parse(
+        "Date,Description,Amount\n"
+        "2024-01-05,COFFEE SHOP,4.50\n"
+        "2024-01-06,PAYROLL,-2500.00\n"
+    )
+    assert (layout.date, layout.description, layout.amount, layout.delimiter, skip) == (0, 1, 2, ",", 1)
+    assert dates(batch) == ["2024-01-05", "2024-01-06"]
+    assert batch.amounts.tolist() == [4.5, -2500.0]
+
+
+def test_european_bank_export():
+    # Preamble, semicolons, 'Soll' and 'Haben' columns, day-first dates and decimal commas
+    layout, skip, batch = parse(bank_csv_bytes(300).decode("utf-8"), batch_size=64)
+    assert skip == 3
+    assert (layout.delimiter, layout.date_format, layout.decimal) == (";", "%d.%m.%Y", ",")
+    assert (layout.date, layout.description, layout.amount, layout.debit, layout.credit) == (0, 1, None, 2, 3)
+    expected = list(generate_transactions(300))
+    assert dates(batch) == [day.isoformat() for day, _, _ in expected]
+    assert descriptions(batch) == [description for _, description, _ in expected]
+    np.testing.assert_allclose(batch.amounts, [amount for _, _, amount in expected])
+
+
+def test_us_bank_export_with_debit_and_credit_columns():
+    layout, skip, batch = parse(
+        "Account: Checking ****1234\n"
+        "\n"
+        "Posting Date,Description,Debit,Credit,Balance\n"
+        '01/15/2024,"AMAZON MKTPLACE, SEATTLE WA","1,234.56",,"8,765.44"\n'
+        "01/16/2024,DIRECT DEPOSIT ACME,,2500.00,11265.44\n"
+        "02/03/2024,SHELL OIL 5544,$45.10,,11220.34\n"
+    )
+    assert skip == 3
+    assert (layout.date_format, layout.alternate_date_format, layout.decimal) == ("%m/%d/%Y", None, ".")
+    assert (layout.debit, layout.credit) == (2, 3)
+    assert dates(batch) == ["2024-01-15", "2024-01-16", "2024-02-03"]
+    assert descriptions(batch)[0] == "AMAZON MKTPLACE, SEATTLE WA"
+    assert batch.amounts.tolist() == [1234.56, -2500.0, 45.1]
+
+
+def test_headerless_day_first_statement():
+    layout, skip, batch = parse(
+        "25/03/2024,TESCO STORES 3011,12.50\n"
+        "26/03/2024,TFL TRAVEL CHARGE,2.80\n"
+        "27/03/2024,SALARY ACME LTD,-1800.00\n"
+    )
+    assert skip == 0
+    assert (layout.date, layout.description, layout.amount, layout.date_format) == (0, 1, 2, "%d/%m/%Y")
+    assert dates(batch) == ["2024-03-25", "2024-03-26", "2024-03-27"]
+
+
+def test_tab_delimited_statement_with_credit_markers():
+    layout, _, batch = parse(
+        "Transaction Date\tNarrative\tAmount\n"
+        "2024/04/01\tCARD PAYMENT ALDI\t23.40\n"
+        "2024/04/02\tREFUND ALDI\t5.00 CR\n"
+        "2024/04/03\tSTANDING ORDER RENT\t(950.00)\n"
+    )
+    assert (layout.delimiter, layout.date_format) == ("\t", "%Y/%m/%d")
+    assert batch.amounts.tolist() == [23.4, -5.0, -950.0]
+
+
+def day_first_statement(rows: int, first_day: date = date(2024, 3, 1)) -> str:
+    """
+    A day-first statement whose first 12 days, which hold well over the sampled rows,
+    fit the month-first order too. Returns the CSV text; row i is `first_day` + i // 40 days.
+    """
+    days = [first_day + timedelta(days=i // 40) for i in range(rows)]
+    return "Date,Description,Amount\n" + "".join(f"{day:%d/%m/%Y},CAFE {i},3.20\n" for i, day in enumerate(days))
+
+
+def expected_dates(rows: int, first_day: date = date(2024, 3, 1)):
+    return [(first_day + timedelta(days=i // 40)).isoformat() for i in range(rows)]
+
+
+def test_ambiguous_sample_is_settled_by_a_later_date():
+    # Every sampled day is at most 12; the order is only settled by 13/03 on row 480
+    text = day_first_statement(600)
+    layout, _, batch = parse(text, batch_size=16)
+    assert (layout.date_format, layout.alternate_date_format) == ("%d/%m/%Y", None)
+    assert dates(batch) == expected_dates(600)
+    assert dates(parse_csv(text)) == expected_dates(600)
+
+
+def test_ambiguous_statement_keeps_the_preferred_order():
+    _, _, batch = parse(day_first_statement(200))
+    assert dates(batch)[:2] == ["2024-01-03", "2024-01-03"]
+
+
+def test_ambiguous_sample_is_settled_across_process_pool_blocks(monkeypatch):
+    monkeypatch.setattr(settings, "PROCESS_POOL_WORKERS", 2)
+    monkeypatch.setattr(settings, "INGEST_CHUNK_SIZE", 2048)
+    monkeypatch.setattr(settings, "INGEST_BATCH_SIZE", 50)
+    text = day_first_statement(1000, first_day=date(2024, 4, 1))
+
+    async def run():
+        file = UploadFile(BytesIO(text.encode("utf-8")), filename="statement.csv")
+        return [batch async for batch in ingestion_service._iter_csv_batches(file)]
+
+    executor.shutdown_process_pool()
+    try:
+        batches = asyncio.run(run())
+    finally:
+        executor.shutdown_process_pool()
+    assert len(batches) > 2
+    assert dates(TransactionBatch.concat(batches)) == expected_dates(1000, first_day=date(2024, 4, 1))
+
+
+def test_unambiguous_sample_does_not_fall_back():
+    # The sample settles the order month first, so a later day-first date is an error
+    text = "Date,Description,Amount\n" + "01/13/2024,CAFE,3.20\n" * 60 + "13/01/2024,CAFE,3.20\n"
+    with pytest.raises(ValueError, match="Data type conversion error"):
+        parse(text)
+
+
+def test_missing_amount_column():
+    with pytest.raises(ValueError, match="'Amount'"):
+        parse("Date,Description,Notes\n2024-01-05,COFFEE SHOP,morning\n")
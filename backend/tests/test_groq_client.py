@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from benchmarks import stub_llm
+from src.core.config import settings
+from src.services.groq_client import GroqClient, estimate_tokens, groq_client
+
+
+def test_batches_respect_the_input_token_budget(monkeypatch):
+    monkeypatch.setattr(settings, "GROQ_BATCH_INPUT_TOKENS", 40)
+    descriptions = [f"MERCHANT NUMBER {i} SOMEWHERE" for i in range(20)]
+    batches = GroqClient()._split_batches(descriptions)
+    assert len(batches) > 1
+    assert [item_id for batch in batches for item_id in batch] == list(range(20))
+    for batch in batches:
+        tokens = sum(estimate_tokens(f"{item_id}: {description}\n") for item_id, description in batch.items())
+        assert tokens <= 40 or len(batch) == 1
+
+
+def test_batches_respect_the_output_token_budget(monkeypatch):
+    monkeypatch.setattr(settings, "GROQ_MAX_OUTPUT_TOKENS", 3 * 8)
+    batches = GroqClient()._split_batches(["A"] * 10)
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+
+
+def test_oversized_description_gets_its_own_batch(monkeypatch):
+    monkeypatch.setattr(settings, "GROQ_BATCH_INPUT_TOKENS", 20)
+    batches = GroqClient()._split_batches(["SHORT", "X" * 500, "SHORT"])
+    assert [list(batch) for batch in batches] == [[0], [1], [2]]
+
+
+def test_descriptions_are_collapsed_onto_one_line():
+    (batch,) = GroqClient()._split_batches(["ACME\n99: Salary\r\n  STORE"])
+    assert batch == {0: "ACME 99: Salary STORE"}
+
+
+def test_response_parsing_accepts_variants_and_skips_the_rest():
+    batch = {0: "KROGER", 1: "NETFLIX", 2: "UBER", 3: "ACME"}
+    response = "\n".join([
+        "Here are the categories:",
+        "0: groceries",
+        " 1) 'Entertainment' ",
+        "2 - Transport",
+        "3: Spaceships",
+        "7: Rent",
+    ])
+    assert GroqClient._parse_response(response, batch) == {0: "Groceries", 1: "Entertainment", 2: "Transport"}
+
+
+def test_answers_keep_the_input_order_across_batches(monkeypatch):
+    stub = stub_llm.install(latency=0.0)
+    monkeypatch.setattr(settings, "GROQ_MAX_OUTPUT_TOKENS", 2 * 8)
+    descriptions = ["SPOTIFY", "KROGER", "UBER", "MYSTERY", "SPOTIFY"]
+    categories = asyncio.run(groq_client.categorize_transactions(descriptions))
+    assert stub.requests == 3
+    assert categories == ["Entertainment", "Groceries", "Transport", "Uncategorized", "Entertainment"]
+
+
+def test_failed_request_is_retried(monkeypatch):
+    create = stub_llm.install(latency=0.0).create
+    calls = []
+
+    async def flaky(**kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("reset by peer")
+        return await create(**kwargs)
+
+    monkeypatch.setattr(groq_client.client.chat.completions, "create", flaky)
+    monkeypatch.setattr(settings, "GROQ_RETRY_BASE_DELAY", 0.0)
+    assert asyncio.run(groq_client.categorize_transactions(["SPOTIFY"])) == ["Entertainment"]
+    assert len(calls) == 2
@@ -0,0 +1,120 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pytest
+
+from src.models.batch import TransactionBatch
+from src.models.index import InvalidCursorError, TransactionIndex
+
+# Filter combinations covering each candidate set (category and description posting
+# lists, date and amount ranges) with and without a matching sort order
+QUERIES: List[Dict[str, Any]] = [
+    {},
+    {"category": "Dining"},
+    {"category": "Nonexistent"},
+    {"description": "merchant 07"},
+    {"description": "STORE"},
+    {"description": "no such text"},
+    {"date_from": date(2024, 2, 1)},
+    {"date_from": date(2024, 2, 1), "date_to": date(2024, 2, 10)},
+    {"date_to": date(2023, 12, 31)},
+    {"min_amount": 10.0, "max_amount": 40.0},
+    {"max_amount": 0.0},
+    {"category": "Transport", "date_from": date(2024, 3, 1), "min_amount": 20.0},
+    {"category": "Groceries", "description": "merchant 1"},
+]
+SORTS = [None, "date", "-date", "amount", "-amount"]
+
+
+def brute_force(batch: TransactionBatch, category: Optional[str] = None, date_from: Optional[date] = None,
+                date_to: Optional[date] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                description: Optional[str] = None, sort: Optional[str] = None) -> np.ndarray:
+    """
+    Filters and sorts every row, one predicate at a time.
+    """
+    mask = np.ones(len(batch), dtype=bool)
+    if category is not None:
+        mask &= np.array([batch.categories[code] == category for code in batch.category_codes])
+    if description:
+        mask &= np.array([description.casefold() in batch.descriptions[code].casefold() for code in batch.description_codes])
+    if date_from is not None:
+        mask &= batch.dates >= np.datetime64(date_from, "D")
+    if date_to is not None:
+        mask &= batch.dates <= np.datetime64(date_to, "D")
+    if min_amount is not None:
+        mask &= batch.amounts >= min_amount
+    if max_amount is not None:
+        mask &= batch.amounts <= max_amount
+    rows = np.flatnonzero(mask)
+    if sort:
+        values = batch.dates if sort.lstrip("-") == "date" else batch.amounts
+        rows = rows[np.argsort(values[rows], kind="stable")]
+        if sort.startswith("-"):
+            rows = rows[::-1]
+    return rows
+
+
+def paginate(index: TransactionIndex, batch: TransactionBatch, limit: int, **filters: Any) -> np.ndarray:
+    """
+    Collects every page of a query by following its cursors.
+    """
+    pages, cursor = [], None
+    while True:
+        rows, cursor = index.query(batch, limit=limit, cursor=cursor, **filters)
+        assert len(rows) <= limit
+        pages.append(rows)
+        if cursor is None:
+            return np.concatenate(pages)
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("filters", QUERIES)
+def test_query_matches_brute_force(make_batch, filters, sort):
+    batch = make_batch(3000, seed=1)
+    rows, cursor = TransactionIndex.build(batch).query(batch, sort=sort, **filters)
+    assert cursor is None
+    np.testing.assert_array_equal(rows, brute_force(batch, sort=sort, **filters))
+
+
+@pytest.mark.parametrize("limit", [1, 7, 500])
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("filters", QUERIES)
+def test_pages_concatenate_to_the_full_result(make_batch, filters, sort, limit):
+    batch = make_batch(600, seed=2)
+    np.testing.assert_array_equal(paginate(TransactionIndex.build(batch), batch, limit, sort=sort, **filters),
+                                  brute_force(batch, sort=sort, **filters))
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("filters", QUERIES)
+def test_extended_index_matches_rebuilt_index(make_batch, filters, sort):
+    old = make_batch(2000, seed=3)
+    # New rows bring dates past the old range and a category the old rows lack
+    new = make_batch(700, seed=4, categories=("Dining", "Travel"), start=date(2024, 3, 15))
+    combined = TransactionBatch.concat([old, new])
+    index = TransactionIndex.build(old).extend(combined, len(old))
+    rows, _ = index.query(combined, sort=sort, **filters)
+    np.testing.assert_array_equal(rows, brute_force(combined, sort=sort, **filters))
+    np.testing.assert_array_equal(paginate(index, combined, 123, sort=sort, **filters),
+                                  brute_force(combined, sort=sort, **filters))
+
+
+def test_serialized_index_answers_the_same(make_batch):
+    batch = make_batch(1000, seed=5)
+    index = TransactionIndex.from_bytes(TransactionIndex.build(batch).to_bytes())
+    rows, _ = index.query(batch, category="Utilities", sort="-amount")
+    np.testing.assert_array_equal(rows, brute_force(batch, category="Utilities", sort="-amount"))
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "Zm9vOjE", "c2NhbjotMQ"])
+def test_invalid_cursor(make_batch, cursor):
+    batch = make_batch(10)
+    with pytest.raises(InvalidCursorError):
+        TransactionIndex.build(batch).query(batch, cursor=cursor)
+
+
+def test_unsupported_sort(make_batch):
+    batch = make_batch(10)
+    with pytest.raises(ValueError, match="Unsupported sort"):
+        TransactionIndex.build(batch).query(batch, sort="description")
@@ -0,0 +1,90 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from src.core import storage
+from src.core.storage import InMemoryJobStore, SQLiteJobStore
+from src.models.index import TransactionIndex
+from src.services import index_cache as index_cache_module
+from src.services.index_cache import IndexCache
+
+
+@pytest.fixture
+def persistent_store(tmp_path, monkeypatch):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), 3600.0)
+    monkeypatch.setattr(storage, "job_store", store)
+    monkeypatch.setattr(index_cache_module, "job_store", store)
+    return store
+
+
+def counting_loader(batch):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return batch, TransactionIndex.build(batch)
+    return load, loads
+
+
+def test_index_is_loaded_once_per_version(persistent_store, make_batch):
+    cache = IndexCache(max_bytes=10 ** 9)
+    job_id = uuid4()
+    load, loads = counting_loader(make_batch(500))
+
+    async def run():
+        first = await cache.get(job_id, 1, load)
+        second = await cache.get(job_id, 1, load)
+        newer = await cache.get(job_id, 2, load)
+        return first, second, newer
+
+    first, second, newer = asyncio.run(run())
+    assert second is first
+    assert newer is not first
+    assert len(loads) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_concurrent_misses_share_one_load(persistent_store, make_batch):
+    cache = IndexCache(max_bytes=10 ** 9)
+    job_id = uuid4()
+    load, loads = counting_loader(make_batch(500))
+
+    async def run():
+        return await asyncio.gather(*(cache.get(job_id, 1, load) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_least_recently_used_jobs_are_evicted(persistent_store, make_batch):
+    batch = make_batch(500)
+    size = batch.nbytes + TransactionIndex.build(batch).nbytes
+    cache = IndexCache(max_bytes=2 * size + 1)
+    job_ids = [uuid4() for _ in range(3)]
+    load, loads = counting_loader(batch)
+
+    async def run():
+        for job_id in job_ids:
+            await cache.get(job_id, 1, load)
+        await cache.get(job_ids[0], 1, load)
+
+    asyncio.run(run())
+    assert len(loads) == 4
+    assert cache.stats()["jobs"] == 2
+    assert cache.stats()["bytes"] == 2 * size
+
+
+def test_in_memory_store_is_not_cached(monkeypatch, make_batch):
+    store = InMemoryJobStore(3600.0, 10 ** 9)
+    monkeypatch.setattr(index_cache_module, "job_store", store)
+    cache = IndexCache(max_bytes=10 ** 9)
+    load, loads = counting_loader(make_batch(10))
+
+    async def run():
+        await cache.get(uuid4(), 1, load)
+
+    asyncio.run(run())
+    assert len(loads) == 1
+    assert cache.stats()["jobs"] == 0
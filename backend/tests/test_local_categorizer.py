@@ -0,0 +1,41 @@
+import pytest
+
+from src.services.categorization_cache import normalize_description
+from src.services.local_categorizer import KeywordMatcher, LocalCategorizer
+
+
+def test_matcher_finds_overlapping_keywords_on_word_boundaries():
+    matcher = KeywordMatcher(["UBER", "UBER EATS", "EATS"])
+    assert sorted(matcher.find("UBER EATS SUBERB")) == [(0, 4, "UBER"), (0, 9, "UBER EATS"), (5, 9, "EATS")]
+    assert matcher.find("SUBERB") == []
+
+
+@pytest.mark.parametrize("description, category", [
+    ("UBER EATS 1234 SAN FRANCISCO", "Dining Out"),
+    ("UBER TRIP 8841", "Transport"),
+    ("ENTERPRISE RENT-A-CAR #44", "Travel"),
+    ("Rent payment March", "Rent"),
+    ("NETFLIX.COM", "Entertainment"),
+])
+def test_longest_keyword_wins(description, category):
+    predicted, confidence = LocalCategorizer(use_tfidf=False).predict(normalize_description(description))
+    assert predicted == category
+    assert confidence >= 0.8
+
+
+def test_generic_keywords_stay_below_the_default_threshold():
+    category, confidence = LocalCategorizer(use_tfidf=False).predict(normalize_description("CORNER CAFE"))
+    assert category == "Dining Out"
+    assert confidence < 0.8
+
+
+def test_unknown_merchant_has_no_prediction():
+    assert LocalCategorizer().predict("ZZZ UNKNOWN") == (None, 0.0)
+
+
+def test_trained_model_answers_merchants_without_keywords():
+    local = LocalCategorizer()
+    local.train([("ACME WIDGETS INC", "Shopping"), ("ACME WIDGET CO", "Shopping"), ("FOO DENTAL", "Healthcare")])
+    category, confidence = local.predict("ACME WIDGETS")
+    assert category == "Shopping"
+    assert 0.0 < confidence <= 1.0
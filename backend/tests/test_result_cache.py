@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+import threading
+from typing import Dict
+from uuid import uuid4
+
+import orjson
+import pytest
+from starlette.requests import Request
+
+from src.core import storage
+from src.core.storage import SQLiteJobStore
+from src.models.aggregates import RunningAggregates
+from src.models.index import TransactionIndex
+from src.models.rollup import RollupCube
+from src.services.result_cache import CachedResponse, ResultCache
+
+
+def request(**headers: str) -> Request:
+    return Request({"type": "http", "headers": [(name.replace("_", "-").encode(), value.encode())
+                                                for name, value in headers.items()]})
+
+
+@pytest.fixture
+def response() -> CachedResponse:
+    body = b'[{"amount": 1.0}]' * 100
+    return CachedResponse(body, {"gzip": gzip.compress(body)}, "abc123")
+
+
+@pytest.fixture
+def results(make_batch) -> Dict:
+    batch = make_batch(200)
+    aggregates = RunningAggregates.empty()
+    aggregates.update(batch)
+    return {"categorized_transactions": batch, "transaction_index": TransactionIndex.build(batch),
+            "rollup": RollupCube.build(batch), "aggregates": aggregates, "insights": [], "predictions": []}
+
+
+def test_response_carries_a_strong_etag(response):
+    served = response.to_response(request())
+    assert served.status_code == 200
+    assert served.headers["etag"] == '"abc123"'
+    assert served.body == response.body
+
+
+def test_compressed_variant_has_its_own_etag(response):
+    served = response.to_response(request(accept_encoding="br, gzip"))
+    assert served.headers["content-encoding"] == "gzip"
+    assert served.headers["etag"] == '"abc123-gzip"'
+    assert gzip.decompress(served.body) == response.body
+
+
+@pytest.mark.parametrize("if_none_match", ['"abc123"', 'W/"abc123-gzip"', '"other", "abc123"', "*"])
+def test_matching_validator_is_not_modified(response, if_none_match):
+    served = response.to_response(request(if_none_match=if_none_match, accept_encoding="gzip"))
+    assert served.status_code == 304
+    assert served.body == b""
+
+
+def test_changed_validator_gets_the_body(response):
+    assert response.to_response(request(if_none_match='"stale"')).status_code == 200
+
+
+def test_responses_are_served_until_the_version_changes(results):
+    cache = ResultCache(max_bytes=10 ** 9)
+    job_id = uuid4()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return results
+
+    async def run():
+        first = await cache.get(job_id, 1, "transactions", load)
+        again = await cache.get(job_id, 1, "insights", load)
+        newer = await cache.get(job_id, 2, "transactions", load)
+        return first, again, newer
+
+    first, again, newer = asyncio.run(run())
+    assert len(orjson.loads(first.body)) == 200
+    assert again.body == b"[]"
+    assert newer.digest == first.digest
+    assert len(loads) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_cancelled_request_does_not_strand_other_waiters(results):
+    cache = ResultCache(max_bytes=10 ** 9)
+    job_id = uuid4()
+
+    async def run():
+        first = asyncio.create_task(cache.get(job_id, 1, "transactions", lambda: results))
+        second = asyncio.create_task(cache.get(job_id, 1, "transactions", lambda: results))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) is not None
+
+
+def test_persistent_store_is_read_off_the_event_loop(tmp_path, monkeypatch, results):
+    monkeypatch.setattr(storage, "job_store", SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), 3600.0))
+    cache = ResultCache(max_bytes=10 ** 9)
+    threads = []
+
+    def load():
+        threads.append(threading.get_ident())
+        return results
+
+    asyncio.run(cache.get(uuid4(), 1, "predictions", load))
+    assert threads[0] != threading.get_ident()
@@ -0,0 +1,95 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pytest
+
+from src.models.batch import TransactionBatch
+from src.models.rollup import BUCKETS, RollupCube
+
+
+def period(day: date, bucket: str) -> Optional[str]:
+    if bucket == "day":
+        return day.isoformat()
+    if bucket == "week":
+        return (day - timedelta(days=day.weekday())).isoformat()
+    if bucket == "month":
+        return f"{day.year}-{day.month:02d}"
+    if bucket == "quarter":
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+    return str(day.year) if bucket == "year" else None
+
+
+def brute_force(batch: TransactionBatch, bucket: str, by_category: bool, category: Optional[str] = None,
+                date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Groups every row in plain Python.
+    """
+    groups: Dict[tuple, List[float]] = defaultdict(list)
+    for day, amount, code in zip(batch.dates.tolist(), batch.amounts.tolist(), batch.category_codes.tolist()):
+        name = batch.categories[code]
+        if (category is not None and name != category) or (date_from and day < date_from) or (date_to and day > date_to):
+            continue
+        groups[(period(day, bucket), name if by_category else None)].append(amount)
+    return [{"period": key[0], "category": key[1], "count": len(amounts), "sum": round(sum(amounts), 2),
+             "min": round(min(amounts), 2), "max": round(max(amounts), 2), "mean": round(sum(amounts) / len(amounts), 2)}
+            for key, amounts in sorted(groups.items(), key=lambda item: (item[0][0] or "", item[0][1] or ""))]
+
+
+def assert_rows_equal(actual: List[Dict[str, Any]], expected: List[Dict[str, Any]]) -> None:
+    assert [(row["period"], row["category"], row["count"]) for row in actual] == \
+           [(row["period"], row["category"], row["count"]) for row in expected]
+    for got, want in zip(actual, expected):
+        for stat in ("sum", "min", "max", "mean"):
+            assert got[stat] == pytest.approx(want[stat], abs=0.011)
+
+
+@pytest.fixture
+def batch(make_batch) -> TransactionBatch:
+    return make_batch(2000, seed=3, start=date(2023, 11, 20), days=400)
+
+
+@pytest.mark.parametrize("bucket", BUCKETS)
+@pytest.mark.parametrize("by_category", [True, False])
+def test_query_matches_brute_force(batch, bucket, by_category):
+    assert_rows_equal(RollupCube.build(batch).query(bucket, by_category), brute_force(batch, bucket, by_category))
+
+
+@pytest.mark.parametrize("filters", [
+    {"category": "Dining"},
+    {"date_from": date(2024, 2, 1), "date_to": date(2024, 2, 29)},
+    {"category": "Salary", "date_from": date(2024, 6, 15)},
+])
+def test_filters_match_brute_force(batch, filters):
+    assert_rows_equal(RollupCube.build(batch).query("week", True, **filters), brute_force(batch, "week", True, **filters))
+
+
+def test_empty_selections_return_no_rows(batch):
+    cube = RollupCube.build(batch)
+    assert cube.query(category="Nonexistent") == []
+    assert cube.query(date_to=date(2000, 1, 1)) == []
+    assert RollupCube.empty().query() == []
+
+
+def test_unsupported_bucket_is_rejected(batch):
+    with pytest.raises(ValueError, match="Unsupported bucket"):
+        RollupCube.build(batch).query("decade")
+
+
+def test_merge_equals_building_from_all_rows(make_batch):
+    old = make_batch(500, seed=1)
+    new = make_batch(300, seed=2, categories=("Dining", "Travel"), start=date(2024, 3, 1))
+    merged = RollupCube.build(old).merge(RollupCube.build(new))
+    combined = TransactionBatch.concat([old, new])
+    assert_rows_equal(merged.query("day"), brute_force(combined, "day", True))
+    assert_rows_equal(merged.query("all", by_category=False), brute_force(combined, "all", False))
+
+
+def test_bytes_round_trip(batch):
+    cube = RollupCube.build(batch)
+    restored = RollupCube.from_bytes(cube.to_bytes())
+    assert restored.categories == cube.categories
+    for name in ("days", "codes", "sums", "counts", "mins", "maxs"):
+        np.testing.assert_array_equal(getattr(restored, name), getattr(cube, name))
+    assert restored.query("month") == cube.query("month")
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import tempfile
+from typing import List
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import endpoints
+from src.core.storage import job_store
+from src.main import app
+from src.models.schemas import JobStatus
+from src.services.ingestion import SHUTDOWN_MESSAGE, BatchEntry, ingestion_service
+from src.services.scheduler import JobScheduler, QueueFullError
+
+
+def run_order(jobs: List[tuple], workers: int = 1) -> List[str]:
+    """
+    Submits (name, tenant, size) jobs before any worker starts and returns the order they ran in.
+    """
+    order: List[str] = []
+
+    async def main() -> None:
+        scheduler = JobScheduler(workers, max_queue_size=100, max_queue_per_tenant=100)
+        done = asyncio.Event()
+
+        def job(name: str):
+            async def run() -> None:
+                order.append(name)
+                if len(order) == len(jobs):
+                    done.set()
+            return run
+
+        for name, tenant, size in jobs:
+            scheduler.submit(uuid4(), tenant, size, job(name))
+        await asyncio.wait_for(done.wait(), 5)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    return order
+
+
+def test_tenants_take_turns():
+    jobs = [("a1", "a", 1), ("a2", "a", 1), ("a3", "a", 1), ("b1", "b", 1), ("c1", "c", 1)]
+    assert run_order(jobs) == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_smaller_files_run_first_within_a_tenant():
+    jobs = [("large", "a", 50 * 1024 * 1024), ("medium", "a", 1024 * 1024), ("small", "a", 1024)]
+    assert run_order(jobs) == ["small", "medium", "large"]
+
+
+def test_position_follows_the_dispatch_order():
+    async def main() -> None:
+        scheduler = JobScheduler(1, max_queue_size=100, max_queue_per_tenant=100)
+        noop = asyncio.sleep
+        first, second, third = uuid4(), uuid4(), uuid4()
+        assert scheduler.submit(first, "a", 1, lambda: noop(0)) == 0
+        assert scheduler.submit(second, "a", 1, lambda: noop(0)) == 1
+        # Another tenant's job goes ahead of the first tenant's second one
+        assert scheduler.submit(third, "b", 1, lambda: noop(0)) == 1
+        assert scheduler.position(second) == 2
+        await scheduler.stop()
+
+    asyncio.run(main())
+
+
+def test_full_queue_raises_with_retry_after():
+    async def main() -> None:
+        scheduler = JobScheduler(1, max_queue_size=2, max_queue_per_tenant=1)
+        scheduler.submit(uuid4(), "a", 1, lambda: asyncio.sleep(0))
+        with pytest.raises(QueueFullError, match="tenant") as tenant_full:
+            scheduler.submit(uuid4(), "a", 1, lambda: asyncio.sleep(0))
+        scheduler.submit(uuid4(), "b", 1, lambda: asyncio.sleep(0))
+        with pytest.raises(QueueFullError, match="queue is full") as queue_full:
+            scheduler.check_capacity("c")
+        assert tenant_full.value.retry_after >= 1
+        assert queue_full.value.retry_after >= 1
+        await scheduler.stop()
+
+    asyncio.run(main())
+
+
+def test_upload_is_rejected_with_429_when_the_queue_is_full(monkeypatch):
+    monkeypatch.setattr(endpoints, "scheduler", JobScheduler(1, max_queue_size=0, max_queue_per_tenant=0))
+    with TestClient(app) as client:
+        response = client.post("/upload", files={"file": ("statement.csv", b"Date,Description,Amount\n")})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+
+def test_stop_discards_queued_jobs_but_not_the_running_one():
+    async def main() -> None:
+        scheduler = JobScheduler(1, max_queue_size=100, max_queue_per_tenant=100)
+        started = asyncio.Event()
+        discarded: List[str] = []
+
+        async def block() -> None:
+            started.set()
+            await asyncio.Event().wait()
+
+        def discard(name: str):
+            async def run() -> None:
+                discarded.append(name)
+            return run
+
+        scheduler.submit(uuid4(), "a", 1, block, discard=discard("running"))
+        scheduler.submit(uuid4(), "a", 1, block, discard=discard("queued-a"))
+        scheduler.submit(uuid4(), "b", 1, block, discard=discard("queued-b"))
+        scheduler.submit(uuid4(), "b", 1, block)
+        await asyncio.wait_for(started.wait(), 5)
+        await scheduler.stop()
+        assert sorted(discarded) == ["queued-a", "queued-b"]
+        assert scheduler.queued == 0
+
+    asyncio.run(main())
+
+
+def spooled_file() -> str:
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as spool:
+        spool.write(b"Date,Description,Amount\n")
+    return spool.name
+
+
+def test_discarded_upload_fails_and_removes_its_file():
+    job = ingestion_service.create_analysis_job()
+    path = spooled_file()
+    asyncio.run(ingestion_service.discard_queued(str(job.job_id), [path]))
+    assert not os.path.exists(path)
+    stored = job_store.get_job(job.job_id)
+    assert stored.status == JobStatus.FAILED
+    assert stored.error_message == SHUTDOWN_MESSAGE
+
+
+def test_discarded_batch_fails_with_its_children():
+    paths = [spooled_file(), spooled_file()]
+    entries = [BatchEntry("a.csv", paths[0], 24), BatchEntry("b.csv", paths[1], 24)]
+    parent = ingestion_service.create_batch_job(entries)
+    asyncio.run(ingestion_service.discard_queued(str(parent.job_id), paths))
+    assert not any(os.path.exists(path) for path in paths)
+    for job_id in [parent.job_id] + parent.child_job_ids:
+        assert job_store.get_job(job_id).status == JobStatus.FAILED
+
+
+def test_discarded_append_keeps_the_job_completed():
+    job = ingestion_service.create_analysis_job()
+    job.status = JobStatus.COMPLETED
+    job_store.save_job(job)
+    path = spooled_file()
+    asyncio.run(ingestion_service.discard_queued(str(job.job_id), [path], append=True))
+    assert not os.path.exists(path)
+    stored = job_store.get_job(job.job_id)
+    assert stored.status == JobStatus.COMPLETED
+    assert SHUTDOWN_MESSAGE in stored.error_message
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+from typing import Any, Dict
+
+import pytest
+
+from src.core import storage
+from src.core.storage import InMemoryJobStore, SQLiteJobStore
+from src.models.aggregates import RunningAggregates
+from src.models.batch import TransactionBatch
+from src.models.index import TransactionIndex
+from src.models.rollup import RollupCube
+from src.models.schemas import AnalysisJob, JobStatus
+
+TTL_SECONDS = 3600.0
+
+
+class FakeClock:
+    """
+    Stands in for the `time` module inside the store, so tests move time by hand.
+    """
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(storage, "time", clock)
+    return clock
+
+
+def make_results(batch: TransactionBatch) -> Dict[str, Any]:
+    aggregates = RunningAggregates.empty()
+    aggregates.update(batch)
+    return {
+        "categorized_transactions": batch,
+        "transaction_index": TransactionIndex.build(batch),
+        "rollup": RollupCube.build(batch),
+        "aggregates": aggregates,
+        "insights": [],
+        "predictions": [],
+    }
+
+
+def store_job(store, status: JobStatus, results: Dict[str, Any] = None) -> AnalysisJob:
+    job = AnalysisJob(status=status)
+    store.save_job(job)
+    if results is not None:
+        store.save_results(job.job_id, results)
+    return job
+
+
+def test_job_expires_after_ttl(clock):
+    store = InMemoryJobStore(TTL_SECONDS, max_bytes=10 ** 9)
+    job = store_job(store, JobStatus.COMPLETED)
+    clock.now += TTL_SECONDS - 1
+    assert store.get_job(job.job_id) is not None
+    clock.now += 2
+    assert store.get_job(job.job_id) is None
+    assert store.stats()["jobs"] == 0
+
+
+def test_saving_a_job_extends_its_lifetime(clock):
+    store = InMemoryJobStore(TTL_SECONDS, max_bytes=10 ** 9)
+    job = store_job(store, JobStatus.IN_PROGRESS)
+    clock.now += TTL_SECONDS - 1
+    job.status = JobStatus.COMPLETED
+    store.save_job(job)
+    clock.now += TTL_SECONDS - 1
+    assert store.get_job(job.job_id).status == JobStatus.COMPLETED
+
+
+def test_expired_results_are_dropped(clock, make_batch):
+    store = InMemoryJobStore(TTL_SECONDS, max_bytes=10 ** 9)
+    job = store_job(store, JobStatus.COMPLETED, make_results(make_batch(100)))
+    assert len(store.get_transactions(job.job_id)) == 100
+    clock.now += TTL_SECONDS + 1
+    assert store.get_results(job.job_id) is None
+    assert store.stats() == {"jobs": 0, "result_bytes": 0}
+
+
+def test_expired_jobs_are_purged_on_write(clock):
+    store = InMemoryJobStore(TTL_SECONDS, max_bytes=10 ** 9)
+    store_job(store, JobStatus.COMPLETED)
+    clock.now += TTL_SECONDS + InMemoryJobStore._PURGE_INTERVAL_SECONDS
+    store_job(store, JobStatus.COMPLETED)
+    assert store.stats()["jobs"] == 1
+
+
+def test_least_recently_used_results_are_evicted(clock, make_batch):
+    results = [make_results(make_batch(500, seed=seed)) for seed in range(3)]
+    store = InMemoryJobStore(TTL_SECONDS, max_bytes=10 ** 9)
+    first = store_job(store, JobStatus.COMPLETED, results[0])
+    second = store_job(store, JobStatus.COMPLETED, results[1])
+    # Two results fit; reading the first makes the second the least recently used
+    store.max_bytes = store.stats()["result_bytes"] + 1000
+    assert store.get_job(first.job_id) is not None
+    third = store_job(store, JobStatus.COMPLETED, results[2])
+    assert store.get_job(second.job_id) is None
+    assert store.get_results(first.job_id) is not None
+    assert store.get_results(third.job_id) is not None
+
+
+def test_eviction_keeps_queued_and_running_jobs(clock, make_batch):
+    store = InMemoryJobStore(TTL_SECONDS, max_bytes=1)
+    # A running job may hold results while new rows are appended to it
+    pending = store_job(store, JobStatus.PENDING)
+    running = store_job(store, JobStatus.IN_PROGRESS, make_results(make_batch(200, seed=1)))
+    finished = store_job(store, JobStatus.COMPLETED, make_results(make_batch(200, seed=2)))
+    latest = store_job(store, JobStatus.COMPLETED, make_results(make_batch(200, seed=3)))
+    assert store.get_job(pending.job_id) is not None
+    assert store.get_results(running.job_id) is not None
+    assert store.get_job(finished.job_id) is None
+    # The results just stored are kept even when they alone exceed the budget
+    assert store.get_results(latest.job_id) is not None
+
+
+def test_sqlite_store_round_trip(tmp_path, clock, make_batch):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), TTL_SECONDS)
+    batch = make_batch(300)
+    job = store_job(store, JobStatus.COMPLETED, make_results(batch))
+    assert store.get_job(job.job_id) == job
+    assert store.get_transactions(job.job_id).amounts.tolist() == batch.amounts.tolist()
+    stored_batch, index = store.get_index(job.job_id)
+    assert index.query(stored_batch, category="Dining")[0].tolist() == \
+        TransactionIndex.build(batch).query(batch, category="Dining")[0].tolist()
+    assert store.get_rollup(job.job_id).query("month") == RollupCube.build(batch).query("month")
+
+
+def test_sqlite_results_live_as_long_as_the_job(tmp_path, clock, make_batch):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), TTL_SECONDS)
+    job = store_job(store, JobStatus.COMPLETED, make_results(make_batch(50)))
+    clock.now += TTL_SECONDS - 1
+    store.save_job(job)
+    clock.now += TTL_SECONDS - 1
+    assert store.get_results(job.job_id) is not None
+    assert store.get_rollup(job.job_id) is not None
+    clock.now += 2
+    assert store.get_job(job.job_id) is None
+    assert store.get_results(job.job_id) is None
+    assert store.get_index(job.job_id) is None
+
+
+def test_persistent_store_is_called_off_the_event_loop(tmp_path, monkeypatch):
+    calling_threads = []
+
+    def get_job(job_id):
+        calling_threads.append(threading.get_ident())
+        return None
+
+    async def call():
+        await storage.run_store(get_job, None)
+        return threading.get_ident()
+
+    monkeypatch.setattr(storage, "job_store", InMemoryJobStore(TTL_SECONDS, max_bytes=10 ** 9))
+    loop_thread = asyncio.run(call())
+    monkeypatch.setattr(storage, "job_store", SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), TTL_SECONDS))
+    asyncio.run(call())
+    assert calling_threads[0] == loop_thread
+    assert calling_threads[1] != threading.get_ident()